@@ -1,9 +1,17 @@
 # app/api/__init__.py
 from fastapi import APIRouter
 from .webhook_router import router as webhook_router
+from .admin_router import router as admin_router
+from .metrics_router import router as metrics_router
 
 # Создаем общий роутер API
 api_router = APIRouter()
 
 # Подключаем наш webhook-роутер
-api_router.include_router(webhook_router)
\ No newline at end of file
+api_router.include_router(webhook_router)
+
+# Служебные эндпоинты (/admin/*), защищены ADMIN_TOKEN
+api_router.include_router(admin_router)
+
+# Метрики для Prometheus (/metrics)
+api_router.include_router(metrics_router)
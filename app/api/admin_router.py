@@ -0,0 +1,196 @@
+# app/api/admin_router.py
+import asyncio
+import gc
+import hmac
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from pydantic import BaseModel
+
+from app.core.config import ADMIN_TOKEN
+from app.core.loop_monitor import loop_monitor
+from app.core.memory import memory_diagnostics
+from app.core.profiler import profiler
+from app.services.catchup import catchup
+from app.services.enrichment import enricher
+from app.services.filter_rules import notification_filter
+from app.services.message_details import detail_cache
+from app.services.payload_offload import payload_offloader
+from app.services.repeat_suppressor import repeat_suppressor
+from app.services.repo_fairness import repo_fairness
+from app.services.send_queue import send_budget
+from app.services.sender_service import chat_rate_limiter, lane_scheduler, message_batcher
+from app.services.webhook_service import background_delivery, receipt_order
+
+
+async def require_admin(x_admin_token: str | None = Header(default=None)):
+    """Пускаем только с правильным X-Admin-Token (если ADMIN_TOKEN не задан — API выключено)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin API is disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.get("/filters")
+async def get_filters():
+    """Текущие правила заглушения и счетчики срабатываний"""
+    return notification_filter.stats()
+
+
+@router.post("/filters/reload")
+async def reload_filters():
+    """Принудительно перечитать файл правил"""
+    reloaded = notification_filter.reload()
+    return {"status": "ok" if reloaded else "error", **notification_filter.stats()}
+
+
+@router.get("/enrichment")
+async def get_enrichment():
+    """Кэш GitHub API: попадания, перепроверки по ETag, склеенные запросы, остаток лимита"""
+    if enricher is None:
+        return {"enabled": False}
+    return {"enabled": True, **enricher.stats()}
+
+
+@router.get("/repeats")
+async def get_repeats():
+    """Окна подавления повторов: открытые, с повторами, всего подавлено"""
+    if repeat_suppressor is None:
+        return {"enabled": False}
+    return {"enabled": True, **repeat_suppressor.stats()}
+
+
+@router.get("/catchup")
+async def get_catchup():
+    """Догрузка пропущенных доставок: найдено в журнале GitHub, обработано, статусы"""
+    if catchup is None:
+        return {"enabled": False}
+    return {"enabled": True, **catchup.stats()}
+
+
+@router.get("/offload")
+async def get_offload():
+    """Пул разбора больших payload'ов: порог, сколько отправлено в пул, сколько сейчас в работе"""
+    if payload_offloader is None:
+        return {"enabled": False}
+    return {"enabled": True, **payload_offloader.stats()}
+
+
+class ProfilingSettings(BaseModel):
+    enabled: bool | None = None
+    sample_every: int | None = None
+    slow_ms: float | None = None
+
+
+@router.get("/profiling")
+async def get_profiling():
+    """Состояние профилировщика webhook'ов"""
+    return profiler.stats()
+
+
+@router.post("/profiling")
+async def set_profiling(settings: ProfilingSettings):
+    """Включить/выключить профилирование или поменять частоту и порог"""
+    profiler.configure(settings.enabled, settings.sample_every, settings.slow_ms)
+    return profiler.stats()
+
+
+@router.get("/loop")
+async def get_loop():
+    """Задержка event loop'а и последние блокировки со стеками"""
+    return loop_monitor.stats()
+
+
+# --- Диагностика памяти ---
+
+KeyType = Literal["lineno", "filename", "traceback"]
+
+
+class MemoryTracingSettings(BaseModel):
+    frames: int | None = None
+
+
+def _component_sizes() -> dict:
+    """Размеры кэшей и очередей внутри процесса"""
+    return {
+        "background_delivery": background_delivery.stats(),
+        "receipt_order": receipt_order.stats(),
+        "lanes": lane_scheduler.stats(),
+        "batches": message_batcher.stats() if message_batcher else None,
+        "chat_rate_limiter": chat_rate_limiter.stats(),
+        "send_queue": send_budget.stats(),
+        "repo_queues": repo_fairness.stats(),
+        "enrichment_cache": enricher.api.stats() if enricher else None,
+        "repeat_windows": repeat_suppressor.stats() if repeat_suppressor else None,
+        "detail_cache": detail_cache.stats() if detail_cache else None,
+        "filter_rules": len(notification_filter.rules),
+        "profiler_sessions": profiler.stats()["active"],
+        "asyncio_tasks": len(asyncio.all_tasks()),
+        "gc_counts": gc.get_count(),
+    }
+
+
+def _memory_error(error: Exception) -> HTTPException:
+    if isinstance(error, LookupError):
+        return HTTPException(status_code=404, detail=str(error))
+    return HTTPException(status_code=409, detail=str(error))
+
+
+@router.get("/memory")
+async def get_memory():
+    """RSS, состояние tracemalloc, снимки и размеры внутренних кэшей и очередей"""
+    return {**memory_diagnostics.status(), "components": _component_sizes()}
+
+
+@router.post("/memory/start")
+async def start_memory_tracing(settings: MemoryTracingSettings | None = None):
+    """Запустить tracemalloc (пока он выключен, накладных расходов нет)"""
+    memory_diagnostics.start(settings.frames if settings else None)
+    return memory_diagnostics.status()
+
+
+@router.post("/memory/stop")
+async def stop_memory_tracing():
+    """Остановить tracemalloc и удалить снимки"""
+    memory_diagnostics.stop()
+    return memory_diagnostics.status()
+
+
+@router.post("/memory/snapshots")
+async def take_memory_snapshot():
+    """Снять снимок памяти"""
+    try:
+        snapshot_id = await memory_diagnostics.take_snapshot()
+    except RuntimeError as e:
+        raise _memory_error(e)
+    return {"id": snapshot_id, **memory_diagnostics.status()}
+
+
+@router.get("/memory/top")
+async def get_memory_top(
+    snapshot: int | None = None,
+    key_type: KeyType = "lineno",
+    limit: int = Query(20, ge=1, le=500),
+):
+    """Самые крупные места выделения памяти (без snapshot — по новому снимку)"""
+    try:
+        return await memory_diagnostics.top(snapshot, key_type, limit)
+    except (RuntimeError, LookupError) as e:
+        raise _memory_error(e)
+
+
+@router.get("/memory/diff")
+async def get_memory_diff(
+    base: int,
+    target: int | None = None,
+    key_type: KeyType = "lineno",
+    limit: int = Query(20, ge=1, le=500),
+):
+    """Рост памяти между снимками base и target (без target — по новому снимку)"""
+    try:
+        return await memory_diagnostics.diff(base, target, key_type, limit)
+    except (RuntimeError, LookupError) as e:
+        raise _memory_error(e)
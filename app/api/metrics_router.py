@@ -0,0 +1,55 @@
+# app/api/metrics_router.py
+import hmac
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import ADMIN_TOKEN, METRICS_ENABLED
+from app.core.loop_monitor import loop_monitor
+from app.services.repo_fairness import repo_fairness
+from app.services.send_queue import send_budget
+from app.services.sender_service import lane_scheduler
+
+router = APIRouter()
+
+
+def _delivery_metrics() -> list[str]:
+    lanes = lane_scheduler.stats()
+    budget = send_budget.stats()
+    return [
+        "# HELP notifier_send_lanes Active delivery lanes (chat + topic).",
+        "# TYPE notifier_send_lanes gauge",
+        f"notifier_send_lanes {lanes['lanes']}",
+        "# HELP notifier_send_queued Messages waiting in delivery lanes.",
+        "# TYPE notifier_send_queued gauge",
+        f"notifier_send_queued {lanes['queued']}",
+        "# HELP notifier_send_queue_bytes Memory held by queued messages (records + texts).",
+        "# TYPE notifier_send_queue_bytes gauge",
+        f"notifier_send_queue_bytes {budget['bytes']}",
+        "# HELP notifier_send_queue_max_bytes Memory budget for queued messages (0 = unlimited).",
+        "# TYPE notifier_send_queue_max_bytes gauge",
+        f"notifier_send_queue_max_bytes {budget['max_bytes']}",
+        "# HELP notifier_send_queue_waiting Notifications waiting for room in the send queue budget.",
+        "# TYPE notifier_send_queue_waiting gauge",
+        f"notifier_send_queue_waiting {budget['waiting']}",
+    ]
+
+
+def _authorized(authorization: str | None, x_admin_token: str | None) -> bool:
+    """Тот же ADMIN_TOKEN, что у /admin: Bearer (authorization в scrape_config Prometheus'а) или X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        return True
+    scheme, _, token = (authorization or "").partition(" ")
+    token = token.strip() if scheme.lower() == "bearer" else x_admin_token
+    return bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: str | None = Header(default=None), x_admin_token: str | None = Header(default=None)):
+    """Метрики в текстовом формате Prometheus (имена репозиториев, размеры очередей — только с токеном)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    if not _authorized(authorization, x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    lines = loop_monitor.prometheus() + _delivery_metrics() + repo_fairness.prometheus()
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -2,6 +2,8 @@
 from fastapi import APIRouter, Request
 from loguru import logger as log
 
+from app.core.tracing import set_attributes, span
+from app.services.batch_ingest import ingest_ndjson
 from app.services.webhook_service import process_github_payload
 
 router = APIRouter()
@@ -17,6 +19,32 @@ async def github_webhook_endpoint(request: Request):
 
     # Передаем запрос в сервис.
     # Он сам проверит подпись, распарсит JSON и отправит сообщение боту.
-    result = await process_github_payload(request)
+    # Корневой спан трейса: дочерние спаны создаются на каждом этапе обработки
+    content_length = request.headers.get("Content-Length")
+    with span(
+        "webhook.receive",
+        http__client=client_host,
+        github__event=request.headers.get("X-GitHub-Event"),
+        github__delivery_id=request.headers.get("X-GitHub-Delivery"),
+        payload__size=int(content_length) if content_length and content_length.isdigit() else None,
+    ):
+        result = await process_github_payload(request)
+        set_attributes(webhook__status=result.get("status"))
 
-    return result
\ No newline at end of file
+    return result
+
+
+@router.post("/webhook/github/batch")
+async def github_webhook_batch_endpoint(request: Request):
+    """
+    Пакетный прием доставок в формате NDJSON (ретранслятор GitHub Enterprise, дозагрузка).
+    Строка: {"event": ..., "delivery_id": ..., "signature": "sha256=...", "body": "<тело>"}
+    """
+    client_host = request.client.host if request.client else "unknown"
+    log.info(f"📥 Входящий пакет webhook'ов от {client_host}")
+
+    with span("webhook.batch", http__client=client_host):
+        result = await ingest_ndjson(request.stream())
+        set_attributes(batch__records=result["records"])
+
+    return result
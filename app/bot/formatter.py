@@ -1,4 +1,6 @@
 # app/bot/formatter.py
+import time
+
 from aiogram.types import Chat, Message, User
 
 
@@ -88,4 +90,75 @@ class MessageInfoFormatter:
             info += f"PR_NOTIFY_TOPIC_ID=<code>{message.message_thread_id}</code>\n"
 
         info += "\n<i>(Нажмите на число, чтобы скопировать)</i>"
-        return info
\ No newline at end of file
+        return info
+
+class EventQueryFormatter:
+    """Форматтер ответов на команды по истории событий (/prs, /ci, /releases)"""
+
+    CHECK_EMOJI = {
+        "success": "✅",
+        "failure": "❌",
+        "cancelled": "⚠️",
+        "skipped": "⏭",
+        "timed_out": "⌛",
+    }
+
+    @staticmethod
+    def _escape(text: str | None) -> str:
+        return (text or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    @staticmethod
+    def _age(timestamp: float) -> str:
+        """Сколько времени прошло: 5 мин / 3 ч / 2 дн"""
+        seconds = max(0, int(time.time() - timestamp))
+        if seconds < 3600:
+            return f"{seconds // 60} мин"
+        if seconds < 86400:
+            return f"{seconds // 3600} ч"
+        return f"{seconds // 86400} дн"
+
+    @staticmethod
+    def format_open_prs(repo: str, rows: list) -> str:
+        if not rows:
+            return f"📭 Открытых PR в <b>{repo}</b> не найдено"
+
+        text = f"🟢 <b>Открытые PR в {rows[0]['repo']}</b> ({len(rows)})\n━━━━━━━━━━━━━━━━━━━━━\n"
+        for row in rows:
+            title = EventQueryFormatter._escape(row["title"])
+            text += (
+                f"• <a href='{row['url']}'>#{row['number']} {title}</a> — @{row['actor']}, "
+                f"{EventQueryFormatter._age(row['created_at'])} назад\n"
+            )
+        return text
+
+    @staticmethod
+    def format_checks(repo: str, branch: str, rows: list) -> str:
+        if not rows:
+            return f"📭 Нет данных о проверках для <b>{repo}</b> / <code>{branch}</code>"
+
+        failed = [row for row in rows if row["state"] not in ("success", "skipped", "neutral")]
+        summary = "🟢 Ветка зеленая" if not failed else f"🔴 Проблемных проверок: {len(failed)}"
+        text = (
+            f"🔧 <b>CI: {rows[0]['repo']}</b> / <code>{branch}</code>\n"
+            f"━━━━━━━━━━━━━━━━━━━━━\n"
+            f"{summary}\n"
+            f"Коммит: <code>{(rows[0]['sha'] or '')[:7]}</code>\n\n"
+        )
+        for row in rows:
+            emoji = EventQueryFormatter.CHECK_EMOJI.get(row["state"], "🔵")
+            text += f"{emoji} <a href='{row['url']}'>{EventQueryFormatter._escape(row['title'])}</a> — {row['state']}\n"
+        return text
+
+    @staticmethod
+    def format_releases(repo: str, rows: list) -> str:
+        if not rows:
+            return f"📭 Релизов в <b>{repo}</b> не найдено"
+
+        text = f"🚀 <b>Последние релизы {rows[0]['repo']}</b>\n━━━━━━━━━━━━━━━━━━━━━\n"
+        for row in rows:
+            title = f" {EventQueryFormatter._escape(row['title'])}" if row["title"] else ""
+            text += (
+                f"• <a href='{row['url']}'><code>{row['branch']}</code></a>{title} — "
+                f"{EventQueryFormatter._age(row['created_at'])} назад\n"
+            )
+        return text
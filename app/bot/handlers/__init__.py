@@ -2,12 +2,15 @@
 from aiogram import Router
 
 from .commands import router as command_router
+from .details import router as details_router
+from .queries import router as query_router
 
 
 bot_router = Router()
 
 
 bot_router.include_routers(
-    command_router
-
+    command_router,
+    query_router,
+    details_router,
 )
\ No newline at end of file
@@ -17,6 +17,10 @@ async def cmd_start(message: Message):
         "Я умею пересылать уведомления из GitHub в Telegram:\n"
         "• 🟢 <b>Pull Requests</b> → в отдельный топик\n"
         "• 📦 <b>Push события</b> → в отдельный топик\n\n"
+        "Команды по истории событий:\n"
+        "• /prs <code>owner/repo</code> — открытые PR\n"
+        "• /ci <code>owner/repo main</code> — статус проверок ветки\n"
+        "• /releases <code>owner/repo</code> — последние релизы\n\n"
         "Чтобы узнать ID этого чата для настройки, введите /get_ids"
     )
 
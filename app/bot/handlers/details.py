@@ -0,0 +1,34 @@
+# app/bot/handlers/details.py
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, Message
+from loguru import logger as log
+
+from app.bot.keyboards import DetailCallback, detail_keyboard
+from app.services.message_details import detail_cache, render_page
+
+router = Router()
+
+DETAIL_EXPIRED = "Подробности уже не хранятся — откройте событие на GitHub по ссылке."
+
+
+@router.callback_query(DetailCallback.filter())
+async def show_detail_page(callback: CallbackQuery, callback_data: DetailCallback):
+    """«Показать полностью» и листание страниц: сообщение редактируется на месте"""
+    detail = detail_cache.get(callback_data.token) if detail_cache else None
+    # Удаленное или недоступное боту сообщение приходит без содержимого — редактировать нечего
+    if detail is None or not isinstance(callback.message, Message):
+        await callback.answer(DETAIL_EXPIRED, show_alert=True)
+        return
+
+    text, page, pages = render_page(detail, callback_data.page)
+    try:
+        await callback.message.edit_text(
+            text,
+            reply_markup=detail_keyboard(callback_data.token, page, pages),
+            disable_web_page_preview=True,
+        )
+    except TelegramBadRequest as e:
+        # Двойное нажатие: страница уже показана ("message is not modified")
+        log.debug(f"Страница подробностей {callback_data.token}/{page} не обновлена: {e}")
+    await callback.answer()
@@ -0,0 +1,62 @@
+# app/bot/handlers/queries.py
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from loguru import logger as log
+
+from app.bot.formatter import EventQueryFormatter
+from app.services.event_store import event_store
+
+router = Router()
+
+STORE_DISABLED = "⚠️ История событий выключена (EVENT_STORE_PATH не задан)."
+
+
+@router.message(Command("prs"))
+async def cmd_prs(message: Message, command: CommandObject):
+    """Открытые PR репозитория: /prs owner/repo"""
+    if not event_store:
+        await message.answer(STORE_DISABLED)
+        return
+    if not command.args:
+        await message.answer("Использование: <code>/prs owner/repo</code>")
+        return
+
+    repo = command.args.split()[0]
+    log.info(f"User {message.from_user.id} requested open PRs of {repo}")
+    rows = await event_store.open_pull_requests(repo)
+    await message.answer(EventQueryFormatter.format_open_prs(repo, rows), disable_web_page_preview=True)
+
+
+@router.message(Command("ci"))
+async def cmd_ci(message: Message, command: CommandObject):
+    """Статус проверок последнего коммита ветки: /ci owner/repo [branch]"""
+    if not event_store:
+        await message.answer(STORE_DISABLED)
+        return
+    if not command.args:
+        await message.answer("Использование: <code>/ci owner/repo main</code>")
+        return
+
+    args = command.args.split()
+    repo = args[0]
+    branch = args[1] if len(args) > 1 else "main"
+    log.info(f"User {message.from_user.id} requested CI status of {repo}/{branch}")
+    rows = await event_store.latest_checks(repo, branch)
+    await message.answer(EventQueryFormatter.format_checks(repo, branch, rows), disable_web_page_preview=True)
+
+
+@router.message(Command("releases"))
+async def cmd_releases(message: Message, command: CommandObject):
+    """Последние релизы репозитория: /releases owner/repo"""
+    if not event_store:
+        await message.answer(STORE_DISABLED)
+        return
+    if not command.args:
+        await message.answer("Использование: <code>/releases owner/repo</code>")
+        return
+
+    repo = command.args.split()[0]
+    log.info(f"User {message.from_user.id} requested releases of {repo}")
+    rows = await event_store.recent_releases(repo)
+    await message.answer(EventQueryFormatter.format_releases(repo, rows), disable_web_page_preview=True)
@@ -0,0 +1,33 @@
+# app/bot/keyboards.py
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+class DetailCallback(CallbackData, prefix="more"):
+    """Кнопка подробностей: токен из DetailCache и номер страницы"""
+    token: str
+    page: int
+
+
+def detail_keyboard(token: str, page: int = 0, pages: int = 0) -> InlineKeyboardMarkup:
+    """
+    Кнопки подробностей уведомления.
+
+    :param page: Показанная страница (0 — исходное короткое сообщение)
+    :param pages: Всего страниц
+    """
+    if page == 0:
+        buttons = [InlineKeyboardButton(
+            text="📖 Показать полностью", callback_data=DetailCallback(token=token, page=1).pack()
+        )]
+    else:
+        buttons = []
+        if page > 1:
+            buttons.append(InlineKeyboardButton(
+                text="‹ Назад", callback_data=DetailCallback(token=token, page=page - 1).pack()
+            ))
+        if page < pages:
+            buttons.append(InlineKeyboardButton(
+                text="Далее ›", callback_data=DetailCallback(token=token, page=page + 1).pack()
+            ))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons] if buttons else [])
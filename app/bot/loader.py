@@ -1,13 +1,19 @@
 # app/bot/loader.py
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 
-from app.core.config import BOT_TOKEN
+from app.core.config import BOT_TOKEN, TELEGRAM_API_URL
+
+# Если задан свой Bot API сервер (локальный или фейковый для нагрузочных тестов),
+# направляем все запросы бота туда
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
 
 # Создаем экземпляр бота с HTML-парсингом по умолчанию
 # (чтобы можно было писать жирным шрифтом <b>...</b>)
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+bot = Bot(token=BOT_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
 # Диспетчер для обработки входящих команд (например /get_ids)
-dp = Dispatcher()
\ No newline at end of file
+dp = Dispatcher()
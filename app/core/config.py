@@ -13,6 +13,11 @@ if not BOT_TOKEN:
     log.critical("BOT_TOKEN не найден в .env! Бот не может быть запущен.")
     sys.exit(1)
 
+# --- Telegram Bot API Server ---
+# Базовый URL Bot API (по умолчанию https://api.telegram.org).
+# Используется для локального Bot API сервера или фейкового сервера нагрузочных тестов.
+TELEGRAM_API_URL: str | None = os.getenv("TELEGRAM_API_URL")
+
 # --- Channel ID ---
 NOTIFY_CHANNEL_ID_STR: str | None = os.getenv("NOTIFY_CHANNEL_ID")
 
@@ -43,6 +48,138 @@ except ValueError:
     RELEASES_TOPIC_ID = None
     SECURITY_TOPIC_ID = None
 
+# --- Delivery (очередность и параллелизм отправки) ---
+# Сколько запросов к Telegram может выполняться одновременно (по всем топикам)
+SEND_MAX_IN_FLIGHT: int = int(os.getenv("SEND_MAX_IN_FLIGHT", "8"))
+# Через сколько секунд простоя полоса (чат + топик) удаляется
+SEND_LANE_IDLE_SECONDS: float = float(os.getenv("SEND_LANE_IDLE_SECONDS", "30"))
+# Делить топик на полосы по PR/Issue: порядок сохраняется внутри PR, разные PR идут параллельно
+SEND_LANE_PER_ENTITY: bool = os.getenv("SEND_LANE_PER_ENTITY", "false").lower() in ("1", "true", "yes")
+# Сколько раз повторять отправку после ответа 429 (Too Many Requests)
+SEND_MAX_RETRIES: int = int(os.getenv("SEND_MAX_RETRIES", "3"))
+# Окно склейки сообщений одного репозитория в топике, мс (0 — выключено)
+BATCH_WINDOW_MS: int = int(os.getenv("BATCH_WINDOW_MS", "0"))
+# Лимит сообщений в один чат в минуту (Telegram: ~20 для групп), 0 — без лимита.
+# Ожидание лимита идет в фоновой отправке и не задерживает ответ на webhook
+SEND_CHAT_RATE_PER_MINUTE: float = float(os.getenv("SEND_CHAT_RATE_PER_MINUTE", "20"))
+# Сколько сообщений подряд можно отправить в чат без ожидания
+SEND_CHAT_BURST: int = int(os.getenv("SEND_CHAT_BURST", "5"))
+# Бюджет памяти на сообщения в очереди отправки, байт (записи, тексты и ~5.5 КБ ожидающей задачи
+# на сообщение; 64 МБ — около 9 000 сообщений). Сверх бюджета новые уведомления ждут, пока
+# очередь не разгрузится. 0 — без лимита
+SEND_QUEUE_MAX_BYTES: int = int(os.getenv("SEND_QUEUE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Замерять при старте память ожидающего сообщения на этой сборке Python (отдельный процесс,
+# несколько секунд в фоне). Без замера бюджет считает по оценке для CPython 3.11
+SEND_QUEUE_CALIBRATE: bool = os.getenv("SEND_QUEUE_CALIBRATE", "true").lower() in ("1", "true", "yes")
+# Веса репозиториев в честной очереди отправки: "owner/repo=вес,org/*=вес" (шаблоны fnmatch,
+# первый подходящий). Остальные репозитории — вес 1. Вес 3 — втрое больше отправок в общем топике
+SEND_REPO_WEIGHTS: list[str] = [item.strip() for item in os.getenv("SEND_REPO_WEIGHTS", "").split(",") if item.strip()]
+# Сколько сообщений одного репозитория может ждать отправки (вместе с ожидающими места в бюджете).
+# Сверх лимита новые уведомления репозитория отбрасываются, не задерживая остальных. 0 — без лимита
+SEND_REPO_MAX_QUEUED: int = int(os.getenv("SEND_REPO_MAX_QUEUED", "5000"))
+
+# --- Routing (дополнительные получатели уведомлений) ---
+# JSON со списком чатов, куда дублируются события (см. routes.example.json)
+ROUTES_PATH: str = os.getenv("ROUTES_PATH", "routes.json")
+
+# --- Event Store (локальная история событий для команд /prs, /ci, /releases) ---
+# Путь к SQLite базе. Пустое значение выключает хранилище
+EVENT_STORE_PATH: str = os.getenv("EVENT_STORE_PATH", "data/events.db")
+# Сколько дней хранить историю (последнее состояние открытых PR и Issue хранится, пока они открыты)
+EVENT_STORE_RETENTION_DAYS: float = float(os.getenv("EVENT_STORE_RETENTION_DAYS", "30"))
+
+# --- Notification Filters ---
+# Файл с правилами заглушения уведомлений (перечитывается при изменении)
+FILTER_RULES_PATH: str = os.getenv("FILTER_RULES_PATH", "filters.rules")
+
+# --- Admin API ---
+# Токен для служебных эндпоинтов /admin/* (заголовок X-Admin-Token). Пусто — API выключено
+ADMIN_TOKEN: str | None = os.getenv("ADMIN_TOKEN")
+
+# --- Profiling (сэмплирующий профилировщик обработки webhook'ов) ---
+PROFILE_ENABLED: bool = os.getenv("PROFILE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Профилировать каждый N-й вызов (0 — только медленные)
+PROFILE_SAMPLE_EVERY: int = int(os.getenv("PROFILE_SAMPLE_EVERY", "100"))
+# Сохранять профиль любого вызова дольше порога, мс (0 — не сохранять по порогу)
+PROFILE_SLOW_MS: float = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+PROFILE_DIR: str = os.getenv("PROFILE_DIR", "logs/profiles")
+PROFILE_MAX_FILES: int = int(os.getenv("PROFILE_MAX_FILES", "200"))
+# Период сэмплирования стека, мс
+PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+# --- Memory Diagnostics (tracemalloc через /admin/memory) ---
+# Глубина стека для каждого выделения (больше — точнее и дороже)
+MEMORY_TRACE_FRAMES: int = int(os.getenv("MEMORY_TRACE_FRAMES", "10"))
+# Сколько снимков памяти хранить одновременно
+MEMORY_MAX_SNAPSHOTS: int = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "5"))
+
+# --- Event Loop Monitor ---
+LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+# Период замера задержки event loop'а, мс
+LOOP_MONITOR_INTERVAL_MS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+# Блокировка loop'а дольше порога логируется со стеком, мс
+LOOP_SLOW_CALLBACK_MS: float = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "250"))
+# Сколько последних замеров учитывать в перцентилях (600 × 100 мс = минута)
+LOOP_LAG_WINDOW: int = int(os.getenv("LOOP_LAG_WINDOW", "600"))
+
+# --- Metrics ---
+# Эндпоинт /metrics в формате Prometheus (при заданном ADMIN_TOKEN — только с ним)
+METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# --- Tracing (OpenTelemetry) ---
+# otlp — в OTLP коллектор, file — в файл JSON-строками, пусто — выключено
+TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "").lower()
+TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_FILE: str = os.getenv("TRACING_FILE", "logs/traces.jsonl")
+TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "telegram-notifier")
+
+# --- Enrichment (дополнительные данные из GitHub API) ---
+ENRICHMENT_ENABLED: bool = os.getenv("ENRICHMENT_ENABLED", "false").lower() in ("1", "true", "yes")
+GITHUB_API_URL: str = os.getenv("GITHUB_API_URL", "https://api.github.com")
+# Токен GitHub (без него лимит — 60 запросов в час с IP)
+GITHUB_TOKEN: str | None = os.getenv("GITHUB_TOKEN")
+# Сколько времени событие может ждать обогащения, мс
+ENRICHMENT_BUDGET_MS: float = float(os.getenv("ENRICHMENT_BUDGET_MS", "500"))
+# Размер кэша ответов API и срок, в течение которого ответ используется без перепроверки
+ENRICHMENT_CACHE_SIZE: int = int(os.getenv("ENRICHMENT_CACHE_SIZE", "1000"))
+ENRICHMENT_CACHE_TTL_SECONDS: float = float(os.getenv("ENRICHMENT_CACHE_TTL_SECONDS", "60"))
+
+# --- Batch Ingestion (POST /webhook/github/batch, NDJSON) ---
+# Сколько записей пакета может обрабатываться одновременно (дальше поток не читается)
+BATCH_INGEST_MAX_PENDING: int = int(os.getenv("BATCH_INGEST_MAX_PENDING", "100"))
+# Максимальный размер одной записи, байт (GitHub ограничивает payload 25 МБ)
+BATCH_MAX_RECORD_BYTES: int = int(os.getenv("BATCH_MAX_RECORD_BYTES", str(25 * 1024 * 1024)))
+
+# --- Repeat Suppression (флапающие проверки, повторно закрываемые issue) ---
+# Окно, в котором повторы сворачиваются в сводку, сек: перезапуски упавшей проверки на одном коммите
+# и закрытия/переоткрытия одной задачи (см. event_keys.get_repeat_subject). 0 — выключено
+REPEAT_WINDOW_SECONDS: float = float(os.getenv("REPEAT_WINDOW_SECONDS", "0"))
+# Сколько ключей держать в памяти одновременно
+REPEAT_MAX_KEYS: int = int(os.getenv("REPEAT_MAX_KEYS", "10000"))
+
+# --- Offload (большие payload'ы разбираются в пуле процессов) ---
+# Число процессов пула. 0 — все payload'ы обрабатываются в event loop'е
+OFFLOAD_WORKERS: int = int(os.getenv("OFFLOAD_WORKERS", "2"))
+# Тело webhook'а больше порога (байт) разбирается, валидируется и форматируется в пуле
+OFFLOAD_THRESHOLD_BYTES: int = int(os.getenv("OFFLOAD_THRESHOLD_BYTES", str(256 * 1024)))
+
+# --- Catch-up (догрузка доставок, пропущенных за время простоя) ---
+# Hook'и через запятую: owner/repo:hook_id (hook репозитория) или org:hook_id (hook организации).
+# Пусто — выключено. Нужен GITHUB_TOKEN с правом чтения hook'ов (admin:repo_hook / admin:org_hook)
+CATCHUP_HOOKS: list[str] = [item.strip() for item in os.getenv("CATCHUP_HOOKS", "").split(",") if item.strip()]
+# Насколько далеко в прошлое смотреть журнал доставок, часов
+CATCHUP_LOOKBACK_HOURS: float = float(os.getenv("CATCHUP_LOOKBACK_HOURS", "24"))
+# Сколько доставок догружать одновременно и максимум за один запуск
+CATCHUP_CONCURRENCY: int = int(os.getenv("CATCHUP_CONCURRENCY", "4"))
+CATCHUP_MAX_DELIVERIES: int = int(os.getenv("CATCHUP_MAX_DELIVERIES", "1000"))
+# Сколько запросов лимита GitHub API оставлять другим (обогащение): дальше догрузка ждет сброса лимита
+CATCHUP_RATE_RESERVE: int = int(os.getenv("CATCHUP_RATE_RESERVE", "100"))
+
+# --- Message Details (кнопка «Показать полностью» у обрезанных уведомлений) ---
+# Сколько уведомлений помнить и как долго, часов. 0 записей — кнопки нет
+EXPAND_CACHE_SIZE: int = int(os.getenv("EXPAND_CACHE_SIZE", "2000"))
+EXPAND_TTL_HOURS: float = float(os.getenv("EXPAND_TTL_HOURS", "48"))
+
 # --- Webhook Secret ---
 GITHUB_WEBHOOK_SECRET: str | None = os.getenv("GITHUB_WEBHOOK_SECRET")
 
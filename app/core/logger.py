@@ -74,6 +74,7 @@ def setup_logger() -> None:
         level="DEBUG",  # Уровень - ВСЕ, начиная с DEBUG
         rotation="10 MB",  # Ротация файла при достижении 10 MB
         compression="zip",  # Сжимать старые логи в .zip
+        enqueue=True,  # Запись и ротация в отдельном потоке, а не в event loop
         format="{time} | {level: <8} | {name}:{function}:{line} - {message}",
     )
 
@@ -85,6 +86,7 @@ def setup_logger() -> None:
         serialize=True,  # <-- МАГИЯ: Включает JSON-формат
         rotation="10 MB",  # Тоже с ротацией
         compression="zip",
+        enqueue=True,
     )
 
     # 5. Включение "Перехватчика"
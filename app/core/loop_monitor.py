@@ -0,0 +1,175 @@
+# app/core/loop_monitor.py
+"""
+Сторож event loop'а.
+
+Webhook'и FastAPI, polling aiogram и все отправки в Telegram живут в одном
+event loop'е, и любой блокирующий вызов останавливает их всех.
+
+- Задача в loop'е каждые LOOP_MONITOR_INTERVAL_MS засыпает и меряет,
+  насколько позже положенного проснулась (lag). Последние значения
+  хранятся в кольцевом буфере для перцентилей.
+- Фоновый поток следит за "сердцебиением" этой задачи. Если loop
+  не отвечает дольше LOOP_SLOW_CALLBACK_MS, поток снимает стек потока
+  loop'а (то есть стек блокирующего кода) и пишет его в лог.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from loguru import logger as log
+
+from app.core.config import (
+    LOOP_MONITOR_ENABLED,
+    LOOP_MONITOR_INTERVAL_MS,
+    LOOP_SLOW_CALLBACK_MS,
+    LOOP_LAG_WINDOW,
+)
+
+# Сколько последних зависаний хранить и сколько кадров стека показывать
+MAX_STALLS = 50
+STACK_DEPTH = 25
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _quantile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoopMonitor:
+    """Измерение задержки event loop'а и поиск блокирующих вызовов"""
+
+    def __init__(self, interval_ms: float, slow_ms: float, window: int):
+        self.interval = interval_ms / 1000
+        self.slow = slow_ms / 1000
+        self._lags: deque[float] = deque(maxlen=window)
+        self.samples = 0
+        self.lag_sum = 0.0
+        self.stalls: deque[dict] = deque(maxlen=MAX_STALLS)
+        self.stalls_total = 0
+        self._beat = 0.0
+        self._stalled_beat = 0.0
+        self._open_stall: dict | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._running = False
+
+    # --- Запуск ---
+
+    def start(self) -> None:
+        """Запускается из работающего event loop'а (lifespan)"""
+        if self._running:
+            return
+        self._running = True
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._measure())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        log.info(f"🐢 Сторож event loop'а: замер каждые {self.interval * 1000:.0f} мс, "
+                 f"порог {self.slow * 1000:.0f} мс")
+
+    def stop(self) -> None:
+        self._running = False
+        if self._task:
+            self._task.cancel()
+
+    # --- Замер в loop'е ---
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, loop.time() - started - self.interval))
+
+    def _record(self, lag: float) -> None:
+        self._lags.append(lag)
+        self.samples += 1
+        self.lag_sum += lag
+
+        stall = self._open_stall
+        if stall is not None:
+            # Loop снова работает: фиксируем полную длительность зависания
+            self._open_stall = None
+            stall["duration_ms"] = round(lag * 1000, 1)
+            log.warning(f"🐢 Event loop был заблокирован {stall['duration_ms']} мс")
+
+    # --- Сторожевой поток ---
+
+    def _watch(self) -> None:
+        period = max(self.slow / 4, 0.01)
+        while self._running:
+            time.sleep(period)
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.slow or beat == self._stalled_beat:
+                continue
+
+            # Одно сообщение на одно зависание
+            self._stalled_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame)[-STACK_DEPTH:] if frame is not None else []
+            stall = {
+                "detected_at": time.time(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "duration_ms": None,
+                "stack": [line.rstrip() for line in stack],
+            }
+            self.stalls.append(stall)
+            self.stalls_total += 1
+            self._open_stall = stall
+            log.warning(
+                f"🐢 Event loop не отвечает уже {stall['blocked_ms']} мс. Стек блокирующего кода:\n"
+                + "".join(stack)
+            )
+
+    # --- Статистика ---
+
+    def stats(self) -> dict:
+        ordered = sorted(self._lags)
+        return {
+            "enabled": self._running,
+            "interval_ms": self.interval * 1000,
+            "slow_ms": self.slow * 1000,
+            "window_samples": len(ordered),
+            "lag_ms": {
+                **{f"p{round(q * 100)}": round(_quantile(ordered, q) * 1000, 2) for q in QUANTILES},
+                "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            },
+            "stalls_total": self.stalls_total,
+            "stalls": list(self.stalls),
+        }
+
+    def prometheus(self) -> list[str]:
+        """Метрики в текстовом формате Prometheus"""
+        ordered = sorted(self._lags)
+        lines = [
+            "# HELP event_loop_lag_seconds Event loop lag over the recent window.",
+            "# TYPE event_loop_lag_seconds summary",
+        ]
+        lines += [f'event_loop_lag_seconds{{quantile="{q}"}} {_quantile(ordered, q):.6f}' for q in QUANTILES]
+        lines += [
+            f"event_loop_lag_seconds_sum {self.lag_sum:.6f}",
+            f"event_loop_lag_seconds_count {self.samples}",
+            "# HELP event_loop_lag_max_seconds Maximum event loop lag over the recent window.",
+            "# TYPE event_loop_lag_max_seconds gauge",
+            f"event_loop_lag_max_seconds {ordered[-1] if ordered else 0.0:.6f}",
+            "# HELP event_loop_stalls_total Event loop blocks longer than the slow callback threshold.",
+            "# TYPE event_loop_stalls_total counter",
+            f"event_loop_stalls_total {self.stalls_total}",
+        ]
+        return lines
+
+
+loop_monitor = LoopMonitor(LOOP_MONITOR_INTERVAL_MS, LOOP_SLOW_CALLBACK_MS, LOOP_LAG_WINDOW)
+
+
+def start_loop_monitor() -> None:
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
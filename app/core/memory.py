@@ -0,0 +1,188 @@
+# app/core/memory.py
+"""
+Диагностика памяти долгоживущего процесса (tracemalloc по требованию).
+
+Пока трассировка не запущена, модуль ничего не делает и не стоит ничего.
+После start() можно снимать снимки, смотреть самые "тяжелые" места
+выделения памяти и сравнивать два снимка (что выросло между ними).
+Снимки хранятся в памяти, не больше MEMORY_MAX_SNAPSHOTS (старые удаляются).
+"""
+import asyncio
+import os
+import time
+import tracemalloc
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger as log
+
+from app.core.config import MEMORY_TRACE_FRAMES, MEMORY_MAX_SNAPSHOTS
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+# Служебные выделения, которые только мешают читать отчет
+_NOISE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def read_rss_kb() -> int | None:
+    """Текущий RSS процесса в килобайтах (только Linux)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+# В tracemalloc.Traceback кадры идут от самого старого к месту выделения (последний)
+def _location(frame: tracemalloc.Frame) -> str:
+    filename = frame.filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    # Для key_type="filename" номера строки нет
+    return f"{filename}:{frame.lineno}" if frame.lineno else filename
+
+
+def _kb(size: int) -> float:
+    return round(size / 1024, 1)
+
+
+class MemoryDiagnostics:
+    """Управление tracemalloc и хранение снимков"""
+
+    def __init__(self, frames: int, max_snapshots: int):
+        self.frames = frames
+        self.max_snapshots = max_snapshots
+        self._snapshots: OrderedDict[int, tuple[float, tracemalloc.Snapshot]] = OrderedDict()
+        self._next_id = 1
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    # --- Управление ---
+
+    def start(self, frames: int | None = None) -> None:
+        if self.tracing:
+            return
+        self.frames = frames or self.frames
+        tracemalloc.start(self.frames)
+        log.info(f"🧠 tracemalloc запущен (глубина стека: {self.frames})")
+
+    def stop(self) -> None:
+        """Останавливает трассировку и освобождает снимки"""
+        if self.tracing:
+            tracemalloc.stop()
+            log.info("🧠 tracemalloc остановлен")
+        self._snapshots.clear()
+
+    def status(self) -> dict:
+        status = {
+            "tracing": self.tracing,
+            "frames": tracemalloc.get_traceback_limit() if self.tracing else self.frames,
+            "rss_kb": read_rss_kb(),
+            "snapshots": [
+                {"id": snapshot_id, "taken_at": taken_at}
+                for snapshot_id, (taken_at, _) in self._snapshots.items()
+            ],
+        }
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update({
+                "traced_kb": _kb(current),
+                "traced_peak_kb": _kb(peak),
+                # Память, которую тратит сам tracemalloc
+                "overhead_kb": _kb(tracemalloc.get_tracemalloc_memory()),
+            })
+        return status
+
+    # --- Снимки ---
+
+    def _require_tracing(self) -> None:
+        if not self.tracing:
+            raise RuntimeError("tracemalloc не запущен")
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        try:
+            return self._snapshots[snapshot_id][1]
+        except KeyError:
+            raise LookupError(f"Снимок {snapshot_id} не найден") from None
+
+    async def take_snapshot(self) -> int:
+        """
+        Снимает снимок (в отдельном потоке — на больших кучах это заметное время).
+
+        :return: ID снимка
+        """
+        self._require_tracing()
+        snapshot = await asyncio.to_thread(lambda: tracemalloc.take_snapshot().filter_traces(_NOISE_FILTERS))
+
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self._snapshots[snapshot_id] = (time.time(), snapshot)
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return snapshot_id
+
+    async def top(self, snapshot_id: int | None = None, key_type: str = "lineno", limit: int = 20) -> dict:
+        """Самые крупные места выделения памяти (по умолчанию — в новом снимке)"""
+        if snapshot_id is None:
+            snapshot_id = await self.take_snapshot()
+        snapshot = self._get(snapshot_id)
+
+        stats = await asyncio.to_thread(snapshot.statistics, key_type)
+        return {
+            "snapshot": snapshot_id,
+            "key_type": key_type,
+            "total_kb": _kb(sum(stat.size for stat in stats)),
+            "top": [
+                {
+                    "location": _location(stat.traceback[-1]),
+                    "size_kb": _kb(stat.size),
+                    "count": stat.count,
+                    **({"traceback": [_location(frame) for frame in stat.traceback]}
+                       if key_type == "traceback" else {}),
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    async def diff(self, base_id: int, target_id: int | None = None, key_type: str = "lineno",
+                   limit: int = 20) -> dict:
+        """Что выросло между двумя снимками (target по умолчанию — новый снимок)"""
+        base = self._get(base_id)
+        if target_id is None:
+            target_id = await self.take_snapshot()
+        target = self._get(target_id)
+
+        stats = await asyncio.to_thread(target.compare_to, base, key_type)
+        return {
+            "base": base_id,
+            "target": target_id,
+            "key_type": key_type,
+            "total_diff_kb": _kb(sum(stat.size_diff for stat in stats)),
+            "top": [
+                {
+                    "location": _location(stat.traceback[-1]),
+                    "size_kb": _kb(stat.size),
+                    "size_diff_kb": _kb(stat.size_diff),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                    **({"traceback": [_location(frame) for frame in stat.traceback]}
+                       if key_type == "traceback" else {}),
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+
+memory_diagnostics = MemoryDiagnostics(MEMORY_TRACE_FRAMES, MEMORY_MAX_SNAPSHOTS)
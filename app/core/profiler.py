@@ -0,0 +1,259 @@
+# app/core/profiler.py
+"""
+Сэмплирующий профилировщик обработки webhook'ов (включается по требованию).
+
+Когда профилирование включено, отдельный поток каждые PROFILE_INTERVAL_MS
+снимает стек event loop'а для каждого активного вызова:
+- если корутина вызова сейчас выполняется — берется реальный стек (CPU);
+- если она ждет (сеть, очередь) — цепочка await'ов с пометкой [await].
+
+Сохраняется каждый N-й вызов и любой вызов дольше порога. Результат —
+"свернутые" стеки (collapsed/folded: 'a;b;c 12'), их понимают flamegraph.pl,
+speedscope и inferno. Рядом пишется .json с метаданными (событие, delivery ID,
+длительность). Каталог ротируется: хранятся последние PROFILE_MAX_FILES профилей.
+
+Webhook профилируется двумя вызовами: прием (profile_webhook, stage=webhook — до записи
+в outbox и ответа GitHub'у) и фоновая отправка (BackgroundDelivery, stage=delivery —
+полосы, лимит чата, aiogram). Сэмплируется только поток event loop'а: разбор и
+форматирование в пуле процессов (OFFLOAD_WORKERS) видны как ожидание future, без стека.
+
+Когда профилирование выключено, обертка стоит одну проверку флага.
+"""
+import asyncio
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Any, Awaitable, Callable, Coroutine
+
+from loguru import logger as log
+
+from app.core.config import (
+    PROFILE_ENABLED,
+    PROFILE_SAMPLE_EVERY,
+    PROFILE_SLOW_MS,
+    PROFILE_DIR,
+    PROFILE_MAX_FILES,
+    PROFILE_INTERVAL_MS,
+)
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        # Для библиотек достаточно пакета и файла
+        filename = "/".join(Path(filename).parts[-2:])
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+def _safe_name(value: Any) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(value))
+
+
+class _Session:
+    __slots__ = ("coro", "samples", "thread_id")
+
+    def __init__(self, coro: Coroutine, thread_id: int):
+        self.coro = coro
+        self.samples: Counter = Counter()
+        self.thread_id = thread_id
+
+
+class SamplingProfiler:
+    """Профилирует выбранные вызовы, сэмплируя стек из фонового потока"""
+
+    def __init__(self, enabled: bool, sample_every: int, slow_ms: float, directory: str,
+                 max_files: int, interval_ms: float):
+        self.sample_every = sample_every
+        self.slow_ms = slow_ms
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.interval = interval_ms / 1000
+        self.enabled = False
+        self.calls = 0
+        self.saved = 0
+        # Номер записи: профили, снятые в одну миллисекунду, не затирают друг друга
+        self._sequence = 0
+        self._sessions: set[_Session] = set()
+        self._thread: threading.Thread | None = None
+        self._write_lock = threading.Lock()
+        if enabled:
+            self.enable()
+
+    # --- Управление ---
+
+    def enable(self) -> None:
+        self.enabled = True
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._sample_loop, name="webhook-profiler", daemon=True)
+            self._thread.start()
+        log.info(f"🔬 Профилирование включено: 1 из {self.sample_every}, медленнее {self.slow_ms} мс → {self.directory}")
+
+    def disable(self) -> None:
+        self.enabled = False
+        log.info("🔬 Профилирование выключено")
+
+    def configure(self, enabled: bool | None = None, sample_every: int | None = None,
+                  slow_ms: float | None = None) -> None:
+        if sample_every is not None:
+            self.sample_every = sample_every
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if enabled is True:
+            self.enable()
+        elif enabled is False:
+            self.disable()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_every": self.sample_every,
+            "slow_ms": self.slow_ms,
+            "interval_ms": self.interval * 1000,
+            "directory": str(self.directory),
+            "calls": self.calls,
+            "saved": self.saved,
+            "active": len(self._sessions),
+        }
+
+    # --- Сэмплирование ---
+
+    def _sample_loop(self) -> None:
+        while self.enabled:
+            if self._sessions:
+                frames = sys._current_frames()
+                for session in list(self._sessions):
+                    try:
+                        session.samples[self._stack(session, frames.get(session.thread_id))] += 1
+                    except Exception:
+                        # Стек меняется прямо во время чтения — пропускаем сэмпл
+                        pass
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _stack(session: _Session, thread_frame: FrameType | None) -> str:
+        coro = session.coro
+        root = coro.cr_frame
+
+        if coro.cr_running and thread_frame is not None:
+            # Корутина выполняется: берем стек потока от листа до нашей корутины
+            frames = []
+            frame = thread_frame
+            while frame is not None and frame is not root:
+                frames.append(frame)
+                frame = frame.f_back
+            if frame is root:
+                frames.append(root)
+                return ";".join(_frame_label(f) for f in reversed(frames))
+
+        # Корутина ждет: идем по цепочке await'ов
+        labels = []
+        awaitable: Any = coro
+        while awaitable is not None and getattr(awaitable, "cr_frame", None) is not None:
+            labels.append(_frame_label(awaitable.cr_frame))
+            awaitable = awaitable.cr_await
+        if awaitable is not None:
+            labels.append(f"[await {type(awaitable).__name__}]")
+        else:
+            labels.append("[await]")
+        return ";".join(labels)
+
+    # --- Запуск ---
+
+    def should_sample(self) -> bool:
+        """Каждый N-й вызов профилируется гарантированно"""
+        self.calls += 1
+        return self.sample_every > 0 and self.calls % self.sample_every == 0
+
+    async def run(self, coro: Coroutine, metadata: dict) -> Any:
+        """Выполняет корутину под профилировщиком и сохраняет профиль, если нужно"""
+        sampled = self.should_sample()
+        session = _Session(coro, threading.get_ident())
+        self._sessions.add(session)
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self._sessions.discard(session)
+            duration_ms = (time.perf_counter() - started) * 1000
+            slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+            if (sampled or slow) and session.samples:
+                metadata = {
+                    **metadata,
+                    "reason": "slow" if slow else "sampled",
+                    "duration_ms": round(duration_ms, 2),
+                    "samples": sum(session.samples.values()),
+                    "interval_ms": self.interval * 1000,
+                    "created_at": time.time(),
+                }
+                # Запись на диск — в пуле потоков, не задерживая ответ
+                asyncio.get_running_loop().run_in_executor(None, self._write, session.samples, metadata)
+
+    def _write(self, samples: Counter, metadata: dict) -> None:
+        with self._write_lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                created_at = metadata["created_at"]
+                self._sequence += 1
+                stamp = (
+                    f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(created_at))}"
+                    f"-{int(created_at % 1 * 1000):03d}-{self._sequence:06d}"
+                )
+                base = self.directory / (
+                    f"{stamp}_{_safe_name(metadata.get('event'))}_{_safe_name(metadata.get('delivery_id'))}"
+                )
+
+                folded = "\n".join(f"{stack} {count}" for stack, count in samples.most_common())
+                base.with_suffix(".folded").write_text(folded + "\n", encoding="utf-8")
+                base.with_suffix(".json").write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
+                self.saved += 1
+                self._rotate()
+            except OSError as e:
+                log.error(f"Не удалось сохранить профиль: {e}")
+
+    def _rotate(self) -> None:
+        profiles = sorted(self.directory.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+        for path in profiles[:max(0, len(profiles) - self.max_files)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+
+
+profiler = SamplingProfiler(
+    enabled=PROFILE_ENABLED,
+    sample_every=PROFILE_SAMPLE_EVERY,
+    slow_ms=PROFILE_SLOW_MS,
+    directory=PROFILE_DIR,
+    max_files=PROFILE_MAX_FILES,
+    interval_ms=PROFILE_INTERVAL_MS,
+)
+
+
+def profile_webhook(func: Callable[..., Awaitable[Any]]):
+    """
+    Декоратор для process_github_payload(request): профилирует вызов,
+    если профилирование включено. Выключенное стоит одну проверку флага.
+    """
+    @functools.wraps(func)
+    async def wrapper(request, *args, **kwargs):
+        if not profiler.enabled:
+            return await func(request, *args, **kwargs)
+        metadata = {
+            "event": request.headers.get("X-GitHub-Event"),
+            "delivery_id": request.headers.get("X-GitHub-Delivery"),
+            "content_length": request.headers.get("Content-Length"),
+            "stage": "webhook",
+        }
+        return await profiler.run(func(request, *args, **kwargs), metadata)
+
+    return wrapper
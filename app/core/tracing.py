@@ -0,0 +1,132 @@
+# app/core/tracing.py
+"""
+Трассировка OpenTelemetry: прием → подпись → фильтры → валидация →
+форматирование → очередь → bot.send_message.
+
+Экспорт включается TRACING_EXPORTER:
+- "otlp" — в локальный OTLP коллектор (HTTP, TRACING_OTLP_ENDPOINT);
+- "file" — JSON-строки в TRACING_FILE;
+- пусто — трассировка выключена (спаны no-op).
+
+Если пакеты opentelemetry не установлены, все функции модуля — заглушки.
+"""
+import os
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any, Iterator
+
+from loguru import logger as log
+
+from app.core.config import (
+    TRACING_EXPORTER,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_FILE,
+    TRACING_SERVICE_NAME,
+)
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import Link
+except ImportError:  # opentelemetry не установлен — трассировка недоступна
+    trace = None
+    Link = None
+
+# До настройки провайдера это прокси, который ничего не записывает
+_tracer = trace.get_tracer("telegram-notifier") if trace else None
+_provider = None
+# Спан без трассировки: общий и пустой (спаны открыты, пока сообщение ждет в очереди)
+_NO_SPAN = nullcontext()
+
+
+def setup_tracing() -> None:
+    """Настраивает провайдер и экспортер (вызывается при старте приложения)"""
+    global _provider
+
+    if not TRACING_EXPORTER:
+        return
+    if trace is None:
+        log.warning("⚠️ TRACING_EXPORTER задан, но opentelemetry не установлен. Трассировка выключена.")
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=TRACING_OTLP_ENDPOINT)
+        target = TRACING_OTLP_ENDPOINT
+    elif TRACING_EXPORTER == "file":
+        os.makedirs(os.path.dirname(TRACING_FILE) or ".", exist_ok=True)
+        exporter = ConsoleSpanExporter(
+            out=open(TRACING_FILE, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+        target = TRACING_FILE
+    else:
+        log.error(f"❌ Неизвестный TRACING_EXPORTER: {TRACING_EXPORTER} (ожидается otlp или file)")
+        return
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    log.info(f"🛰 Трассировка включена: {TRACING_EXPORTER} → {target}")
+
+
+def shutdown_tracing() -> None:
+    """Досылает накопленные спаны при остановке"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def _clean(attributes: dict) -> dict:
+    # OpenTelemetry не принимает None в атрибутах
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+def _recording() -> bool:
+    # Пока провайдер не задан (ни нами, ни автоинструментацией), трейсер — прокси без записи
+    return trace is not None and not isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider)
+
+
+def span(name: str, links: list | None = None, **attributes: Any) -> AbstractContextManager[Any]:
+    """
+    Открывает спан как текущий. Атрибуты передаются именованными аргументами,
+    точки в именах записываются через двойное подчеркивание: github__event -> github.event.
+    Без трассировки возвращает пустой контекст (as -> None).
+    """
+    if not _recording():
+        return _NO_SPAN
+    return _span(name, links, attributes)
+
+
+@contextmanager
+def _span(name: str, links: list | None, attributes: dict) -> Iterator[Any]:
+    attributes = {key.replace("__", "."): value for key, value in attributes.items()}
+    with _tracer.start_as_current_span(name, links=links, attributes=_clean(attributes)) as current:
+        yield current
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Добавляет атрибуты к текущему спану (имена как в span())"""
+    if trace is None:
+        return
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(_clean({key.replace("__", "."): value for key, value in attributes.items()}))
+
+
+def add_event(name: str, **attributes: Any) -> None:
+    """Событие внутри текущего спана (например, повтор после 429)"""
+    if trace is None:
+        return
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.add_event(name, _clean({key.replace("__", "."): value for key, value in attributes.items()}))
+
+
+def current_link() -> Any:
+    """Ссылка на текущий спан — для склеенных батчей, где у сообщений разные трейсы"""
+    if trace is None:
+        return None
+    context = trace.get_current_span().get_span_context()
+    return Link(context) if context.is_valid else None
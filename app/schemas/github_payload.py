@@ -1,6 +1,21 @@
 # app/schemas/github_payload.py
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, ConfigDict
+from typing import Optional, List, Dict, Any, Tuple
+from pydantic import BaseModel, ConfigDict, model_validator
+
+# Сколько коммитов push'а превращаем в модели (столько же показывает форматтер)
+PUSH_COMMITS_PREVIEW = 5
+# Сколько коммитов всего доступно по кнопке «Показать полностью» (остальные — без моделей)
+PUSH_COMMITS_DETAIL = 100
+# Длина заголовка коммита в подробностях
+COMMIT_TITLE_DETAIL = 120
+
+
+def _commit_title(commit: Any) -> Tuple[str, str] | None:
+    """(короткий хеш, первая строка сообщения) без построения модели коммита"""
+    if not isinstance(commit, dict):
+        return None
+    message = commit.get("message") or ""
+    return str(commit.get("id") or "")[:7], message.split("\n", 1)[0][:COMMIT_TITLE_DETAIL]
 
 # --- Базовая модель (если ты её уже внедрил, используй её, иначе ConfigDict в каждой) ---
 class GitHubBaseModel(BaseModel):
@@ -21,6 +36,7 @@ class Repository(GitHubBaseModel):
 
 class PullRequest(GitHubBaseModel):
     html_url: str
+    number: Optional[int] = None
     title: str
     state: str
     body: Optional[str] = None
@@ -58,11 +74,17 @@ class Comment(GitHubBaseModel):
     user: GitHubUser
     created_at: Optional[str] = None
 
+class CheckSuite(GitHubBaseModel):
+    head_branch: Optional[str] = None
+
 class CheckRun(GitHubBaseModel):
+    id: Optional[int] = None
     name: str
     status: str
     conclusion: Optional[str] = None
     html_url: str
+    head_sha: Optional[str] = None
+    check_suite: Optional[CheckSuite] = None
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
 
@@ -89,9 +111,33 @@ class GitHubPushPayload(GitHubBaseModel):
     repository: Repository
     pusher: GitHubPusher
     sender: GitHubUser
+    # Только первые PUSH_COMMITS_PREVIEW коммитов, остальные не валидируем
     commits: List[Commit]
+    # Общее число коммитов в push (может быть сотни и тысячи)
+    commits_count: int = 0
+    # (хеш, заголовок) коммитов после первых PUSH_COMMITS_PREVIEW — для подробностей
+    more_commits: List[Tuple[str, str]] = []
     head_commit: Optional[Commit] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def limit_commits(cls, data: Any) -> Any:
+        """
+        Большие merge/mirror push'и несут сотни коммитов с длинными сообщениями.
+        Модели строим только для тех, что попадут в сообщение, у следующих
+        (до PUSH_COMMITS_DETAIL) берем хеш и заголовок, а остальные лишь считаем.
+        """
+        if isinstance(data, dict) and "commits_count" not in data:
+            commits = data.get("commits") or []
+            more = (_commit_title(commit) for commit in commits[PUSH_COMMITS_PREVIEW:PUSH_COMMITS_DETAIL])
+            data = {
+                **data,
+                "commits": commits[:PUSH_COMMITS_PREVIEW],
+                "commits_count": len(commits),
+                "more_commits": [title for title in more if title is not None],
+            }
+        return data
+
 class GitHubPullRequestReviewPayload(GitHubBaseModel):
     action: str
     review: Review
@@ -0,0 +1,211 @@
+# app/services/batch_ingest.py
+"""
+Пакетный прием webhook'ов в формате NDJSON (ретрансляция из GitHub Enterprise,
+дозагрузка после простоя).
+
+Каждая строка — одна доставка:
+
+    {"event": "push", "delivery_id": "...", "signature": "sha256=...", "body": "<исходное тело>"}
+
+- body — исходное тело запроса строкой: подпись проверяется именно по нему.
+  Объект JSON допустим только без GITHUB_WEBHOOK_SECRET;
+- записи читаются из потока по одной, весь запрос в памяти не держится;
+- подготовка (фильтры, валидация, форматирование) идет параллельно,
+  а в фоновую отправку (outbox, как у обычного webhook'а) записи передаются
+  строго в порядке строк, чтобы "PR opened" не обогнал "PR merged";
+- ответ не ждет Telegram: статус записи — queued, ignored или error;
+- не больше BATCH_INGEST_MAX_PENDING записей в подготовке: пока очередь полна,
+  поток запроса не читается (обратное давление на клиента).
+"""
+import asyncio
+import json
+from collections import Counter
+from typing import Any, AsyncIterator
+
+from loguru import logger as log
+
+from app.core.config import GITHUB_WEBHOOK_SECRET, BATCH_INGEST_MAX_PENDING, BATCH_MAX_RECORD_BYTES
+from app.core.tracing import span
+from app.services.payload_offload import payload_offloader
+from app.services.webhook_service import (
+    PreparedNotification,
+    background_delivery,
+    is_signature_valid,
+    prepare_event,
+    remember_delivery,
+)
+
+
+class RecordError(ValueError):
+    """Запись пакета не разобрана или не прошла проверку подписи"""
+
+    def __init__(self, reason: str, delivery_id: str | None = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.delivery_id = delivery_id
+
+
+async def iter_lines(stream: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes | None]:
+    """
+    Режет поток байтов на строки. Строка длиннее max_bytes не накапливается:
+    вместо нее отдается None, остаток строки пропускается.
+    """
+    buffer = bytearray()
+    oversized = False
+    async for chunk in stream:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+            if oversized:
+                yield None
+            else:
+                buffer += chunk[start:end]
+                yield None if len(buffer) > max_bytes else bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+
+    if oversized:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def parse_record(line: bytes) -> tuple[str, str | None, Any]:
+    """
+    Разбирает строку пакета и проверяет подпись.
+
+    :return: (event_type, delivery_id, json_data). Для большого тела вместо JSON — исходные байты
+    :raises RecordError: Если запись некорректна
+    """
+    try:
+        record = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise RecordError("invalid_json")
+    if not isinstance(record, dict):
+        raise RecordError("invalid_record")
+
+    delivery_id = record.get("delivery_id")
+    event_type = record.get("event")
+    body = record.get("body")
+    if not isinstance(event_type, str) or body is None:
+        raise RecordError("missing_fields", delivery_id)
+
+    signature = record.get("signature")
+    if signature is not None and not isinstance(signature, str):
+        raise RecordError("invalid_signature", delivery_id)
+
+    if isinstance(body, str):
+        try:
+            raw = body.encode()
+        except UnicodeEncodeError:
+            # Одиночный суррогат (\ud800) в JSON-строке — таких байтов GitHub не присылает
+            raise RecordError("invalid_body", delivery_id)
+        if GITHUB_WEBHOOK_SECRET and not is_signature_valid(raw, signature):
+            raise RecordError("invalid_signature", delivery_id)
+        if payload_offloader and payload_offloader.should_offload(len(raw)):
+            # Большое тело разберет пул процессов
+            return event_type, delivery_id, raw
+        try:
+            json_data = json.loads(body)
+        except json.JSONDecodeError:
+            raise RecordError("invalid_body", delivery_id)
+    else:
+        # Без исходных байтов подпись проверить нельзя
+        if GITHUB_WEBHOOK_SECRET:
+            raise RecordError("body_must_be_string", delivery_id)
+        json_data = body
+
+    return event_type, delivery_id, json_data
+
+
+async def _prepare_record(line: bytes) -> tuple[str | None, PreparedNotification | dict]:
+    try:
+        event_type, delivery_id, json_data = parse_record(line)
+    except RecordError as e:
+        return e.delivery_id, {"status": "error", "reason": e.reason}
+    except Exception as e:
+        # Ошибка одной записи не должна останавливать весь пакет
+        log.exception(f"❌ Ошибка разбора записи пакета: {e}")
+        return None, {"status": "error", "reason": "exception"}
+
+    try:
+        with span("webhook.batch_record", github__event=event_type, github__delivery_id=delivery_id):
+            prepared = await prepare_event(event_type, json_data, delivery_id)
+        if isinstance(prepared, dict):
+            # Заглушено, не поддерживается или упало — событие все равно обработано
+            await remember_delivery(delivery_id, event_type, prepared)
+    except Exception as e:
+        log.exception(f"❌ Ошибка обработки записи пакета {delivery_id}: {e}")
+        return delivery_id, {"status": "error", "reason": "exception"}
+    return delivery_id, prepared
+
+
+async def ingest_ndjson(stream: AsyncIterator[bytes]) -> dict:
+    """
+    Обрабатывает NDJSON-поток доставок через общий конвейер EVENT_HANDLERS.
+
+    :return: Сводка по статусам и статус каждой записи
+    """
+    if not GITHUB_WEBHOOK_SECRET:
+        log.warning("⚠️ GITHUB_WEBHOOK_SECRET не задан! Подписи записей пакета не проверяются.")
+
+    results: list[dict | None] = []
+    slots = asyncio.Semaphore(BATCH_INGEST_MAX_PENDING)
+    # Подготовленные записи в порядке строк: (номер строки, задача подготовки)
+    ordered: asyncio.Queue = asyncio.Queue()
+
+    def finish(index: int, delivery_id: str | None, result: dict) -> None:
+        entry = {"line": index + 1, "delivery_id": delivery_id, "status": result.get("status")}
+        if result.get("reason"):
+            entry["reason"] = result["reason"]
+        results[index] = entry
+
+    async def sequencer() -> None:
+        # Передаем в отправку в порядке строк, даже если подготовка закончилась в другом
+        while (item := await ordered.get()) is not None:
+            index, task = item
+            # Слот освобождается, как только запись передана в фоновую отправку (или отброшена)
+            delivery_id = None
+            try:
+                try:
+                    delivery_id, prepared = await task
+                    if not isinstance(prepared, dict):
+                        prepared = await background_delivery.submit(prepared, delivery_id)
+                except Exception as e:
+                    log.exception(f"❌ Ошибка обработки записи пакета (строка {index + 1}): {e}")
+                    prepared = {"status": "error", "reason": "exception"}
+                finish(index, delivery_id, prepared)
+            finally:
+                slots.release()
+
+    sequencer_task = asyncio.create_task(sequencer())
+    try:
+        async for line in iter_lines(stream, BATCH_MAX_RECORD_BYTES):
+            if line is not None and not line.strip():
+                continue
+            await slots.acquire()
+            index = len(results)
+            results.append(None)
+            if line is None:
+                finish(index, None, {"status": "error", "reason": "record_too_large"})
+                slots.release()
+                continue
+            await ordered.put((index, asyncio.create_task(_prepare_record(line))))
+
+        await ordered.put(None)
+        await sequencer_task
+    finally:
+        # Клиент оборвал поток — не оставляем висящих задач
+        sequencer_task.cancel()
+
+    summary = Counter(result["status"] for result in results if result)
+    log.info(f"📦 Пакет обработан: {len(results)} записей, {dict(summary)}")
+    return {"records": len(results), "summary": dict(summary), "results": results}
@@ -0,0 +1,273 @@
+# app/services/catchup.py
+"""
+Догрузка доставок, пропущенных за время простоя (деплой, падение).
+
+Пока приложение лежит, GitHub помечает доставки webhook'ов неуспешными и больше
+их не повторяет. При старте для каждого hook'а из CATCHUP_HOOKS:
+
+1. Листаем журнал доставок (GET .../hooks/{id}/deliveries) за последние
+   CATCHUP_LOOKBACK_HOURS — GitHub отдает его от новых к старым.
+2. Оставляем события, ни одна попытка доставки которых не была успешной
+   (повторные попытки одного события склеиваются по guid = X-GitHub-Delivery)
+   и которых нет в журнале обработанных доставок (event_store). Так не
+   повторяются события, которые мы обработали, но ответили GitHub'у слишком поздно.
+3. Забираем payload каждой доставки и прогоняем через тот же конвейер, что
+   и webhook (prepare_event и фоновая отправка через outbox), от старых к новым:
+   подготовка идет параллельно (не больше CATCHUP_CONCURRENCY), в отправку события
+   передаются строго по порядку. Догрузка не ждет Telegram и лимита частоты чата.
+
+Перед каждым запросом проверяется остаток лимита GitHub API: если осталось
+не больше CATCHUP_RATE_RESERVE, догрузка ждет его сброса.
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime
+
+from loguru import logger as log
+
+from app.core.config import (
+    CATCHUP_HOOKS,
+    CATCHUP_LOOKBACK_HOURS,
+    CATCHUP_CONCURRENCY,
+    CATCHUP_MAX_DELIVERIES,
+    CATCHUP_RATE_RESERVE,
+    GITHUB_API_URL,
+    GITHUB_TOKEN,
+)
+from app.core.tracing import span
+from app.services.event_store import EventStore, event_store
+from app.services.github_api import GitHubAPI
+from app.services.webhook_service import (
+    EVENT_HANDLERS,
+    BackgroundDelivery,
+    PreparedNotification,
+    background_delivery,
+    prepare_event,
+    remember_delivery,
+)
+
+# Максимальный размер страницы журнала доставок в GitHub API
+PAGE_SIZE = 100
+
+
+def hook_path(spec: str) -> str | None:
+    """owner/repo:123 -> /repos/owner/repo/hooks/123, org:456 -> /orgs/org/hooks/456"""
+    target, _, hook_id = spec.rpartition(":")
+    if not target or not hook_id.isdigit():
+        return None
+    return f"/{'repos' if '/' in target else 'orgs'}/{target}/hooks/{hook_id}"
+
+
+def _timestamp(value: str | None) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class MissedDelivery:
+    """Событие, которое GitHub так и не смог доставить"""
+    __slots__ = ("hook", "attempt_id", "guid", "event", "delivered_at")
+
+    def __init__(self, hook: str, attempt_id: int, guid: str, event: str, delivered_at: float):
+        self.hook = hook
+        # id последней попытки — по нему забирается payload
+        self.attempt_id = attempt_id
+        self.guid = guid
+        self.event = event
+        # Время первой попытки — по нему события идут от старых к новым
+        self.delivered_at = delivered_at
+
+
+class CatchUp:
+    """Поиск и повторная обработка пропущенных доставок"""
+
+    def __init__(self, api: GitHubAPI, store: EventStore, hooks: list[str], lookback_hours: float,
+                 concurrency: int, max_deliveries: int, rate_reserve: int,
+                 delivery: BackgroundDelivery = background_delivery):
+        self.api = api
+        self.store = store
+        self.delivery = delivery
+        self.hooks = hooks
+        self.lookback = lookback_hours * 3600
+        self.concurrency = concurrency
+        self.max_deliveries = max_deliveries
+        self.rate_reserve = rate_reserve
+        self.counters: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.finished_at: float | None = None
+
+    # --- Лимит API ---
+
+    async def _pace(self) -> None:
+        """Лимит почти исчерпан — ждем сброса, оставляя запас обогащению"""
+        remaining, reset = self.api.rate_limit_remaining, self.api.rate_limit_reset
+        if remaining is None or remaining > self.rate_reserve or reset is None:
+            return
+        delay = reset - time.time()
+        if delay > 0:
+            self.counters["rate_limit_waits"] += 1
+            log.warning(f"⏳ Догрузка: осталось {remaining} запросов к GitHub API, ждем сброса лимита {delay:.0f} сек")
+            await asyncio.sleep(delay + 1)
+
+    # --- Поиск пропущенных ---
+
+    async def _list_missed(self, hook: str) -> list[MissedDelivery]:
+        cutoff = time.time() - self.lookback
+        attempts: dict[str, list[dict]] = {}
+        listed = 0
+        url: str | None = f"{hook}/deliveries?per_page={PAGE_SIZE}"
+
+        while url and listed < self.max_deliveries:
+            await self._pace()
+            page, url = await self.api.get_page(url)
+            if not isinstance(page, list):
+                log.error(f"❌ Догрузка: не удалось получить журнал доставок {hook}")
+                self.counters["errors"] += 1
+                break
+            for attempt in page:
+                attempt["_at"] = _timestamp(attempt.get("delivered_at"))
+                if attempt["_at"] < cutoff:
+                    url = None
+                    break
+                attempts.setdefault(attempt.get("guid"), []).append(attempt)
+                listed += 1
+        self.counters["listed"] += listed
+
+        missed = []
+        for guid, group in attempts.items():
+            if not guid or any(200 <= (attempt.get("status_code") or 0) < 300 for attempt in group):
+                continue
+            latest = max(group, key=lambda attempt: attempt["_at"])
+            missed.append(MissedDelivery(
+                hook, latest["id"], guid, latest.get("event"), min(attempt["_at"] for attempt in group)
+            ))
+        return missed
+
+    # --- Повторная обработка ---
+
+    async def _prepare(self, delivery: MissedDelivery) -> PreparedNotification | dict | None:
+        await self._pace()
+        detail, _ = await self.api.get_page(f"{delivery.hook}/deliveries/{delivery.attempt_id}")
+        request = detail.get("request") if isinstance(detail, dict) else None
+        payload = request.get("payload") if isinstance(request, dict) else None
+        if payload is None:
+            log.error(f"❌ Догрузка: не удалось получить payload доставки {delivery.guid}")
+            return None
+
+        with span("catchup.delivery", github__event=delivery.event, github__delivery_id=delivery.guid):
+            return await prepare_event(delivery.event, payload, delivery.guid)
+
+    async def _replay(self, missed: list[MissedDelivery]) -> None:
+        slots = asyncio.Semaphore(self.concurrency)
+        # Подготовленные доставки в порядке времени: (доставка, задача подготовки)
+        ordered: asyncio.Queue = asyncio.Queue()
+
+        async def sequencer() -> None:
+            while (item := await ordered.get()) is not None:
+                delivery, task = item
+                # Слот освобождается, как только доставка передана в фоновую отправку (или отброшена)
+                try:
+                    try:
+                        prepared = await task
+                        if isinstance(prepared, PreparedNotification):
+                            prepared = await self.delivery.submit(prepared, delivery.guid)
+                    except Exception as e:
+                        log.exception(f"❌ Догрузка: ошибка обработки доставки {delivery.guid}: {e}")
+                        prepared = None
+                    if prepared is None:
+                        # Не отмечаем: следующий запуск попробует снова
+                        self.counters["errors"] += 1
+                        continue
+                    self.statuses[prepared.get("status")] += 1
+                    if prepared.get("status") != "queued":
+                        # Поставленные в отправку отметит BackgroundDelivery после отправки
+                        await remember_delivery(delivery.guid, delivery.event, prepared)
+                finally:
+                    slots.release()
+
+        sequencer_task = asyncio.create_task(sequencer())
+        try:
+            for delivery in missed:
+                await slots.acquire()
+                await ordered.put((delivery, asyncio.create_task(self._prepare(delivery))))
+            await ordered.put(None)
+            await sequencer_task
+        finally:
+            sequencer_task.cancel()
+
+    # --- Запуск ---
+
+    async def run(self) -> dict:
+        started = time.monotonic()
+        missed: list[MissedDelivery] = []
+        for hook in self.hooks:
+            missed += await self._list_missed(hook)
+        self.counters["failed"] += len(missed)
+
+        guids = [delivery.guid for delivery in missed]
+        processed = await self.store.processed_deliveries(guids)
+        # Уже лежат в outbox (догружены, но не отправлены до остановки) — уйдут при replay
+        processed |= {row["delivery_id"] for row in await self.store.pending_outbox()} & set(guids)
+        missed = [delivery for delivery in missed if delivery.guid not in processed]
+        # События, которые мы не обрабатываем (ping, star...), не стоят запроса payload'а
+        unsupported = [delivery for delivery in missed if delivery.event not in EVENT_HANDLERS]
+        missed = sorted(
+            (delivery for delivery in missed if delivery.event in EVENT_HANDLERS),
+            key=lambda delivery: delivery.delivered_at,
+        )
+        self.counters["already_processed"] += len(processed)
+        self.counters["unsupported"] += len(unsupported)
+        self.counters["missed"] += len(missed)
+
+        if missed:
+            log.info(f"📥 Догрузка: пропущено доставок — {len(missed)}, обрабатываем от старых к новым")
+            await self._replay(missed)
+
+        self.finished_at = time.time()
+        log.info(
+            f"📥 Догрузка завершена за {time.monotonic() - started:.1f} сек: {dict(self.counters)}, "
+            f"статусы: {dict(self.statuses)}"
+        )
+        return self.stats()
+
+    def stats(self) -> dict:
+        return {
+            "hooks": self.hooks,
+            "lookback_hours": self.lookback / 3600,
+            "finished_at": self.finished_at,
+            **self.counters,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "rate_limit_remaining": self.api.rate_limit_remaining,
+        }
+
+    async def close(self) -> None:
+        await self.api.close()
+
+
+def _create_catchup() -> CatchUp | None:
+    if not CATCHUP_HOOKS:
+        return None
+    if event_store is None:
+        log.warning("⚠️ CATCHUP_HOOKS задан, но хранилище событий выключено — догрузка невозможна")
+        return None
+
+    hooks = []
+    for spec in CATCHUP_HOOKS:
+        path = hook_path(spec)
+        if path is None:
+            log.error(f"❌ CATCHUP_HOOKS: '{spec}' — ожидается owner/repo:hook_id или org:hook_id")
+        else:
+            hooks.append(path)
+    if not GITHUB_TOKEN:
+        log.warning("⚠️ GITHUB_TOKEN не задан — журнал доставок GitHub без токена недоступен")
+
+    # Кэш не нужен: журнал и payload'ы запрашиваются по одному разу
+    api = GitHubAPI(GITHUB_API_URL, GITHUB_TOKEN, cache_size=0, ttl=0)
+    return CatchUp(api, event_store, hooks, CATCHUP_LOOKBACK_HOURS, CATCHUP_CONCURRENCY,
+                   CATCHUP_MAX_DELIVERIES, CATCHUP_RATE_RESERVE)
+
+
+# Общий экземпляр (None, если CATCHUP_HOOKS пуст)
+catchup = _create_catchup()
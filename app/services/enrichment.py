@@ -0,0 +1,118 @@
+# app/services/enrichment.py
+"""
+Обогащение уведомлений данными из GitHub API (между валидацией и форматированием).
+
+- pull_request: статистика изменений (+/-, файлы, коммиты);
+- check_run (failure): упавший шаг GitHub Actions;
+- release: файлы релиза и их размеры.
+
+Все запросы события укладываются в бюджет ENRICHMENT_BUDGET_MS: если API
+медленный, уведомление уходит без дополнительных данных, а начатые запросы
+дозаполняют кэш в фоне.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from loguru import logger as log
+
+from app.core.config import (
+    ENRICHMENT_ENABLED,
+    ENRICHMENT_BUDGET_MS,
+    ENRICHMENT_CACHE_SIZE,
+    ENRICHMENT_CACHE_TTL_SECONDS,
+    GITHUB_API_URL,
+    GITHUB_TOKEN,
+)
+from app.schemas.github_payload import (
+    GitHubPullRequestPayload,
+    GitHubCheckRunPayload,
+    GitHubReleasePayload,
+)
+from app.services.github_api import GitHubAPI
+
+
+async def _enrich_pull_request(api: GitHubAPI, payload: GitHubPullRequestPayload) -> dict:
+    pr = payload.pull_request
+    if pr.number is None:
+        return {}
+    data = await api.get(f"/repos/{payload.repository.full_name}/pulls/{pr.number}")
+    if not isinstance(data, dict):
+        return {}
+    return {
+        "additions": data.get("additions"),
+        "deletions": data.get("deletions"),
+        "changed_files": data.get("changed_files"),
+        "commits": data.get("commits"),
+    }
+
+
+async def _enrich_check_run(api: GitHubAPI, payload: GitHubCheckRunPayload) -> dict:
+    check = payload.check_run
+    # Для GitHub Actions id проверки совпадает с id job'а
+    if check.conclusion != "failure" or check.id is None:
+        return {}
+    data = await api.get(f"/repos/{payload.repository.full_name}/actions/jobs/{check.id}")
+    if not isinstance(data, dict):
+        return {}
+    for step in data.get("steps") or []:
+        if step.get("conclusion") == "failure":
+            return {"failed_step": step.get("name")}
+    return {}
+
+
+async def _enrich_release(api: GitHubAPI, payload: GitHubReleasePayload) -> dict:
+    release = payload.release
+    data = await api.get(f"/repos/{payload.repository.full_name}/releases/tags/{release.tag_name}")
+    if not isinstance(data, dict):
+        return {}
+    assets = [
+        {"name": asset.get("name"), "size": asset.get("size") or 0}
+        for asset in data.get("assets") or []
+    ]
+    return {"assets": assets} if assets else {}
+
+
+# Event Name -> функция обогащения
+ENRICHERS: dict[str, Callable[[GitHubAPI, Any], Awaitable[dict]]] = {
+    "pull_request": _enrich_pull_request,
+    "check_run": _enrich_check_run,
+    "release": _enrich_release,
+}
+
+
+class Enricher:
+    """Запускает обогащение события в пределах бюджета времени"""
+
+    def __init__(self, api: GitHubAPI, budget_ms: float):
+        self.api = api
+        self.budget = budget_ms / 1000
+        self.timeouts = 0
+
+    async def enrich(self, event_type: str, payload: Any) -> dict:
+        """
+        :return: Дополнительные данные для форматтера (пустой словарь — без обогащения)
+        """
+        enricher = ENRICHERS.get(event_type)
+        if enricher is None:
+            return {}
+        try:
+            return await asyncio.wait_for(enricher(self.api, payload), self.budget)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warning(f"⏱ Обогащение {event_type} не уложилось в {self.budget * 1000:.0f} мс, отправляем без него")
+        except Exception as e:
+            log.exception(f"Ошибка обогащения {event_type}: {e}")
+        return {}
+
+    def stats(self) -> dict:
+        return {"budget_ms": self.budget * 1000, "timeouts": self.timeouts, **self.api.stats()}
+
+    async def close(self) -> None:
+        await self.api.close()
+
+
+# Общий экземпляр (None, если обогащение выключено)
+enricher = Enricher(
+    GitHubAPI(GITHUB_API_URL, GITHUB_TOKEN, ENRICHMENT_CACHE_SIZE, ENRICHMENT_CACHE_TTL_SECONDS),
+    ENRICHMENT_BUDGET_MS,
+) if ENRICHMENT_ENABLED else None
@@ -0,0 +1,72 @@
+# app/services/event_keys.py
+"""
+Признаки события, которые вычисляются по валидированному payload'у:
+ключ порядка, срочность и ключ подавления повторов.
+
+Модуль не тянет за собой бота и очереди отправки, поэтому используется
+и в процессах пула разбора больших payload'ов (см. payload_offload).
+"""
+from app.schemas.github_payload import (
+    GitHubPullRequestPayload,
+    GitHubPushPayload,
+    GitHubIssueCommentPayload,
+    GitHubPullRequestReviewPayload,
+    GitHubIssuesPayload,
+    GitHubCheckRunPayload,
+    GitHubReleasePayload,
+)
+
+
+def get_ordering_key(payload) -> str | None:
+    """
+    Ключ сущности (PR, Issue, ветка, проверка), внутри которой важен порядок сообщений.
+    Например, "PR opened" не должен прийти после "PR merged".
+    """
+    repo = payload.repository.full_name
+
+    if isinstance(payload, (GitHubPullRequestPayload, GitHubPullRequestReviewPayload)):
+        return payload.pull_request.html_url
+    if isinstance(payload, (GitHubIssuesPayload, GitHubIssueCommentPayload)):
+        # Для комментариев к PR issue.html_url совпадает с адресом PR
+        return payload.issue.html_url
+    if isinstance(payload, GitHubPushPayload):
+        return f"{repo}:{payload.ref}"
+    if isinstance(payload, GitHubCheckRunPayload):
+        return f"{repo}:{payload.check_run.name}"
+    return None
+
+
+def is_urgent(payload) -> bool:
+    """Срочные события отправляются сразу, без ожидания окна батчинга"""
+    if isinstance(payload, GitHubCheckRunPayload):
+        return payload.check_run.conclusion == "failure"
+    return isinstance(payload, GitHubReleasePayload)
+
+
+def get_repeat_subject(payload) -> tuple[tuple, str, str, str] | None:
+    """
+    Что считать повтором: (ключ, подпись для сводки, исход, ссылка). None — событие не подавляется.
+
+    - Проверка: перезапуски одной проверки на одном коммите (head_sha, без него — ветка),
+      завершившиеся тем же неуспешным исходом, — "упала, перезапустили, снова упала".
+      Успешные проверки и проверки других коммитов, веток и PR не подавляются никогда.
+    - Задача: задачу то закрывают, то переоткрывают. Ключ — сама задача, без действия:
+      первое изменение состояния отправляется, следующие в окне считаются, а сводка
+      сообщает, сколько раз состояние менялось и какое оно сейчас (исход — последнее действие).
+    """
+    repo = payload.repository.full_name
+
+    if isinstance(payload, GitHubCheckRunPayload):
+        check = payload.check_run
+        if (payload.action == "completed" and check.status == "completed"
+                and check.conclusion and check.conclusion != "success"):
+            branch = check.check_suite.head_branch if check.check_suite else None
+            revision = check.head_sha or branch
+            if revision:
+                where = f"{branch} @ {check.head_sha[:7]}" if branch and check.head_sha else revision[:7]
+                key = (repo, "check", check.name, revision, check.conclusion)
+                return key, f"Проверка «{check.name}» ({where})", check.conclusion, check.html_url
+    if isinstance(payload, GitHubIssuesPayload) and payload.action in ("closed", "reopened"):
+        issue = payload.issue
+        return (repo, "issue", issue.number), f"Задача #{issue.number}", payload.action, issue.html_url
+    return None
@@ -0,0 +1,355 @@
+# app/services/event_store.py
+"""
+Локальное индексированное хранилище событий GitHub (SQLite).
+
+Каждое событие, прошедшее валидацию, нормализуется в плоскую запись
+(репозиторий, сущность, номер, состояние, sha, ветка, время) и пишется в журнал.
+По журналу бот отвечает на команды /prs, /ci, /releases без похода в GitHub.
+Компакция удаляет старые записи, оставляя последнюю запись еще открытых PR и Issue.
+Отдельная таблица — обработанные доставки (X-GitHub-Delivery) для догрузки
+пропущенных событий после простоя (см. catchup).
+Таблица outbox — принятые, но еще не отправленные уведомления: webhook
+подтверждается после записи в нее, а отправка идет в фоне (см. webhook_service).
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from loguru import logger as log
+
+from app.core.config import EVENT_STORE_PATH, EVENT_STORE_RETENTION_DAYS
+from app.schemas.github_payload import (
+    GitHubPullRequestPayload,
+    GitHubPushPayload,
+    GitHubIssueCommentPayload,
+    GitHubPullRequestReviewPayload,
+    GitHubIssuesPayload,
+    GitHubCheckRunPayload,
+    GitHubReleasePayload,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    delivery_id TEXT,
+    kind        TEXT NOT NULL,
+    action      TEXT,
+    repo        TEXT NOT NULL COLLATE NOCASE,
+    entity      TEXT NOT NULL,
+    number      INTEGER,
+    state       TEXT,
+    sha         TEXT,
+    branch      TEXT,
+    title       TEXT,
+    url         TEXT,
+    actor       TEXT,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_events_entity ON events (repo, kind, entity, id);
+CREATE INDEX IF NOT EXISTS ix_events_number ON events (repo, kind, number);
+CREATE INDEX IF NOT EXISTS ix_events_state ON events (repo, kind, state);
+CREATE INDEX IF NOT EXISTS ix_events_branch ON events (repo, kind, branch, created_at);
+CREATE INDEX IF NOT EXISTS ix_events_sha ON events (sha);
+CREATE INDEX IF NOT EXISTS ix_events_time ON events (created_at);
+
+-- Обработанные доставки (X-GitHub-Delivery): по ним догрузка после простоя
+-- отличает пропущенные события от уже отправленных
+CREATE TABLE IF NOT EXISTS deliveries (
+    delivery_id  TEXT PRIMARY KEY,
+    event        TEXT,
+    status       TEXT,
+    processed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_deliveries_time ON deliveries (processed_at);
+
+-- Уведомления, подтвержденные GitHub'у, но еще не отправленные: запись удаляется
+-- после отправки, оставшиеся после падения отправляются при следующем старте
+CREATE TABLE IF NOT EXISTS outbox (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    delivery_id  TEXT,
+    event        TEXT NOT NULL,
+    message      TEXT NOT NULL,
+    ordering_key TEXT,
+    urgent       INTEGER NOT NULL,
+    repo         TEXT,
+    detail       TEXT,
+    created_at   REAL NOT NULL
+);
+"""
+
+# Колонки, добавленные после создания таблиц: (таблица, колонка, тип) — старые базы дополняются при открытии
+MIGRATIONS = (
+    ("outbox", "detail", "TEXT"),
+)
+
+# Сколько параметров передавать в один запрос IN (...) (лимит SQLite — 999)
+IN_CHUNK = 500
+
+COLUMNS = ("kind", "action", "repo", "entity", "number", "state", "sha", "branch", "title", "url", "actor")
+
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+def normalize_event(event_type: str, payload: Any) -> dict | None:
+    """
+    Превращает Pydantic payload в плоскую запись для хранилища.
+
+    :return: Словарь с полями COLUMNS или None, если событие не храним
+    """
+    repo = payload.repository.full_name
+    record = {"kind": event_type, "action": getattr(payload, "action", None), "repo": repo}
+
+    if isinstance(payload, GitHubPullRequestPayload):
+        pr = payload.pull_request
+        state = "merged" if pr.merged else pr.state
+        return {**record, "entity": f"pr:{pr.number or pr.html_url}", "number": pr.number, "state": state,
+                "title": pr.title, "url": pr.html_url, "actor": pr.user.login}
+
+    if isinstance(payload, GitHubPullRequestReviewPayload):
+        pr = payload.pull_request
+        return {**record, "entity": f"pr:{pr.number or pr.html_url}", "number": pr.number,
+                "state": payload.review.state.lower(), "title": pr.title, "url": payload.review.html_url,
+                "actor": payload.review.user.login}
+
+    if isinstance(payload, (GitHubIssuesPayload, GitHubIssueCommentPayload)):
+        issue = payload.issue
+        kind = "pr" if issue.pull_request is not None else "issue"
+        url = payload.comment.html_url if isinstance(payload, GitHubIssueCommentPayload) else issue.html_url
+        actor = payload.sender.login if isinstance(payload, GitHubIssueCommentPayload) else issue.user.login
+        return {**record, "entity": f"{kind}:{issue.number}", "number": issue.number, "state": issue.state,
+                "title": issue.title, "url": url, "actor": actor}
+
+    if isinstance(payload, GitHubCheckRunPayload):
+        check = payload.check_run
+        branch = check.check_suite.head_branch if check.check_suite else None
+        return {**record, "entity": f"check:{check.name}@{branch or check.head_sha}",
+                "state": check.conclusion or check.status, "sha": check.head_sha, "branch": branch,
+                "title": check.name, "url": check.html_url}
+
+    if isinstance(payload, GitHubReleasePayload):
+        release = payload.release
+        return {**record, "entity": f"release:{release.tag_name}", "state": payload.action,
+                "title": release.name, "branch": release.tag_name,
+                "url": release.html_url, "actor": release.author.login}
+
+    if isinstance(payload, GitHubPushPayload):
+        branch = payload.ref.split('/')[-1] if '/' in payload.ref else payload.ref
+        return {**record, "entity": f"push:{branch}", "sha": payload.after, "branch": branch,
+                "number": payload.commits_count, "url": payload.repository.html_url,
+                "actor": payload.sender.login}
+
+    return None
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class EventStore:
+    """Журнал событий в SQLite. Все обращения к базе идут в отдельном потоке"""
+
+    def __init__(self, path: str, retention_days: float):
+        self.path = path
+        self.retention_days = retention_days
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            for table, column, column_type in MIGRATIONS:
+                if column not in {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            self._conn = conn
+            log.info(f"🗄 Хранилище событий открыто: {self.path}")
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> tuple[list[sqlite3.Row], int]:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(sql, params)
+                return cursor.fetchall(), cursor.rowcount
+
+    async def _run(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        rows, _ = await asyncio.to_thread(self._execute, sql, params)
+        return rows
+
+    def _insert(self, sql: str, params: tuple) -> int:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(sql, params).lastrowid
+
+    # --- Запись ---
+
+    async def insert(self, record: dict | None, delivery_id: str | None = None) -> None:
+        """Сохраняет запись, полученную из normalize_event (ошибки только логируются)"""
+        if record is None:
+            return
+        try:
+            values = tuple(record.get(column) for column in COLUMNS)
+            await self._run(
+                f"INSERT INTO events (delivery_id, {', '.join(COLUMNS)}, created_at) "
+                f"VALUES (?, {', '.join('?' for _ in COLUMNS)}, ?)",
+                (delivery_id, *values, time.time()),
+            )
+        except Exception as e:
+            log.exception(f"Не удалось сохранить событие {record.get('kind')}: {e}")
+
+    async def mark_delivery(self, delivery_id: str, event_type: str | None, status: str | None) -> None:
+        """Отмечает доставку обработанной (ошибки только логируются)"""
+        try:
+            await self._run(
+                "INSERT OR REPLACE INTO deliveries (delivery_id, event, status, processed_at) VALUES (?, ?, ?, ?)",
+                (delivery_id, event_type, status, time.time()),
+            )
+        except Exception as e:
+            log.exception(f"Не удалось отметить доставку {delivery_id}: {e}")
+
+    # --- Outbox ---
+
+    async def add_outbox(self, delivery_id: str | None, event_type: str, message: str, ordering_key: str | None,
+                         urgent: bool, repo: str | None, detail: str | None = None) -> int:
+        """
+        Записывает уведомление, ожидающее отправки.
+
+        :param detail: Подробности для кнопки «Показать полностью» (JSON, см. dump_detail)
+
+        :return: id записи (для remove_outbox)
+        :raises sqlite3.Error: Если записать не удалось — подтверждать webhook нельзя
+        """
+        return await asyncio.to_thread(
+            self._insert,
+            "INSERT INTO outbox (delivery_id, event, message, ordering_key, urgent, repo, detail, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (delivery_id, event_type, message, ordering_key, int(urgent), repo, detail, time.time()),
+        )
+
+    async def remove_outbox(self, outbox_id: int) -> None:
+        """Уведомление отправлено (ошибки только логируются — в худшем случае оно уйдет повторно)"""
+        try:
+            await self._run("DELETE FROM outbox WHERE id = ?", (outbox_id,))
+        except Exception as e:
+            log.exception(f"Не удалось удалить запись outbox {outbox_id}: {e}")
+
+    async def pending_outbox(self) -> list[sqlite3.Row]:
+        """Неотправленные уведомления в порядке приема"""
+        return await self._run("SELECT * FROM outbox ORDER BY id")
+
+    async def compact(self) -> int:
+        """
+        Удаляет записи старше retention_days, кроме последней записи сущностей, которые
+        еще открыты (чтобы давно открытый PR не пропал из /prs). Закрытые и слитые PR,
+        закрытые Issue, проверки и ветки удаляются целиком — иначе их последние записи
+        копились бы вечно.
+
+        :return: Число удаленных записей
+        """
+        cutoff = time.time() - self.retention_days * 86400
+        _, deleted = await asyncio.to_thread(
+            self._execute,
+            "DELETE FROM events WHERE created_at < ? AND id NOT IN ("
+            "  SELECT id FROM events WHERE id IN (SELECT MAX(id) FROM events GROUP BY repo, kind, entity)"
+            "  AND state = 'open'"
+            ")",
+            (cutoff,),
+        )
+        _, deleted_deliveries = await asyncio.to_thread(
+            self._execute, "DELETE FROM deliveries WHERE processed_at < ?", (cutoff,)
+        )
+        if deleted or deleted_deliveries:
+            log.info(f"🗄 Компакция хранилища: удалено записей — {deleted}, доставок — {deleted_deliveries}")
+        return deleted
+
+    # --- Запросы ---
+
+    @staticmethod
+    def _repo_filter(repo: str) -> tuple[str, str]:
+        """owner/name ищем точно, просто name — по окончанию"""
+        if "/" in repo:
+            return "repo = ?", repo
+        escaped = repo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return "repo LIKE ? ESCAPE '\\'", f"%/{escaped}"
+
+    async def open_pull_requests(self, repo: str, limit: int = 20) -> list[sqlite3.Row]:
+        """Открытые PR: последнее событие каждого PR со state = open"""
+        where, value = self._repo_filter(repo)
+        return await self._run(
+            f"SELECT * FROM events WHERE id IN ("
+            f"  SELECT MAX(id) FROM events WHERE {where} AND kind = 'pull_request' GROUP BY repo, entity"
+            f") AND state = 'open' ORDER BY created_at DESC LIMIT ?",
+            (value, limit),
+        )
+
+    async def latest_checks(self, repo: str, branch: str) -> list[sqlite3.Row]:
+        """Результаты проверок для последнего известного коммита ветки"""
+        where, value = self._repo_filter(repo)
+        head = await self._run(
+            f"SELECT repo, sha FROM events WHERE {where} AND kind = 'check_run' AND branch = ? "
+            f"ORDER BY created_at DESC LIMIT 1",
+            (value, branch),
+        )
+        if not head:
+            return []
+        return await self._run(
+            "SELECT * FROM events WHERE id IN ("
+            "  SELECT MAX(id) FROM events WHERE sha = ? AND repo = ? AND kind = 'check_run' GROUP BY title"
+            ") ORDER BY title",
+            (head[0]["sha"], head[0]["repo"]),
+        )
+
+    async def processed_deliveries(self, delivery_ids: list[str]) -> set[str]:
+        """Какие из доставок уже обработаны"""
+        processed: set[str] = set()
+        for start in range(0, len(delivery_ids), IN_CHUNK):
+            chunk = delivery_ids[start:start + IN_CHUNK]
+            rows = await self._run(
+                f"SELECT delivery_id FROM deliveries WHERE delivery_id IN ({', '.join('?' for _ in chunk)})",
+                tuple(chunk),
+            )
+            processed.update(row["delivery_id"] for row in rows)
+        return processed
+
+    async def recent_releases(self, repo: str, limit: int = 5) -> list[sqlite3.Row]:
+        """Последние опубликованные релизы"""
+        where, value = self._repo_filter(repo)
+        return await self._run(
+            f"SELECT * FROM events WHERE {where} AND kind = 'release' AND state = 'published' "
+            f"ORDER BY created_at DESC LIMIT ?",
+            (value, limit),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Как часто запускать компакцию, сек
+COMPACTION_INTERVAL = 3600
+
+
+async def run_compaction(store: EventStore, interval: float = COMPACTION_INTERVAL) -> None:
+    """Фоновая задача: периодическая компакция хранилища"""
+    while True:
+        try:
+            await store.compact()
+        except Exception as e:
+            log.exception(f"Ошибка компакции хранилища: {e}")
+        await asyncio.sleep(interval)
+
+
+# Общий экземпляр хранилища (None, если EVENT_STORE_PATH пуст)
+event_store = EventStore(EVENT_STORE_PATH, EVENT_STORE_RETENTION_DAYS) if EVENT_STORE_PATH else None
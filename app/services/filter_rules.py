@@ -0,0 +1,486 @@
+# app/services/filter_rules.py
+"""
+Правила заглушения (mute) уведомлений.
+
+Правила описываются в текстовом файле (FILTER_RULES_PATH), по одному на строку:
+
+    # имя: выражение
+    bots: is_bot
+    drafts: event == "pull_request" and draft
+    docs_push: route == "push" and all paths ~ "docs/*"
+    wip: labels ~ "wip*" or title ~ "WIP*"
+    ci_branches: route == "cicd" and not branch in ["main", "release/*"]
+
+Выражения компилируются один раз в Python-функции и выполняются над сырым
+JSON сразу после проверки подписи — заглушенные события не проходят
+ни валидацию Pydantic, ни форматирование, ни очередь отправки.
+
+Язык:
+- and / or / not, скобки;
+- == и != (для списка — есть ли значение в списке);
+- ~ и !~ — glob-сопоставление (fnmatch); для списка — хотя бы один элемент,
+  с префиксом all — все элементы (all paths ~ "docs/*");
+- in — вхождение в список или строку: "bug" in labels, branch in ["main", "dev"]
+  (для in со списком шаблонов элементы сравниваются как glob);
+- строки, числа, true / false / null, списки [..];
+- поля: производные (см. DERIVED_FIELDS) или путь в payload через точку
+  (pull_request.user.login).
+
+Файл перечитывается автоматически при изменении (hot reload).
+"""
+import fnmatch
+import os
+import re
+import time
+from typing import Any, Callable
+
+from loguru import logger as log
+
+from app.core.config import FILTER_RULES_PATH
+from app.services.routing import EVENT_ROUTES
+
+Predicate = Callable[["EventContext"], Any]
+
+
+class RuleSyntaxError(ValueError):
+    """Ошибка в тексте правила"""
+
+
+# ============================================================================
+# EVENT CONTEXT
+# ============================================================================
+
+def _branch(data: dict) -> str | None:
+    ref = data.get("ref")
+    if isinstance(ref, str):
+        return ref.removeprefix("refs/heads/").removeprefix("refs/tags/")
+    pr = data.get("pull_request")
+    if isinstance(pr, dict):
+        return (pr.get("head") or {}).get("ref")
+    check = data.get("check_run")
+    if isinstance(check, dict):
+        return (check.get("check_suite") or {}).get("head_branch")
+    return None
+
+
+def _labels(data: dict) -> list[str]:
+    item = data.get("pull_request") or data.get("issue") or {}
+    return [label.get("name") for label in item.get("labels") or [] if isinstance(label, dict)]
+
+
+def _paths(data: dict) -> list[str]:
+    paths: set[str] = set()
+    for commit in data.get("commits") or []:
+        for key in ("added", "modified", "removed"):
+            paths.update(commit.get(key) or [])
+    return sorted(paths)
+
+
+def _author(data: dict) -> str | None:
+    sender = data.get("sender") or {}
+    return sender.get("login") or (data.get("pusher") or {}).get("name")
+
+
+def _is_bot(data: dict) -> bool:
+    sender = data.get("sender") or {}
+    return sender.get("type") == "Bot" or str(sender.get("login", "")).endswith("[bot]")
+
+
+def _title(data: dict) -> str | None:
+    item = data.get("pull_request") or data.get("issue") or data.get("release") or {}
+    return item.get("title") or item.get("name")
+
+
+# Производные поля: считаются лениво и только один раз на событие
+DERIVED_FIELDS: dict[str, Callable[[dict], Any]] = {
+    "repo": lambda data: (data.get("repository") or {}).get("full_name"),
+    "author": _author,
+    "is_bot": _is_bot,
+    "branch": _branch,
+    "base_branch": lambda data: ((data.get("pull_request") or {}).get("base") or {}).get("ref"),
+    "labels": _labels,
+    "paths": _paths,
+    "draft": lambda data: bool((data.get("pull_request") or {}).get("draft")),
+    "title": _title,
+    "conclusion": lambda data: (data.get("check_run") or {}).get("conclusion"),
+}
+
+
+class EventContext:
+    """Сырой payload + лениво вычисляемые поля для правил"""
+
+    __slots__ = ("event", "data", "_cache")
+
+    def __init__(self, event: str, data: dict):
+        self.event = event
+        self.data = data
+        self._cache: dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        if name in self._cache:
+            return self._cache[name]
+
+        if name == "event":
+            value = self.event
+        elif name == "route":
+            value = EVENT_ROUTES.get(self.event)
+        elif name in DERIVED_FIELDS:
+            value = DERIVED_FIELDS[name](self.data)
+        else:
+            value = self.data
+            for part in name.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+
+        self._cache[name] = value
+        return value
+
+
+# ============================================================================
+# PARSER / COMPILER
+# ============================================================================
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<op>==|!=|!~|~|\(|\)|\[|\]|,)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.\-]*)
+    )""", re.VERBOSE)
+
+KEYWORDS = {"and", "or", "not", "in", "any", "all", "true", "false", "null"}
+LITERALS = {"true": True, "false": False, "null": None}
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise RuleSyntaxError(f"Непонятный символ на позиции {pos}: {text[pos:pos + 10]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "name" and value in KEYWORDS:
+            kind = "kw"
+        tokens.append((kind, value))
+    return tokens
+
+
+def _glob(pattern: str) -> Callable[[Any], bool]:
+    regex = re.compile(fnmatch.translate(pattern))
+    return lambda value: isinstance(value, str) and regex.match(value) is not None
+
+
+class _Compiler:
+    """Рекурсивный спуск: текст выражения -> функция от EventContext"""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def compile(self) -> Predicate:
+        predicate = self._or()
+        if self.pos != len(self.tokens):
+            raise RuleSyntaxError(f"Лишний токен: {self.tokens[self.pos][1]!r}")
+        return predicate
+
+    # --- helpers ---
+
+    def _peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _accept(self, value: str) -> bool:
+        token = self._peek()
+        if token and token[1] == value and token[0] in ("kw", "op"):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, value: str) -> None:
+        if not self._accept(value):
+            raise RuleSyntaxError(f"Ожидалось {value!r}")
+
+    # --- grammar ---
+
+    def _or(self) -> Predicate:
+        parts = [self._and()]
+        while self._accept("or"):
+            parts.append(self._and())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda ctx: any(part(ctx) for part in parts)
+
+    def _and(self) -> Predicate:
+        parts = [self._not()]
+        while self._accept("and"):
+            parts.append(self._not())
+        if len(parts) == 1:
+            return parts[0]
+        return lambda ctx: all(part(ctx) for part in parts)
+
+    def _not(self) -> Predicate:
+        if self._accept("not"):
+            inner = self._not()
+            return lambda ctx: not inner(ctx)
+        return self._comparison()
+
+    def _comparison(self) -> Predicate:
+        quantifier = "all" if self._accept("all") else ("any" if self._accept("any") else None)
+        left, left_const = self._operand()
+
+        token = self._peek()
+        if not token or token[1] not in ("==", "!=", "~", "!~", "in"):
+            if quantifier:
+                raise RuleSyntaxError("all/any применимы только к сравнению")
+            return lambda ctx: bool(left(ctx))
+        self.pos += 1
+        op = token[1]
+        right, right_const = self._operand()
+
+        if op in ("~", "!~"):
+            if right_const is None or not isinstance(right_const[0], str):
+                raise RuleSyntaxError("Справа от ~ должна быть строка-шаблон")
+            test = _glob(right_const[0])
+            check = _quantified(test, quantifier)
+            if op == "~":
+                return lambda ctx: check(left(ctx))
+            return lambda ctx: not check(left(ctx))
+
+        if op == "in":
+            if right_const is not None and isinstance(right_const[0], list):
+                # Список шаблонов: branch in ["main", "release/*"]
+                tests = [_glob(item) if isinstance(item, str) else (lambda v, item=item: v == item)
+                         for item in right_const[0]]
+                return lambda ctx: _quantified(lambda v: any(t(v) for t in tests), quantifier)(left(ctx))
+            return lambda ctx: _contains(right(ctx), left(ctx))
+
+        def equals(value, expected):
+            return _quantified(lambda v: v == expected, quantifier)(value)
+
+        if op == "==":
+            return lambda ctx: equals(left(ctx), right(ctx))
+        return lambda ctx: not equals(left(ctx), right(ctx))
+
+    def _operand(self) -> tuple[Predicate, tuple | None]:
+        """Возвращает функцию значения и (константу,), если значение известно заранее"""
+        token = self._peek()
+        if token is None:
+            raise RuleSyntaxError("Неожиданный конец выражения")
+        kind, value = token
+
+        if value == "(" and kind == "op":
+            self.pos += 1
+            inner = self._or()
+            self._expect(")")
+            return inner, None
+
+        if value == "[" and kind == "op":
+            self.pos += 1
+            items = []
+            if not self._accept("]"):
+                while True:
+                    items.append(self._literal())
+                    if self._accept("]"):
+                        break
+                    self._expect(",")
+            return (lambda ctx: items), (items,)
+
+        if kind in ("string", "number") or (kind == "kw" and value in LITERALS):
+            constant = self._literal()
+            return (lambda ctx: constant), (constant,)
+
+        if kind == "name":
+            self.pos += 1
+            return (lambda ctx: ctx.get(value)), None
+
+        raise RuleSyntaxError(f"Неожиданный токен: {value!r}")
+
+    def _literal(self) -> Any:
+        token = self._peek()
+        if token is None:
+            raise RuleSyntaxError("Ожидалось значение")
+        kind, value = token
+        self.pos += 1
+        if kind == "string":
+            # Поддерживаем только экранирование кавычек и обратного слэша
+            return re.sub(r"\\(.)", r"\1", value[1:-1])
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "kw" and value in LITERALS:
+            return LITERALS[value]
+        raise RuleSyntaxError(f"Ожидалось значение, получено {value!r}")
+
+
+def _quantified(test: Callable[[Any], bool], quantifier: str | None) -> Callable[[Any], bool]:
+    """Для списков: any (по умолчанию) или all; для скаляров — просто test"""
+    def check(value: Any) -> bool:
+        if isinstance(value, list):
+            if quantifier == "all":
+                return bool(value) and all(test(item) for item in value)
+            return any(test(item) for item in value)
+        return test(value)
+    return check
+
+
+def _contains(container: Any, value: Any) -> bool:
+    if isinstance(container, (list, str)):
+        try:
+            return value in container
+        except TypeError:
+            return False
+    return False
+
+
+def compile_rule(expression: str) -> Predicate:
+    """Компилирует текст выражения в функцию-предикат"""
+    return _Compiler(expression).compile()
+
+
+# ============================================================================
+# RULE SET
+# ============================================================================
+
+class Rule:
+    __slots__ = ("name", "expression", "predicate", "matched", "errors")
+
+    def __init__(self, name: str, expression: str):
+        self.name = name
+        self.expression = expression
+        self.predicate = compile_rule(expression)
+        self.matched = 0
+        self.errors = 0
+
+
+def parse_rules(text: str) -> list[Rule]:
+    """Разбирает файл правил: строки вида 'имя: выражение', # — комментарий"""
+    rules: list[Rule] = []
+    for line_no, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, sep, expression = line.partition(":")
+        if not sep or not name.strip() or not expression.strip():
+            raise RuleSyntaxError(f"Строка {line_no}: ожидается 'имя: выражение'")
+        try:
+            rules.append(Rule(name.strip(), expression.strip()))
+        except RuleSyntaxError as e:
+            raise RuleSyntaxError(f"Строка {line_no} ({name.strip()}): {e}") from e
+    return rules
+
+
+class NotificationFilter:
+    """Набор правил заглушения с горячей перезагрузкой и счетчиками"""
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.rules: list[Rule] = []
+        self.evaluated = 0
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self.reload()
+
+    def reload(self) -> bool:
+        """
+        Перечитывает файл правил. При ошибке оставляет старые правила.
+
+        :return: True, если правила обновлены
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if self.rules:
+                log.info(f"🔇 Файл правил {self.path} удален — фильтры выключены")
+            self.rules, self._mtime = [], None
+            return True
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                rules = parse_rules(f.read())
+        except (OSError, RuleSyntaxError) as e:
+            log.error(f"❌ Правила фильтрации не загружены, оставлены прежние: {e}")
+            self._mtime = mtime
+            return False
+
+        # Счетчики неизмененных правил сохраняем
+        previous = {(rule.name, rule.expression): rule for rule in self.rules}
+        for rule in rules:
+            old = previous.get((rule.name, rule.expression))
+            if old:
+                rule.matched, rule.errors = old.matched, old.errors
+
+        self.rules, self._mtime = rules, mtime
+        log.info(f"🔇 Загружено правил фильтрации: {len(rules)} ({self.path})")
+        return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.reload()
+
+    def match(self, event_type: str, data: dict, failed: list[str] | None = None) -> str | None:
+        """
+        Проверяет сырой payload по правилам.
+
+        :param failed: Сюда добавляются имена правил, упавших на событии (для пула разбора payload'ов)
+        :return: Имя первого сработавшего правила или None
+        """
+        self._maybe_reload()
+        if not self.rules:
+            return None
+
+        self.evaluated += 1
+        ctx = EventContext(event_type, data)
+        for rule in self.rules:
+            try:
+                matched = rule.predicate(ctx)
+            except Exception as e:
+                rule.errors += 1
+                if failed is not None:
+                    failed.append(rule.name)
+                log.debug(f"Правило {rule.name} упало на событии {event_type}: {e}")
+                continue
+            if matched:
+                rule.matched += 1
+                return rule.name
+        return None
+
+    def record_match(self, name: str | None, failed: list[str] | None = None) -> None:
+        """
+        Учитывает проверку, выполненную в другом процессе (пул разбора payload'ов).
+
+        :param name: Сработавшее правило
+        :param failed: Правила, упавшие на событии
+        """
+        if not self.rules:
+            return
+        self.evaluated += 1
+        failed = set(failed or ())
+        for rule in self.rules:
+            if rule.name in failed:
+                rule.errors += 1
+            if rule.name == name:
+                rule.matched += 1
+                return
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "evaluated": self.evaluated,
+            "rules": [
+                {"name": rule.name, "expression": rule.expression, "matched": rule.matched, "errors": rule.errors}
+                for rule in self.rules
+            ],
+        }
+
+
+# Общий набор правил (файл может отсутствовать — тогда фильтров нет)
+notification_filter = NotificationFilter(FILTER_RULES_PATH)
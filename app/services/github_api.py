@@ -0,0 +1,163 @@
+# app/services/github_api.py
+"""
+Клиент GitHub REST API (обогащение уведомлений, догрузка пропущенных доставок).
+
+- Ответы кэшируются в LRU с ограничением размера; свежие (моложе TTL)
+  отдаются без запроса.
+- Устаревшие записи перепроверяются условным запросом (If-None-Match):
+  ответ 304 не расходует лимит запросов GitHub и не передает тело.
+- Одновременные запросы одного ресурса склеиваются в один.
+- При ошибке сети или API отдается устаревшая копия, если она есть.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any
+
+import aiohttp
+from loguru import logger as log
+
+# Таймаут одного HTTP-запроса. Бюджет события обычно меньше — тогда запрос
+# продолжается в фоне и заполняет кэш для следующих событий
+REQUEST_TIMEOUT = 10.0
+
+
+class _CacheEntry:
+    __slots__ = ("etag", "data", "fetched_at")
+
+    def __init__(self, etag: str | None, data: Any, fetched_at: float):
+        self.etag = etag
+        self.data = data
+        self.fetched_at = fetched_at
+
+
+class GitHubAPI:
+    """GET-запросы к GitHub API с ETag-кэшем и склейкой одинаковых запросов"""
+
+    def __init__(self, base_url: str, token: str | None, cache_size: int, ttl: float):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._session: aiohttp.ClientSession | None = None
+        self.counters = {"hits": 0, "revalidated": 0, "fetched": 0, "coalesced": 0, "errors": 0}
+        self.rate_limit_remaining: int | None = None
+        # Unix-время, когда GitHub восстановит лимит
+        self.rate_limit_reset: float | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            self._session = aiohttp.ClientSession(
+                headers=headers, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self._session
+
+    async def get(self, path: str) -> Any:
+        """
+        GET {base_url}{path}.
+
+        :return: JSON ответа или None (ресурс не найден, ошибка без кэша)
+        """
+        entry = self._cache.get(path)
+        if entry is not None and time.monotonic() - entry.fetched_at < self.ttl:
+            self._cache.move_to_end(path)
+            self.counters["hits"] += 1
+            return entry.data
+
+        task = self._inflight.get(path)
+        if task is None:
+            task = asyncio.create_task(self._fetch(path, entry))
+            self._inflight[path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(path, None))
+        else:
+            self.counters["coalesced"] += 1
+
+        # shield: если вызывающий уложился не во время, запрос доживет и заполнит кэш
+        return await asyncio.shield(task)
+
+    async def _fetch(self, path: str, entry: _CacheEntry | None) -> Any:
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+        try:
+            async with self._get_session().get(f"{self.base_url}{path}", headers=headers) as resp:
+                self._track_rate_limit(resp)
+
+                if resp.status == 304 and entry is not None:
+                    self.counters["revalidated"] += 1
+                    self._store(path, entry.etag, entry.data)
+                    return entry.data
+
+                if resp.status == 200:
+                    data = await resp.json()
+                    self.counters["fetched"] += 1
+                    self._store(path, resp.headers.get("ETag"), data)
+                    return data
+
+                if resp.status != 404:
+                    log.warning(f"GitHub API {path}: HTTP {resp.status}")
+                    self.counters["errors"] += 1
+                return None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.counters["errors"] += 1
+            log.warning(f"GitHub API {path}: {type(e).__name__} {e}")
+            # Лучше устаревшие данные, чем никаких
+            return entry.data if entry is not None else None
+
+    async def get_page(self, url: str) -> tuple[Any, str | None]:
+        """
+        GET без кэша — для постраничных списков и разовых запросов.
+
+        :param url: Путь от base_url или полный адрес следующей страницы (из Link)
+        :return: (JSON ответа или None, адрес следующей страницы или None)
+        """
+        if url.startswith("/"):
+            url = f"{self.base_url}{url}"
+        try:
+            async with self._get_session().get(url) as resp:
+                self._track_rate_limit(resp)
+                if resp.status != 200:
+                    if resp.status != 404:
+                        log.warning(f"GitHub API {url}: HTTP {resp.status}")
+                        self.counters["errors"] += 1
+                    return None, None
+                self.counters["fetched"] += 1
+                data = await resp.json()
+                next_link = resp.links.get("next")
+                return data, str(next_link["url"]) if next_link else None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.counters["errors"] += 1
+            log.warning(f"GitHub API {url}: {type(e).__name__} {e}")
+            return None, None
+
+    def _track_rate_limit(self, resp: aiohttp.ClientResponse) -> None:
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.isdigit():
+            self.rate_limit_remaining = int(remaining)
+        reset = resp.headers.get("X-RateLimit-Reset")
+        if reset is not None and reset.isdigit():
+            self.rate_limit_reset = float(reset)
+
+    def _store(self, path: str, etag: str | None, data: Any) -> None:
+        self._cache[path] = _CacheEntry(etag, data, time.monotonic())
+        self._cache.move_to_end(path)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "cached": len(self._cache),
+            "inflight": len(self._inflight),
+            "rate_limit_remaining": self.rate_limit_remaining,
+        }
+
+    async def close(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
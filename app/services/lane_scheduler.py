@@ -0,0 +1,193 @@
+# app/services/lane_scheduler.py
+"""
+Планировщик доставки по "полосам" (lanes).
+
+Сообщения с одинаковым ключом полосы (чат + топик, опционально + PR/Issue)
+отправляются по одному и по очереди (внутри потока, см. ниже), а разные полосы работают параллельно
+в пределах общего лимита одновременных запросов.
+Полоса без работы живет не дольше idle_timeout и затем удаляется,
+поэтому память не растет с числом когда-либо встреченных топиков.
+Задача выполняется в контексте (contextvars) вызвавшего submit, поэтому
+трассировка и контекст логов не теряются при передаче в фоновую полосу.
+
+Внутри полосы задачи разных потоков (flow, например репозиториев) чередуются
+по весам — взвешенная честная очередь (self-clocked fair queuing): задача
+получает метку "виртуального окончания" max(V, метка предыдущей задачи потока) + 1 / вес,
+где V — метка последней взятой в работу задачи, и полоса берет задачу с наименьшей меткой.
+Так поток с большим backlog'ом не задерживает остальные, а поток с весом 2 получает
+вдвое больше отправок, чем с весом 1. Порядок задач одного потока сохраняется.
+Без flow все задачи полосы — один поток, и она работает как обычная FIFO-очередь.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+from typing import Any, Awaitable, Callable, Hashable
+
+from loguru import logger as log
+
+Job = Callable[[], Awaitable[Any]]
+Throttle = Callable[[Hashable], Awaitable[None]]
+
+
+class RetryLater(Exception):
+    """
+    Задача просит повторить ее позже (например, Telegram ответил 429).
+    Полоса ждет delay секунд, не занимая слот общего лимита, и повторяет задачу.
+    """
+
+    def __init__(self, delay: float):
+        super().__init__(f"retry after {delay}s")
+        self.delay = delay
+
+
+class _Lane:
+    __slots__ = ("queue", "finish", "virtual", "wakeup", "worker")
+
+    def __init__(self):
+        # Куча (метка окончания, номер, поток, задача, future, контекст)
+        self.queue: list[tuple[float, int, Hashable, Job, asyncio.Future, contextvars.Context]] = []
+        # Метка последней задачи потока в очереди (только для потоков с задачами в очереди)
+        self.finish: dict[Hashable, float] = {}
+        # Виртуальное время полосы — метка последней взятой в работу задачи
+        self.virtual = 0.0
+        self.wakeup = asyncio.Event()
+        self.worker: asyncio.Task | None = None
+
+    def push(self, flow: Hashable, weight: float, seq: int, job: Job, future: asyncio.Future,
+             context: contextvars.Context) -> None:
+        tag = max(self.virtual, self.finish.get(flow, 0.0)) + 1 / weight
+        self.finish[flow] = tag
+        heapq.heappush(self.queue, (tag, seq, flow, job, future, context))
+
+    def pop(self) -> tuple[Job, asyncio.Future, contextvars.Context]:
+        tag, _, flow, job, future, context = heapq.heappop(self.queue)
+        if self.finish.get(flow) == tag:
+            # Последняя задача потока — он больше не ждет
+            del self.finish[flow]
+        # Пустая полоса начинает отсчет заново, метки не растут бесконечно
+        self.virtual = tag if self.queue else 0.0
+        return job, future, context
+
+
+class LaneScheduler:
+    """Упорядоченная доставка внутри потока полосы, параллельная — между полосами"""
+
+    def __init__(self, max_in_flight: int, idle_timeout: float, max_retries: int = 3,
+                 throttle: Throttle | None = None):
+        """
+        :param throttle: Ожидание перед каждой попыткой (лимит частоты по ключу полосы).
+            Вызывается до захвата общего слота, чтобы ожидание не мешало другим полосам
+        """
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._idle_timeout = idle_timeout
+        self._max_retries = max_retries
+        self._throttle = throttle
+        self._lanes: dict[Hashable, _Lane] = {}
+        # Порядок постановки: при равных метках задачи идут в порядке поступления
+        self._seq = itertools.count()
+
+    async def submit(self, key: Hashable, job: Job, flow: Hashable = None, weight: float = 1.0) -> Any:
+        """
+        Ставит задачу в очередь полосы и ждет ее результата.
+
+        :param key: Ключ полосы
+        :param job: Корутина-фабрика, выполняющая отправку
+        :param flow: Поток внутри полосы (например, репозиторий); задачи потока идут по порядку
+        :param weight: Вес потока (> 0) — доля отправок полосы относительно других потоков
+        :return: Результат job()
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane()
+            lane.worker = asyncio.create_task(self._run_lane(key, lane))
+
+        lane.push(flow, weight, next(self._seq), job, future, contextvars.copy_context())
+        lane.wakeup.set()
+
+        # shield: если вызывающий отменен, сообщение все равно уйдет в своей очереди
+        return await asyncio.shield(future)
+
+    async def _run_lane(self, key: Hashable, lane: _Lane) -> None:
+        try:
+            while True:
+                if not lane.queue:
+                    lane.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(lane.wakeup.wait(), self._idle_timeout)
+                    except asyncio.TimeoutError:
+                        if not lane.queue:
+                            break
+                    continue
+
+                job, future, context = lane.pop()
+                await self._run_job(key, job, future, context)
+        finally:
+            # Между проверкой пустой очереди и удалением нет await,
+            # поэтому новая задача не может потеряться
+            if self._lanes.get(key) is lane:
+                del self._lanes[key]
+            # Если полосу остановили принудительно, не оставляем ожидающих навсегда
+            for *_, future, _ in lane.queue:
+                future.cancel()
+            lane.queue.clear()
+
+    async def _run_job(self, key: Hashable, job: Job, future: asyncio.Future, context: contextvars.Context) -> None:
+        try:
+            for attempt in range(self._max_retries + 1):
+                try:
+                    if self._throttle is not None:
+                        await self._throttle(key)
+                    async with self._semaphore:
+                        result = await asyncio.create_task(job(), context=context)
+                except RetryLater as e:
+                    if attempt == self._max_retries:
+                        log.error(f"Полоса {key}: исчерпаны повторы ({self._max_retries})")
+                        self._resolve(future, exception=e)
+                        return
+                    log.warning(f"Полоса {key}: повтор {attempt + 1}/{self._max_retries} через {e.delay} сек")
+                    # Ждем вне семафора: остальные полосы продолжают отправку
+                    await asyncio.sleep(e.delay)
+                else:
+                    self._resolve(future, result=result)
+                    return
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._resolve(future, exception=e)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any = None, exception: BaseException | None = None) -> None:
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        """Число активных полос и задач в очередях"""
+        return {
+            "lanes": len(self._lanes),
+            "queued": sum(len(lane.queue) for lane in self._lanes.values()),
+        }
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Дожидается отправки очередей (не дольше timeout) и останавливает полосы"""
+        workers = [lane.worker for lane in self._lanes.values() if lane.worker]
+        if not workers:
+            return
+
+        # Просыпаемся сразу, а не по idle_timeout
+        self._idle_timeout = 0
+        for lane in self._lanes.values():
+            lane.wakeup.set()
+
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            log.warning(f"Остановлено полос с неотправленными сообщениями: {len(pending)}")
@@ -0,0 +1,147 @@
+# app/services/message_batcher.py
+"""
+Микро-батчинг сообщений для одного чата + топика (в духе алгоритма Нейгла);
+у каждого репозитория свой батч, чтобы батчи чередовались в честной очереди полосы.
+
+Сообщения копятся короткое окно (например, 500 мс) и склеиваются
+в минимальное число сообщений Telegram с учетом лимита в 4096 символов.
+Срочные сообщения и переполненный батч отправляются сразу,
+при остановке приложения все накопленное досылается.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+from loguru import logger as log
+
+from app.core.tracing import current_link, span
+
+# Лимит длины сообщения в Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Разделитель между склеенными уведомлениями
+BATCH_SEPARATOR = "\n\n➖➖➖➖➖➖➖➖➖➖\n\n"
+
+SendBatch = Callable[[Hashable, str], Awaitable[bool]]
+
+
+class _Batch:
+    __slots__ = ("items", "size", "timer", "links")
+
+    def __init__(self):
+        self.items: list[tuple[str, asyncio.Future]] = []
+        # Ссылки на трейсы всех склеенных сообщений
+        self.links: list = []
+        self.size = 0
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class MessageBatcher:
+    """Копит сообщения по ключу (чат + топик + репозиторий) и отправляет их пачками"""
+
+    def __init__(
+        self,
+        window: float,
+        send_batch: SendBatch,
+        max_length: int = TELEGRAM_MESSAGE_LIMIT,
+        separator: str = BATCH_SEPARATOR,
+    ):
+        self._window = window
+        self._send_batch = send_batch
+        self._max_length = max_length
+        self._separator = separator
+        self._pending: dict[Hashable, _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def add(self, key: Hashable, text: str, urgent: bool = False) -> bool:
+        """
+        Добавляет сообщение в батч и ждет результата его отправки.
+
+        :param key: Ключ батча (чат + топик + репозиторий)
+        :param text: Текст сообщения (HTML)
+        :param urgent: Отправить батч немедленно (вместе с уже накопленным)
+        :return: True, если сообщение доставлено
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._pending.get(key)
+        if batch is not None and batch.size + len(self._separator) + len(text) > self._max_length:
+            # Новое сообщение уже не влезет — отправляем накопленное, как полный "пакет"
+            self._flush(key)
+            batch = None
+
+        if batch is None:
+            batch = self._pending[key] = _Batch()
+            batch.timer = loop.call_later(self._window, self._flush, key)
+
+        batch.size += len(text) + (len(self._separator) if batch.items else 0)
+        batch.items.append((text, future))
+        link = current_link()
+        if link is not None:
+            batch.links.append(link)
+
+        if urgent:
+            self._flush(key)
+
+        return await asyncio.shield(future)
+
+    def _flush(self, key: Hashable) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+
+        # Задачи запускаются в порядке создания, поэтому порядок сообщений сохраняется
+        for text, futures in self._pack(batch.items):
+            task = asyncio.create_task(self._send_chunk(key, text, futures, batch.links))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _pack(self, items: list[tuple[str, asyncio.Future]]) -> list[tuple[str, list[asyncio.Future]]]:
+        """Жадно склеивает сообщения по порядку, не превышая лимит длины"""
+        chunks: list[tuple[str, list[asyncio.Future]]] = []
+        current: list[str] = []
+        futures: list[asyncio.Future] = []
+        length = 0
+
+        for text, future in items:
+            extra = len(text) + (len(self._separator) if current else 0)
+            if current and length + extra > self._max_length:
+                chunks.append((self._separator.join(current), futures))
+                current, futures, length = [], [], 0
+                extra = len(text)
+            current.append(text)
+            futures.append(future)
+            length += extra
+
+        if current:
+            chunks.append((self._separator.join(current), futures))
+        return chunks
+
+    async def _send_chunk(self, key: Hashable, text: str, futures: list[asyncio.Future], links: list) -> None:
+        try:
+            with span("telegram.batch", links=links, batch__messages=len(futures), message__length=len(text)):
+                success = await self._send_batch(key, text)
+        except Exception as e:
+            log.exception(f"Ошибка отправки батча {key}: {e}")
+            success = False
+
+        if len(futures) > 1:
+            log.debug(f"Батч {key}: склеено сообщений — {len(futures)}")
+        for future in futures:
+            if not future.done():
+                future.set_result(success)
+
+    def stats(self) -> dict:
+        """Число открытых батчей и сообщений в них"""
+        return {
+            "batches": len(self._pending),
+            "messages": sum(len(batch.items) for batch in self._pending.values()),
+        }
+
+    async def close(self) -> None:
+        """Немедленно отправляет все накопленные батчи и ждет завершения"""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
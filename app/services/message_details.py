@@ -0,0 +1,220 @@
+# app/services/message_details.py
+"""
+Подробности уведомлений для кнопки «Показать полностью».
+
+Чтобы сообщения оставались короткими, форматтеры обрезают описания PR и Issue,
+ревью, комментарии, changelog'и и список коммитов push'а. Если что-то обрезано,
+build_detail сохраняет исходный текст без разметки (MessageDetail), а к сообщению
+добавляется кнопка. Страницы рендерятся только по нажатию (app/bot/handlers/details.py).
+
+Подробности хранятся в DetailCache по короткому токену из callback_data кнопки:
+не больше EXPAND_CACHE_SIZE записей и не дольше EXPAND_TTL_HOURS. У склеенных
+сообщений (BATCH_WINDOW_MS) кнопки нет, поэтому при склейке кэша нет вовсе.
+Уведомление в outbox хранит сами подробности (dump_detail): токен из памяти
+перезапуск не переживает, а при повторной отправке подробности кладутся в кэш заново.
+
+build_detail не тянет за собой бота и вызывается и в процессах пула разбора.
+"""
+import json
+import secrets
+import time
+from collections import OrderedDict
+from html import escape
+
+from app.core.config import BATCH_WINDOW_MS, EXPAND_CACHE_SIZE, EXPAND_TTL_HOURS
+from app.schemas.github_payload import (
+    COMMIT_TITLE_DETAIL,
+    PUSH_COMMITS_PREVIEW,
+    GitHubPullRequestPayload,
+    GitHubPushPayload,
+    GitHubIssueCommentPayload,
+    GitHubPullRequestReviewPayload,
+    GitHubIssuesPayload,
+    GitHubReleasePayload,
+)
+from app.services.report_service import (
+    PR_BODY_PREVIEW,
+    REVIEW_BODY_PREVIEW,
+    ISSUE_BODY_PREVIEW,
+    COMMENT_BODY_PREVIEW,
+    RELEASE_BODY_PREVIEW,
+    COMMIT_TITLE_PREVIEW,
+)
+
+# Символов текста на странице (лимит сообщения Telegram — 4096, остальное — заголовок)
+PAGE_CHARS = 3000
+# Больше страниц не храним: хвост длинного текста остается на GitHub
+MAX_PAGES = 10
+
+
+class MessageDetail:
+    """Полный текст обрезанного уведомления (без разметки) и заголовок для страниц"""
+    __slots__ = ("title", "url", "link_label", "body", "commits", "commits_count")
+
+    def __init__(self, title: str, url: str, link_label: str, body: str | None = None,
+                 commits: list[tuple[str, str]] | None = None, commits_count: int = 0):
+        # Заголовок страницы (HTML, уже экранирован)
+        self.title = title
+        self.url = url
+        self.link_label = link_label
+        self.body = body[:PAGE_CHARS * MAX_PAGES] if body else None
+        # (короткий хеш, заголовок) коммитов push'а
+        self.commits = commits
+        self.commits_count = commits_count
+
+
+def dump_detail(detail: MessageDetail) -> str:
+    """Подробности в JSON (для outbox)"""
+    return json.dumps({name: getattr(detail, name) for name in MessageDetail.__slots__}, ensure_ascii=False)
+
+
+def load_detail(data: str) -> MessageDetail:
+    fields = json.loads(data)
+    if fields["commits"] is not None:
+        fields["commits"] = [tuple(commit) for commit in fields["commits"]]
+    return MessageDetail(**fields)
+
+
+def _body_detail(title: str, body: str | None, preview: int, url: str, link_label: str) -> MessageDetail | None:
+    if not body or len(body) <= preview:
+        return None
+    return MessageDetail(title, url, link_label, body=body)
+
+
+def build_detail(payload) -> MessageDetail | None:
+    """Подробности события, если форматтер что-то обрезал, иначе None"""
+    repo = escape(payload.repository.full_name, quote=False)
+
+    if isinstance(payload, GitHubPushPayload):
+        titles = [commit.message.split("\n", 1)[0] for commit in payload.commits]
+        if payload.commits_count <= PUSH_COMMITS_PREVIEW and all(len(title) <= COMMIT_TITLE_PREVIEW for title in titles):
+            return None
+        commits = [(commit.id[:7], title[:COMMIT_TITLE_DETAIL]) for commit, title in zip(payload.commits, titles)]
+        branch = escape(payload.ref.split("/")[-1], quote=False)
+        title = f"📦 <b>Push в {repo}</b> · <code>{branch}</code>"
+        url = f"{payload.repository.html_url}/compare/{payload.before[:7]}...{payload.after[:7]}"
+        return MessageDetail(title, url, "Посмотреть изменения",
+                             commits=commits + payload.more_commits, commits_count=payload.commits_count)
+
+    if isinstance(payload, GitHubPullRequestPayload):
+        pr = payload.pull_request
+        title = f"📝 <b>{escape(pr.title, quote=False)}</b> · {repo}"
+        return _body_detail(title, pr.body, PR_BODY_PREVIEW, pr.html_url, "Открыть Pull Request")
+    if isinstance(payload, GitHubPullRequestReviewPayload):
+        title = f"💭 <b>Ревью @{payload.review.user.login}</b> · {escape(payload.pull_request.title, quote=False)}"
+        return _body_detail(title, payload.review.body, REVIEW_BODY_PREVIEW, payload.review.html_url,
+                            "Посмотреть ревью")
+    if isinstance(payload, GitHubIssuesPayload):
+        issue = payload.issue
+        title = f"🐛 <b>#{issue.number} {escape(issue.title, quote=False)}</b> · {repo}"
+        return _body_detail(title, issue.body, ISSUE_BODY_PREVIEW, issue.html_url, "Открыть задачу")
+    if isinstance(payload, GitHubIssueCommentPayload):
+        issue = payload.issue
+        title = f"💬 <b>@{payload.sender.login}</b> · {escape(issue.title, quote=False)} #{issue.number}"
+        return _body_detail(title, payload.comment.body, COMMENT_BODY_PREVIEW, payload.comment.html_url,
+                            "Перейти к комментарию")
+    if isinstance(payload, GitHubReleasePayload):
+        release = payload.release
+        title = f"📜 <b>Changelog {escape(release.tag_name, quote=False)}</b> · {repo}"
+        return _body_detail(title, release.body, RELEASE_BODY_PREVIEW, release.html_url, "Посмотреть релиз")
+    return None
+
+
+def _wrap(line: str) -> list[str]:
+    """Слишком длинная строка режется на куски по PAGE_CHARS"""
+    return [line[start:start + PAGE_CHARS] for start in range(0, max(len(line), 1), PAGE_CHARS)]
+
+
+def _paginate(lines: list[str]) -> list[str]:
+    """Склеивает строки в страницы не длиннее PAGE_CHARS"""
+    pages, current, length = [], [], 0
+    for line in lines:
+        if current and length + len(line) + 1 > PAGE_CHARS:
+            pages.append("\n".join(current))
+            current, length = [], 0
+        current.append(line)
+        length += len(line) + 1
+    pages.append("\n".join(current))
+    return pages
+
+
+def _pages(detail: MessageDetail) -> list[str]:
+    """HTML страниц без заголовка"""
+    if detail.commits is None:
+        # Делим исходный текст: экранирование не меняет видимую длину
+        lines = [chunk for line in (detail.body or "").splitlines() for chunk in _wrap(line)]
+        return [escape(page, quote=False) for page in _paginate(lines)]
+
+    lines = [
+        f"{number}. <code>{escape(sha, quote=False)}</code> {escape(message, quote=False)}"
+        for number, (sha, message) in enumerate(detail.commits, 1)
+    ]
+    if detail.commits_count > len(detail.commits):
+        lines.append(f"\n<i>... и еще {detail.commits_count - len(detail.commits)} коммитов (на GitHub)</i>")
+    return _paginate(lines)
+
+
+def render_page(detail: MessageDetail, page: int) -> tuple[str, int, int]:
+    """
+    Страница подробностей (нумерация с 1).
+
+    :return: (HTML сообщения, номер показанной страницы, всего страниц)
+    """
+    pages = _pages(detail)
+    page = min(max(page, 1), len(pages))
+    counter = f" · стр. {page}/{len(pages)}" if len(pages) > 1 else ""
+    text = (
+        f"{detail.title}\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"{pages[page - 1]}\n"
+        f"\n🔗 <a href='{detail.url}'>{detail.link_label}</a>{counter}"
+    )
+    return text, page, len(pages)
+
+
+class DetailCache:
+    """Подробности по токену: ограничение числа записей и время жизни"""
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        # Порядок добавления = порядок истечения: устаревшие всегда в начале
+        self._entries: OrderedDict[str, tuple[float, MessageDetail]] = OrderedDict()
+        self.counters = {"stored": 0, "hits": 0, "expired": 0, "evicted": 0}
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            token, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[token]
+            self.counters["expired"] += 1
+
+    def put(self, detail: MessageDetail) -> str:
+        """Сохраняет подробности и возвращает токен для callback_data"""
+        now = time.monotonic()
+        self._expire(now)
+        while len(self._entries) >= self.size:
+            self._entries.popitem(last=False)
+            self.counters["evicted"] += 1
+        token = secrets.token_urlsafe(8)
+        self._entries[token] = (now + self.ttl, detail)
+        self.counters["stored"] += 1
+        return token
+
+    def get(self, token: str) -> MessageDetail | None:
+        self._expire(time.monotonic())
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        self.counters["hits"] += 1
+        return entry[1]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "size": self.size, "ttl_hours": self.ttl / 3600, **self.counters}
+
+
+# Общий экземпляр (None, если EXPAND_CACHE_SIZE = 0 или сообщения склеиваются — кнопок тогда нет)
+detail_cache = (
+    DetailCache(EXPAND_CACHE_SIZE, EXPAND_TTL_HOURS * 3600) if EXPAND_CACHE_SIZE > 0 and BATCH_WINDOW_MS <= 0 else None
+)
@@ -0,0 +1,176 @@
+# app/services/payload_offload.py
+"""
+Разбор, валидация и форматирование payload'а — в event loop'е или в пуле процессов.
+
+Почти все payload'ы маленькие, и их дешевле обработать на месте. Но массовый
+push, огромное описание PR или релиз с длинным changelog'ом превращают
+json.loads, валидацию Pydantic и форматирование в заметную работу CPU, которая
+останавливает единственный event loop (webhook'и, бот, отправки).
+
+Тело больше OFFLOAD_THRESHOLD_BYTES отправляется в пул процессов как есть
+(bytes), обратно приходит RenderedEvent: готовый текст, несколько коротких
+полей и подробности для кнопки «Показать полностью». Pydantic-модель возвращается только если событию нужно обогащение
+(оно идет между валидацией и форматированием, и форматировать приходится в loop'е).
+
+Модуль импортируется процессами пула, поэтому не должен тянуть за собой
+бота и очереди отправки.
+"""
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from loguru import logger as log
+
+from app.core.config import OFFLOAD_WORKERS, OFFLOAD_THRESHOLD_BYTES
+from app.core.tracing import span
+from app.services.event_keys import get_ordering_key, get_repeat_subject, is_urgent
+from app.services.event_store import normalize_event
+from app.services.filter_rules import notification_filter
+from app.services.message_details import MessageDetail, build_detail, detail_cache
+
+
+class RenderedEvent:
+    """Результат обработки payload'а: все, что нужно loop'у дальше"""
+    __slots__ = ("action", "repo", "muted_by", "filter_errors", "message", "ordering_key", "urgent", "repeat",
+                 "record", "detail", "payload")
+
+    def __init__(self, action: str | None, repo: str | None, muted_by: str | None = None):
+        self.action = action
+        self.repo = repo
+        self.muted_by = muted_by
+        # Правила, упавшие на событии (счетчики ошибок в процессе пула переносятся в loop)
+        self.filter_errors: list[str] = []
+        self.message: str | None = None
+        self.ordering_key: str | None = None
+        self.urgent = False
+        self.repeat: tuple[tuple, str, str, str] | None = None
+        # Плоская запись для хранилища событий
+        self.record: dict | None = None
+        # Полный текст для кнопки «Показать полностью» (если форматтер что-то обрезал)
+        self.detail: MessageDetail | None = None
+        # Модель payload'а (только для обогащения события, которое будет отправлено)
+        self.payload: Any = None
+
+
+def render_event(event_type: str, payload_class: type, formatter_func: Callable[..., str | None],
+                 data: dict | bytes, with_payload: bool = False) -> RenderedEvent:
+    """
+    Фильтры, валидация и форматирование события (без ввода-вывода).
+
+    :param data: JSON payload'а или исходное тело запроса
+    :param with_payload: Вернуть и модель, если форматтер отрисовал событие (для обогащения)
+    """
+    if isinstance(data, bytes):
+        with span("webhook.parse_json"):
+            data = json.loads(data)
+
+    repository = data.get("repository") if isinstance(data, dict) else None
+    rendered = RenderedEvent(
+        data.get("action") if isinstance(data, dict) else None,
+        repository.get("full_name") if isinstance(repository, dict) else None,
+    )
+
+    # Правила заглушения — на сыром JSON, до валидации и форматирования
+    with span("webhook.filter"):
+        rendered.muted_by = notification_filter.match(event_type, data, rendered.filter_errors)
+    if rendered.muted_by:
+        return rendered
+
+    # Валидация (превращаем JSON в Pydantic объект)
+    with span("webhook.validate", payload__class=payload_class.__name__):
+        payload = payload_class(**data)
+
+    rendered.repo = payload.repository.full_name
+    rendered.ordering_key = get_ordering_key(payload)
+    rendered.urgent = is_urgent(payload)
+    rendered.repeat = get_repeat_subject(payload)
+    try:
+        rendered.record = normalize_event(event_type, payload)
+    except Exception as e:
+        log.exception(f"Не удалось нормализовать событие {event_type}: {e}")
+    if detail_cache is not None:
+        try:
+            rendered.detail = build_detail(payload)
+        except Exception as e:
+            log.exception(f"Не удалось собрать подробности события {event_type}: {e}")
+
+    with span("webhook.format", formatter=formatter_func.__name__):
+        rendered.message = formatter_func(payload)
+    # Модель нужна только для обогащения, и только если событие будет отправлено
+    if with_payload and rendered.message:
+        rendered.payload = payload
+    return rendered
+
+
+def _warm_up() -> int:
+    # Модули уже импортированы при распаковке задачи — процесс готов
+    return multiprocessing.current_process().pid
+
+
+class PayloadOffloader:
+    """Пул процессов для больших payload'ов"""
+
+    def __init__(self, workers: int, threshold_bytes: int):
+        self.workers = workers
+        self.threshold = threshold_bytes
+        self._executor: ProcessPoolExecutor | None = None
+        self.offloaded = 0
+        self.in_flight = 0
+        self.failures = 0
+
+    def should_offload(self, size: int) -> bool:
+        return size > self.threshold
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn: рабочие процессы не наследуют потоки и сокеты приложения
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def start(self) -> None:
+        """Поднимает процессы заранее, чтобы первый большой payload не ждал их запуска"""
+        if self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _warm_up) for _ in range(self.workers)))
+        log.info(f"🧮 Пул разбора payload'ов запущен (процессов: {self.workers}, порог: {self.threshold // 1024} КБ)")
+
+    async def render(self, event_type: str, payload_class: type, formatter_func: Callable[..., str | None],
+                     body: bytes, with_payload: bool = False) -> RenderedEvent:
+        """render_event в пуле процессов. Если пул упал — пересоздает его и считает на месте"""
+        if self._executor is None:
+            self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        self.offloaded += 1
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(
+                self._executor, render_event, event_type, payload_class, formatter_func, body, with_payload
+            )
+        except BrokenProcessPool:
+            self.failures += 1
+            log.error("❌ Пул разбора payload'ов упал, пересоздаем. Событие обработано в event loop'е")
+            self._executor = self._create_executor()
+        finally:
+            self.in_flight -= 1
+        return render_event(event_type, payload_class, formatter_func, body, with_payload)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "threshold_bytes": self.threshold,
+            "offloaded": self.offloaded,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Общий экземпляр (None, если OFFLOAD_WORKERS = 0)
+payload_offloader = PayloadOffloader(OFFLOAD_WORKERS, OFFLOAD_THRESHOLD_BYTES) if OFFLOAD_WORKERS > 0 else None
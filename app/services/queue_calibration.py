@@ -0,0 +1,138 @@
+# app/services/queue_calibration.py
+"""
+Замер памяти ожидающего отправки сообщения для бюджета SEND_QUEUE_MAX_BYTES.
+
+Помимо записи QueuedMessage и текста сообщение в очереди держит фоновую задачу,
+кадры корутин отправителя, future и запись полосы. Их размер зависит от сборки
+интерпретатора и версии кода, поэтому константа, откалиброванная на одной сборке,
+на другой занижает или завышает бюджет. При старте calibrate() запускает этот модуль
+отдельным процессом: там Telegram "зависает", в фоновую отправку (как из webhook'а)
+ставится CALIBRATION_MESSAGES уведомлений, и по tracemalloc считается, сколько памяти
+на сообщение занято сверх того, что бюджет учитывает по sys.getsizeof. Отдельный процесс
+не трогает очереди, хранилище и бот приложения, а tracemalloc не замедляет основной.
+
+Замер идет без батчинга и трассировки — основной путь отправки. Пока он не закончился
+(или если не удался), используется оценка DEFAULT_MESSAGE_OVERHEAD_BYTES.
+
+Запуск вручную (печатает байты на сообщение):
+    python -m app.services.queue_calibration
+"""
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from typing import TYPE_CHECKING
+
+from loguru import logger as log
+
+if TYPE_CHECKING:
+    # Только для аннотации: send_queue читает конфиг, а процесс замера задает окружение до него
+    from app.services.send_queue import SendBudget
+
+CALIBRATION_MESSAGES = 500
+CALIBRATION_TIMEOUT_SECONDS = 60.0
+
+# Окружение процесса замера: без хранилища, догрузки и внешних вызовов, один получатель
+_CALIBRATION_ENV = {
+    "NOTIFY_CHANNEL_ID": "-1000000000000",
+    "ROUTES_PATH": "/nonexistent/routes.json",
+    "FILTER_RULES_PATH": "/nonexistent/filters.rules",
+    "EVENT_STORE_PATH": "",
+    "CATCHUP_HOOKS": "",
+    "ENRICHMENT_ENABLED": "false",
+    "OFFLOAD_WORKERS": "0",
+    "BATCH_WINDOW_MS": "0",
+    "SEND_CHAT_RATE_PER_MINUTE": "0",
+    "SEND_QUEUE_MAX_BYTES": "0",
+    "SEND_REPO_MAX_QUEUED": "0",
+}
+
+
+async def measure_overhead(count: int = CALIBRATION_MESSAGES) -> int:
+    """
+    Память ожидающего сообщения сверх записи и текста, байт.
+    Подменяет отправку в Telegram, поэтому вызывается только в отдельном процессе.
+    """
+    # Импорт здесь: конфиг читается при импорте, окружение задано до него
+    from app.services import sender_service
+    from app.services.webhook_service import BackgroundDelivery, PreparedNotification
+
+    gate = asyncio.Event()
+
+    async def stuck_send_message(*args, **kwargs) -> None:
+        await gate.wait()
+
+    sender_service.bot.send_message = stuck_send_message
+    budget = sender_service.send_budget
+    delivery = BackgroundDelivery(None)
+
+    # После импортов: под tracemalloc они шли бы в разы дольше
+    tracemalloc.start()
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    for seq in range(count):
+        text = f"<b>🚀 Push</b> в <code>main</code> acme/app #{seq}\n" + "• fix: something\n" * 10
+        await delivery.submit(PreparedNotification("push", text, sender_service.send_push_notification,
+                                                   f"acme/app#{seq % 10}", False, "acme/app"), None)
+        del text
+    deadline = time.monotonic() + CALIBRATION_TIMEOUT_SECONDS
+    while budget.messages < count:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"в очереди {budget.messages} из {count} сообщений")
+        await asyncio.sleep(0.01)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    # Записи и тексты бюджет уже считает по факту
+    records = budget.bytes - budget.message_overhead * count
+    return round((retained - records) / count)
+
+
+async def calibrate(budget: "SendBudget") -> None:
+    """Замеряет накладные расходы ожидающего сообщения в отдельном процессе и передает их бюджету"""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", __name__,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), CALIBRATION_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        process.kill()
+        await process.wait()
+        raise
+
+    try:
+        overhead = int(stdout.decode().strip())
+    except ValueError:
+        overhead = 0
+    if process.returncode != 0 or overhead <= 0:
+        details = stderr.decode(errors="replace").strip().splitlines()[-1:] or ["нет вывода"]
+        log.warning(f"⚠️ Замер памяти очереди отправки не удался (код {process.returncode}): {details[0]}. "
+                    f"Бюджет считает по оценке {budget.message_overhead} Б на сообщение")
+        return
+
+    log.info(f"📏 Память ожидающего сообщения: {overhead} Б (оценка была {budget.message_overhead} Б)")
+    budget.message_overhead = overhead
+
+
+async def run_calibration(budget: "SendBudget") -> None:
+    """Фоновая задача при старте: ошибка замера не мешает работе"""
+    try:
+        await calibrate(budget)
+    except asyncio.TimeoutError:
+        log.warning(f"⚠️ Замер памяти очереди отправки не уложился в {CALIBRATION_TIMEOUT_SECONDS:.0f} с")
+    except Exception as e:
+        log.warning(f"⚠️ Замер памяти очереди отправки не удался: {e}")
+
+
+async def _main() -> None:
+    os.environ.update(_CALIBRATION_ENV)
+    print(await measure_overhead())
+
+
+if __name__ == "__main__":
+    # stdout — только результат
+    log.remove()
+    asyncio.run(_main())
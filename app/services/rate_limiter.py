@@ -0,0 +1,61 @@
+# app/services/rate_limiter.py
+"""
+Лимит частоты отправки в один чат (GCRA — "виртуальное расписание").
+
+Для каждого чата хранится теоретическое время следующей отправки (TAT).
+Вызов wait() резервирует слот и спит до него, поэтому конкурирующие
+отправки в один чат выстраиваются с интервалом 60 / rate секунд,
+а первые burst сообщений проходят без ожидания.
+Лимиты разных чатов независимы: медленный чат не задерживает остальные.
+"""
+import asyncio
+import time
+from typing import Hashable
+
+# Раз в сколько резервирований удалять записи давно молчащих чатов
+_CLEANUP_EVERY = 1000
+
+
+class ChatRateLimiter:
+    """Ограничивает частоту сообщений в каждый чат отдельно"""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.enabled = rate_per_minute > 0
+        self._interval = 60 / rate_per_minute if self.enabled else 0.0
+        self._tolerance = self._interval * max(burst - 1, 0)
+        self._tat: dict[Hashable, float] = {}
+        self._reservations = 0
+        self.waits = 0
+
+    def reserve(self, chat_id: Hashable) -> float:
+        """
+        Резервирует слот отправки.
+
+        :return: Сколько секунд нужно подождать до отправки
+        """
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        tat = max(self._tat.get(chat_id, now), now)
+        self._tat[chat_id] = tat + self._interval
+
+        self._reservations += 1
+        if self._reservations % _CLEANUP_EVERY == 0:
+            self._cleanup(now)
+
+        return max(0.0, tat - self._tolerance - now)
+
+    async def wait(self, chat_id: Hashable) -> None:
+        """Ждет своей очереди на отправку в чат"""
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            self.waits += 1
+            await asyncio.sleep(delay)
+
+    def _cleanup(self, now: float) -> None:
+        # Чат, чей TAT уже в прошлом, ведет себя как новый — запись не нужна
+        for chat_id in [chat_id for chat_id, tat in self._tat.items() if tat <= now]:
+            del self._tat[chat_id]
+
+    def stats(self) -> dict:
+        return {"chats": len(self._tat), "waits": self.waits}
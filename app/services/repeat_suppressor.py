@@ -0,0 +1,136 @@
+# app/services/repeat_suppressor.py
+"""
+Подавление повторяющихся уведомлений (флапающие проверки, issue, которые
+то закрывают, то переоткрывают).
+
+Что считается повтором, решает event_keys.get_repeat_subject: перезапуски одной
+проверки на одном коммите с тем же неуспешным исходом и смены состояния одной
+задачи (закрыли/переоткрыли). Первое событие с ключом
+отправляется как обычно и открывает окно REPEAT_WINDOW_SECONDS.
+Повторы внутри окна не отправляются, а только считаются. Когда окно
+закрывается и повторы были, отправляется одна сводка:
+"Проверка tests упала 5× за 10 мин".
+
+Память ограничена REPEAT_MAX_KEYS: при переполнении самое старое окно
+закрывается досрочно (со сводкой, если в нем были повторы).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+from loguru import logger as log
+
+from app.core.config import REPEAT_WINDOW_SECONDS, REPEAT_MAX_KEYS
+
+# Как часто проверять закрывшиеся окна, сек
+FLUSH_INTERVAL = 5.0
+
+
+class RepeatWindow:
+    """Окно повторов одного ключа"""
+    __slots__ = ("event_type", "repo", "subject", "outcome", "url", "ordering_key", "first_at", "count")
+
+    def __init__(self, event_type: str, repo: str, subject: str, outcome: str, url: str,
+                 ordering_key: str | None, first_at: float):
+        self.event_type = event_type
+        self.repo = repo
+        self.subject = subject
+        self.outcome = outcome
+        self.url = url
+        self.ordering_key = ordering_key
+        self.first_at = first_at
+        # Сколько раз событие пришло за окно (включая первое, отправленное)
+        self.count = 1
+
+    @property
+    def suppressed(self) -> int:
+        return self.count - 1
+
+
+class RepeatSuppressor:
+    """Окна повторов с ограниченным числом ключей"""
+
+    def __init__(self, window: float, max_keys: int):
+        self.window = window
+        self.max_keys = max_keys
+        self._windows: OrderedDict[Hashable, RepeatWindow] = OrderedDict()
+        # Окна, закрытые досрочно при переполнении, — сводки уйдут при ближайшей проверке
+        self._evicted: list[RepeatWindow] = []
+        self.suppressed_total = 0
+        self.summaries_sent = 0
+
+    def observe(self, key: Hashable, event_type: str, repo: str, subject: str, outcome: str, url: str,
+                ordering_key: str | None = None) -> bool:
+        """
+        Отмечает событие.
+
+        :return: True, если это повтор и уведомление отправлять не нужно
+        """
+        now = time.monotonic()
+        current = self._windows.get(key)
+        if current is not None and now - current.first_at < self.window:
+            current.count += 1
+            # Сводка показывает последнее состояние (у задачи исход меняется)
+            current.outcome = outcome
+            current.url = url
+            self.suppressed_total += 1
+            return True
+
+        if current is not None:
+            # Окно истекло, но сводку еще не забрали — отдаем ее вместе с вытесненными
+            del self._windows[key]
+            if current.suppressed:
+                self._evicted.append(current)
+
+        # Окна создаются по времени, поэтому первое в словаре — самое старое
+        self._windows[key] = RepeatWindow(event_type, repo, subject, outcome, url, ordering_key, now)
+        while len(self._windows) > self.max_keys:
+            _, oldest = self._windows.popitem(last=False)
+            if oldest.suppressed:
+                self._evicted.append(oldest)
+        return False
+
+    def collect(self, force: bool = False) -> list[RepeatWindow]:
+        """
+        Забирает закрывшиеся окна, в которых были повторы.
+
+        :param force: Закрыть все окна (при остановке приложения)
+        """
+        now = time.monotonic()
+        ready, self._evicted = self._evicted, []
+        while self._windows:
+            key, oldest = next(iter(self._windows.items()))
+            if not force and now - oldest.first_at < self.window:
+                break
+            del self._windows[key]
+            if oldest.suppressed:
+                ready.append(oldest)
+        return ready
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window,
+            "open_windows": len(self._windows),
+            "repeating": sum(1 for current in self._windows.values() if current.suppressed),
+            "suppressed_total": self.suppressed_total,
+            "summaries_sent": self.summaries_sent,
+        }
+
+
+async def run_summaries(suppressor: RepeatSuppressor,
+                        send_summary: Callable[[RepeatWindow], Awaitable[None]],
+                        interval: float = FLUSH_INTERVAL) -> None:
+    """Фоновая задача: отправка сводок по закрывшимся окнам"""
+    while True:
+        await asyncio.sleep(interval)
+        for window in suppressor.collect():
+            try:
+                await send_summary(window)
+                suppressor.summaries_sent += 1
+            except Exception as e:
+                log.exception(f"Не удалось отправить сводку повторов {window.subject}: {e}")
+
+
+# Общий экземпляр (None, если REPEAT_WINDOW_SECONDS = 0)
+repeat_suppressor = RepeatSuppressor(REPEAT_WINDOW_SECONDS, REPEAT_MAX_KEYS) if REPEAT_WINDOW_SECONDS > 0 else None
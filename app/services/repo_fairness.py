@@ -0,0 +1,217 @@
+# app/services/repo_fairness.py
+"""
+Честная очередь отправки между репозиториями.
+
+Один шумный репозиторий (монорепо с агрессивным CI) может давать большую часть
+webhook'ов. Раньше сообщения полосы (чат + топик) уходили строго по очереди,
+и его backlog задерживал уведомления всех остальных команд. Теперь внутри
+полосы сообщения разных репозиториев чередуются по весам (LaneScheduler, flow = репозиторий):
+репозиторий с весом 2 получает вдвое больше отправок, чем с весом 1,
+а сообщения одного репозитория по-прежнему уходят по порядку.
+
+Веса задаются в SEND_REPO_WEIGHTS шаблонами fnmatch ("acme/monorepo=1,acme/*=3"),
+по умолчанию вес 1. Те же веса действуют и перед заполненным бюджетом памяти
+SEND_QUEUE_MAX_BYTES (см. send_queue). SEND_REPO_MAX_QUEUED ограничивает backlog одного
+репозитория, включая ждущих места в бюджете: уведомление сверх лимита отбрасывается
+до постановки в очередь и не задерживает остальные репозитории.
+
+По каждому репозиторию считаются сообщения в очереди, время ожидания отправки
+и отброшенные уведомления — в /metrics и GET /admin/memory видно, кто выбирает
+лимит Telegram.
+"""
+import fnmatch
+import time
+from collections import deque
+
+from loguru import logger as log
+
+from app.core.config import SEND_REPO_MAX_QUEUED, SEND_REPO_WEIGHTS
+
+# Сколько последних ожиданий помнить на репозиторий (максимум в /metrics)
+WAIT_WINDOW = 100
+# Сколько репозиториев держать в статистике: сверх этого удаляются давно молчащие без очереди
+MAX_TRACKED_REPOS = 500
+# Сколько самых загруженных репозиториев показывать в stats()
+TOP_REPOS = 10
+
+
+def parse_weights(specs: list[str]) -> list[tuple[str, float]]:
+    """["acme/monorepo=1", "acme/*=3"] -> [(шаблон, вес)]; ошибочные элементы пропускаются"""
+    weights = []
+    for spec in specs:
+        pattern, _, value = spec.rpartition("=")
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = 0.0
+        if not pattern.strip() or weight <= 0:
+            log.error(f"❌ SEND_REPO_WEIGHTS: '{spec}' — ожидается owner/repo=вес (вес > 0)")
+            continue
+        weights.append((pattern.strip(), weight))
+    return weights
+
+
+class RepoQueue:
+    """Состояние одного репозитория в очереди отправки"""
+    __slots__ = ("weight", "queued", "sent", "dropped", "overflowing", "wait_sum", "wait_count", "waits",
+                 "active_at")
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        # Сейчас отбрасываем (чтобы писать в лог только начало переполнения)
+        self.overflowing = False
+        self.wait_sum = 0.0
+        self.wait_count = 0
+        self.waits: deque[float] = deque(maxlen=WAIT_WINDOW)
+        self.active_at = time.monotonic()
+
+
+class RepoFairness:
+    """Веса, лимиты backlog'а и статистика очереди отправки по репозиториям"""
+
+    def __init__(self, weights: list[tuple[str, float]], max_queued: int):
+        self.weights = weights
+        self.max_queued = max_queued
+        self._repos: dict[str, RepoQueue] = {}
+
+    def _match_weight(self, repo: str) -> float:
+        for pattern, weight in self.weights:
+            if fnmatch.fnmatchcase(repo, pattern):
+                return weight
+        return 1.0
+
+    def _queue(self, repo: str) -> RepoQueue:
+        queue = self._repos.get(repo)
+        if queue is None:
+            if len(self._repos) >= MAX_TRACKED_REPOS:
+                self._evict()
+            queue = self._repos[repo] = RepoQueue(self._match_weight(repo))
+        return queue
+
+    def _evict(self) -> None:
+        # Удаляем десятую часть давно молчащих, чтобы не сортировать на каждый новый репозиторий
+        idle = sorted((queue.active_at, repo) for repo, queue in self._repos.items() if not queue.queued)
+        for _, repo in idle[:MAX_TRACKED_REPOS // 10 + 1]:
+            del self._repos[repo]
+
+    def weight(self, repo: str | None) -> float:
+        """Вес репозитория в полосе отправки"""
+        if repo is None:
+            return 1.0
+        queue = self._repos.get(repo)
+        return queue.weight if queue is not None else self._match_weight(repo)
+
+    def admit(self, repo: str | None, count: int = 1) -> bool:
+        """
+        Учитывает count сообщений репозитория в очереди.
+
+        :return: False, если backlog репозитория уже на лимите — уведомление нужно отбросить
+        """
+        if repo is None:
+            return True
+        queue = self._queue(repo)
+        queue.active_at = time.monotonic()
+        if self.max_queued and queue.queued and queue.queued + count > self.max_queued:
+            queue.dropped += count
+            if not queue.overflowing:
+                queue.overflowing = True
+                log.warning(
+                    f"⚠️ Очередь отправки {repo}: {queue.queued} сообщений (SEND_REPO_MAX_QUEUED = "
+                    f"{self.max_queued}), новые уведомления репозитория отбрасываются"
+                )
+            return False
+        queue.overflowing = False
+        queue.queued += count
+        return True
+
+    def observe_wait(self, repo: str | None, seconds: float) -> None:
+        """Сколько сообщение ждало в очереди до попытки отправки"""
+        queue = self._repos.get(repo) if repo is not None else None
+        if queue is None:
+            return
+        queue.wait_sum += seconds
+        queue.wait_count += 1
+        queue.waits.append(seconds)
+
+    def release(self, repo: str | None, count: int = 1) -> None:
+        """Сообщения репозитория покинули очередь (отправлены или нет)"""
+        queue = self._repos.get(repo) if repo is not None else None
+        if queue is None:
+            return
+        queue.queued -= count
+        queue.sent += count
+
+    def stats(self) -> dict:
+        busiest = sorted(self._repos.items(), key=lambda item: (item[1].queued, item[1].dropped), reverse=True)
+        return {
+            "repos": len(self._repos),
+            "max_queued": self.max_queued,
+            "weights": {pattern: weight for pattern, weight in self.weights},
+            "queued": sum(queue.queued for queue in self._repos.values()),
+            "dropped": sum(queue.dropped for queue in self._repos.values()),
+            "top": {
+                repo: {
+                    "weight": queue.weight,
+                    "queued": queue.queued,
+                    "sent": queue.sent,
+                    "dropped": queue.dropped,
+                    "wait_avg_ms": round(queue.wait_sum / queue.wait_count * 1000, 1) if queue.wait_count else 0.0,
+                    "wait_max_ms": round(max(queue.waits) * 1000, 1) if queue.waits else 0.0,
+                }
+                for repo, queue in busiest[:TOP_REPOS]
+            },
+        }
+
+    def prometheus(self) -> list[str]:
+        """Метрики по репозиториям в текстовом формате Prometheus"""
+        repos = [(_label(repo), queue) for repo, queue in self._repos.items()]
+        lines = [
+            "# HELP notifier_repo_queued Messages of the repository waiting to be sent.",
+            "# TYPE notifier_repo_queued gauge",
+        ]
+        lines += [f'notifier_repo_queued{{repo="{repo}"}} {queue.queued}' for repo, queue in repos]
+        lines += [
+            "# HELP notifier_repo_weight Fair queuing weight of the repository.",
+            "# TYPE notifier_repo_weight gauge",
+        ]
+        lines += [f'notifier_repo_weight{{repo="{repo}"}} {queue.weight:g}' for repo, queue in repos]
+        lines += [
+            "# HELP notifier_repo_sent_total Messages of the repository that left the send queue.",
+            "# TYPE notifier_repo_sent_total counter",
+        ]
+        lines += [f'notifier_repo_sent_total{{repo="{repo}"}} {queue.sent}' for repo, queue in repos]
+        lines += [
+            "# HELP notifier_repo_dropped_total Messages dropped because the repository backlog was full.",
+            "# TYPE notifier_repo_dropped_total counter",
+        ]
+        lines += [f'notifier_repo_dropped_total{{repo="{repo}"}} {queue.dropped}' for repo, queue in repos]
+        lines += [
+            "# HELP notifier_repo_queue_wait_seconds Time messages waited in the send queue before a send attempt.",
+            "# TYPE notifier_repo_queue_wait_seconds summary",
+        ]
+        for repo, queue in repos:
+            lines += [
+                f'notifier_repo_queue_wait_seconds_sum{{repo="{repo}"}} {queue.wait_sum:.6f}',
+                f'notifier_repo_queue_wait_seconds_count{{repo="{repo}"}} {queue.wait_count}',
+            ]
+        lines += [
+            "# HELP notifier_repo_queue_wait_max_seconds Maximum send queue wait over the recent window.",
+            "# TYPE notifier_repo_queue_wait_max_seconds gauge",
+        ]
+        lines += [
+            f'notifier_repo_queue_wait_max_seconds{{repo="{repo}"}} {max(queue.waits) if queue.waits else 0.0:.6f}'
+            for repo, queue in repos
+        ]
+        return lines
+
+
+def _label(value: str) -> str:
+    """Экранирование значения метки Prometheus"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Общий экземпляр: учет ведется всегда, отбрасывание — при SEND_REPO_MAX_QUEUED > 0
+repo_fairness = RepoFairness(parse_weights(SEND_REPO_WEIGHTS), SEND_REPO_MAX_QUEUED)
@@ -2,6 +2,9 @@
 """
 Сервис для форматирования GitHub событий в красивые сообщения
 """
+from html import escape
+from typing import TYPE_CHECKING
+
 from loguru import logger as log
 
 from app.schemas.github_payload import (
@@ -12,16 +15,43 @@ from app.schemas.github_payload import (
     GitHubIssuesPayload,
     GitHubCheckRunPayload,
     GitHubReleasePayload, GitHubIssueCommentPayload,
+    PUSH_COMMITS_PREVIEW,
     # Удалены: PullRequest, Repository, Review, Issue, CheckRun, Release, Commit, GitHubUser,
     # так как они не используются напрямую, а только вложены в Payload
 )
 
+if TYPE_CHECKING:
+    # Только для аннотации: repeat_suppressor читает конфиг, а форматтеры импортируются и без окружения
+    from app.services.repeat_suppressor import RepeatWindow
+
+
+# Сколько файлов релиза показывать
+RELEASE_ASSETS_PREVIEW = 5
+# Сколько символов описания/комментария/changelog'а показывать в сообщении
+# (полный текст — по кнопке «Показать полностью», см. message_details)
+PR_BODY_PREVIEW = 200
+REVIEW_BODY_PREVIEW = 150
+ISSUE_BODY_PREVIEW = 200
+COMMENT_BODY_PREVIEW = 200
+RELEASE_BODY_PREVIEW = 300
+# Длина заголовка коммита в сообщении о push'е
+COMMIT_TITLE_PREVIEW = 60
+
+
+def _format_size(size: int) -> str:
+    """Размер в человекочитаемом виде"""
+    for unit in ("Б", "КБ", "МБ"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ГБ"
+
 
 # ============================================================================
 # PULL REQUESTS
 # ============================================================================
 
-def format_pr_message(payload: GitHubPullRequestPayload) -> str | None:
+def format_pr_message(payload: GitHubPullRequestPayload, enrichment: dict | None = None) -> str | None:
     """Форматирует красивое сообщение о Pull Request"""
     pr = payload.pull_request
     repo = payload.repository
@@ -48,9 +78,16 @@ def format_pr_message(payload: GitHubPullRequestPayload) -> str | None:
         f"👤 <b>Автор:</b> <a href='{user.html_url}'>@{user.login}</a>\n"
     )
 
+    # Статистика изменений из GitHub API (если включено обогащение)
+    if enrichment and enrichment.get("additions") is not None:
+        text += (
+            f"📊 <b>Изменения:</b> +{enrichment['additions']} −{enrichment['deletions']}, "
+            f"файлов: {enrichment['changed_files']}, коммитов: {enrichment['commits']}\n"
+        )
+
     # Добавляем описание, если есть
     if pr.body:
-        short_body = pr.body[:200] + "..." if len(pr.body) > 200 else pr.body
+        short_body = pr.body[:PR_BODY_PREVIEW] + "..." if len(pr.body) > PR_BODY_PREVIEW else pr.body
         # Экранируем HTML
         short_body = short_body.replace("<", "&lt;").replace(">", "&gt;")
         text += f"\n💬 <i>{short_body}</i>\n"
@@ -97,7 +134,8 @@ def format_pr_review_message(payload: GitHubPullRequestReviewPayload) -> str | N
 
     # Добавляем комментарий, если есть
     if review.body:
-        short_body = review.body[:150] + "..." if len(review.body) > 150 else review.body
+        short_body = (review.body[:REVIEW_BODY_PREVIEW] + "..."
+                      if len(review.body) > REVIEW_BODY_PREVIEW else review.body)
         short_body = short_body.replace("<", "&lt;").replace(">", "&gt;")
         text += f"\n💭 <i>{short_body}</i>\n"
 
@@ -115,13 +153,14 @@ def format_push_message(payload: GitHubPushPayload) -> str | None:
     repo = payload.repository
     sender = payload.sender
     commits = payload.commits
+    commits_count = payload.commits_count
     ref = payload.ref
 
     # Извлекаем имя ветки из ref (refs/heads/main -> main)
     branch = ref.split('/')[-1] if '/' in ref else ref
 
     # Если коммитов нет, игнорируем
-    if not commits:
+    if not commits_count:
         log.debug("Push без коммитов, игнорируется")
         return None
 
@@ -132,25 +171,26 @@ def format_push_message(payload: GitHubPushPayload) -> str | None:
         f"🏷 <b>Репозиторий:</b> <a href='{repo.html_url}'>{repo.full_name}</a>\n"
         f"🌿 <b>Ветка:</b> <code>{branch}</code>\n"
         f"👤 <b>Автор:</b> <a href='{sender.html_url}'>@{sender.login}</a>\n"
-        f"📊 <b>Коммитов:</b> {len(commits)}\n\n"
+        f"📊 <b>Коммитов:</b> {commits_count}\n\n"
     )
 
-    # Добавляем коммиты (максимум 5, чтобы не спамить)
-    max_commits = 5
+    # Добавляем коммиты (максимум 5, чтобы не спамить).
+    # Схема уже отдает не больше PUSH_COMMITS_PREVIEW коммитов
+    max_commits = PUSH_COMMITS_PREVIEW
     for i, commit in enumerate(commits[:max_commits], 1):
         # Короткий хеш (первые 7 символов)
         short_sha = commit.id[:7]
         # Первая строка сообщения коммита
         commit_message = commit.message.split('\n')[0]
         # Обрезаем слишком длинные сообщения
-        if len(commit_message) > 60:
-            commit_message = commit_message[:60] + "..."
+        if len(commit_message) > COMMIT_TITLE_PREVIEW:
+            commit_message = commit_message[:COMMIT_TITLE_PREVIEW] + "..."
 
         text += f"{i}. <code>{short_sha}</code> {commit_message}\n"
 
     # Если коммитов больше, добавляем примечание
-    if len(commits) > max_commits:
-        text += f"\n<i>... и еще {len(commits) - max_commits} коммитов</i>\n"
+    if commits_count > max_commits:
+        text += f"\n<i>... и еще {commits_count - max_commits} коммитов</i>\n"
 
     # Ссылка на сравнение
     if payload.before and payload.after:
@@ -191,7 +231,7 @@ def format_issues_message(payload: GitHubIssuesPayload) -> str | None:
 
     # Добавляем описание
     if issue.body:
-        short_body = issue.body[:200] + "..." if len(issue.body) > 200 else issue.body
+        short_body = issue.body[:ISSUE_BODY_PREVIEW] + "..." if len(issue.body) > ISSUE_BODY_PREVIEW else issue.body
         short_body = short_body.replace("<", "&lt;").replace(">", "&gt;")
         text += f"\n💬 <i>{short_body}</i>\n"
 
@@ -204,7 +244,7 @@ def format_issues_message(payload: GitHubIssuesPayload) -> str | None:
 # CHECK RUNS (CI/CD)
 # ============================================================================
 
-def format_check_run_message(payload: GitHubCheckRunPayload) -> str | None:
+def format_check_run_message(payload: GitHubCheckRunPayload, enrichment: dict | None = None) -> str | None:
     """Форматирует сообщение о Check Run (CI/CD)"""
     check = payload.check_run
     repo = payload.repository
@@ -232,9 +272,14 @@ def format_check_run_message(payload: GitHubCheckRunPayload) -> str | None:
         f"━━━━━━━━━━━━━━━━━━━━━\n"
         f"📦 <b>Репозиторий:</b> <a href='{repo.html_url}'>{repo.full_name}</a>\n"
         f"🔧 <b>Проверка:</b> {check.name}\n"
-        f"\n🔗 <a href='{check.html_url}'>Посмотреть детали</a>"
     )
 
+    # Упавший шаг из GitHub API (если включено обогащение)
+    if enrichment and enrichment.get("failed_step"):
+        text += f"🧩 <b>Упал шаг:</b> {escape(enrichment['failed_step'], quote=False)}\n"
+
+    text += f"\n🔗 <a href='{check.html_url}'>Посмотреть детали</a>"
+
     return text
 
 
@@ -242,7 +287,7 @@ def format_check_run_message(payload: GitHubCheckRunPayload) -> str | None:
 # RELEASES
 # ============================================================================
 
-def format_release_message(payload: GitHubReleasePayload) -> str | None:
+def format_release_message(payload: GitHubReleasePayload, enrichment: dict | None = None) -> str | None:
     """Форматирует сообщение о Release"""
     release = payload.release
     repo = payload.repository
@@ -272,10 +317,20 @@ def format_release_message(payload: GitHubReleasePayload) -> str | None:
 
     # Добавляем changelog
     if release.body:
-        short_body = release.body[:300] + "..." if len(release.body) > 300 else release.body
+        short_body = (release.body[:RELEASE_BODY_PREVIEW] + "..."
+                      if len(release.body) > RELEASE_BODY_PREVIEW else release.body)
         short_body = short_body.replace("<", "&lt;").replace(">", "&gt;")
         text += f"\n📜 <b>Changelog:</b>\n<i>{short_body}</i>\n"
 
+    # Файлы релиза из GitHub API (если включено обогащение)
+    if enrichment and enrichment.get("assets"):
+        assets = enrichment["assets"]
+        text += "\n📎 <b>Файлы:</b>\n"
+        for asset in assets[:RELEASE_ASSETS_PREVIEW]:
+            text += f"• <code>{escape(asset['name'] or '', quote=False)}</code> ({_format_size(asset['size'])})\n"
+        if len(assets) > RELEASE_ASSETS_PREVIEW:
+            text += f"<i>...и еще {len(assets) - RELEASE_ASSETS_PREVIEW}</i>\n"
+
     text += f"\n🔗 <a href='{release.html_url}'>Посмотреть релиз</a>"
 
     return text
@@ -318,11 +373,49 @@ def format_comment_message(payload: GitHubIssueCommentPayload) -> str | None:
 
     # Добавляем текст комментария
     if comment.body:
-        short_body = comment.body[:200] + "..." if len(comment.body) > 200 else comment.body
+        short_body = (comment.body[:COMMENT_BODY_PREVIEW] + "..."
+                      if len(comment.body) > COMMENT_BODY_PREVIEW else comment.body)
         # Простая защита от HTML-инъекций
         short_body = short_body.replace("<", "&lt;").replace(">", "&gt;")
         text += f"\n<i>{short_body}</i>\n"
 
     text += f"\n🔗 <a href='{comment.html_url}'>Перейти к комментарию</a>"
 
-    return text
\ No newline at end of file
+    return text
+
+
+# ============================================================================
+# REPEAT SUMMARIES
+# ============================================================================
+
+# Исход события -> глагол для сводки ("Проверка ... упала 5×")
+REPEAT_OUTCOMES = {
+    "failure": "упала",
+    "success": "прошла",
+    "cancelled": "отменена",
+    "timed_out": "превысила время",
+    "skipped": "пропущена",
+    "closed": "закрыта",
+    "reopened": "переоткрыта",
+}
+
+
+def format_repeat_summary(window: "RepeatWindow", window_seconds: float) -> str:
+    """Сводка по повторам вместо нескольких одинаковых сообщений"""
+    outcome = REPEAT_OUTCOMES.get(window.outcome, window.outcome)
+    minutes = max(1, round(window_seconds / 60))
+    if window.event_type == "issues":
+        # Ключ задачи — без действия: считаем смены состояния и показываем текущее
+        headline = f"{escape(window.subject, quote=False)} закрывали и переоткрывали {window.count}× за {minutes} мин"
+        state = f"📌 <b>Сейчас:</b> {outcome}\n"
+    else:
+        headline = f"{escape(window.subject, quote=False)} {outcome} {window.count}× за {minutes} мин"
+        state = ""
+    return (
+        f"🔁 <b>{headline}</b>\n"
+        f"━━━━━━━━━━━━━━━━━━━━━\n"
+        f"{state}"
+        f"📦 <b>Репозиторий:</b> {window.repo}\n"
+        f"🔕 Повторных уведомлений скрыто: {window.suppressed}\n"
+        f"\n🔗 <a href='{window.url}'>Последнее событие</a>"
+    )
@@ -0,0 +1,121 @@
+# app/services/routing.py
+"""
+Маршрутизация уведомлений: событие -> маршрут (топик) -> список получателей.
+
+Основной получатель — NOTIFY_CHANNEL_ID с топиком маршрута.
+Дополнительные получатели описываются в ROUTES_PATH (JSON), например:
+
+    [
+      {"chat_id": -1002222222222, "routes": ["releases", "cicd"], "repos": ["org/app-*"]},
+      {"chat_id": -1003333333333, "topic_id": 5, "routes": ["releases"], "template": "compact"}
+    ]
+
+routes и repos поддерживают glob-шаблоны ("*" — все).
+template: full — полное сообщение, compact — заголовок, репозиторий и ссылка.
+"""
+import fnmatch
+import functools
+import json
+from typing import List, Optional
+
+from loguru import logger as log
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+
+from app.core.config import NOTIFY_CHANNEL_ID, ROUTES_PATH
+
+# Событие -> маршрут (топик), куда оно отправляется
+EVENT_ROUTES = {
+    "push": "push",
+    "pull_request": "pr",
+    "pull_request_review": "pr",
+    "issue_comment": "pr",
+    "issues": "issues",
+    "check_run": "cicd",
+    "release": "releases",
+}
+
+TEMPLATES = ("full", "compact")
+
+
+class Destination(BaseModel):
+    """Получатель уведомлений"""
+    model_config = ConfigDict(extra='forbid', frozen=True)
+
+    chat_id: int
+    topic_id: Optional[int] = None
+    routes: List[str] = ["*"]
+    repos: List[str] = ["*"]
+    template: str = "full"
+
+    def matches(self, route: str, repo: str | None) -> bool:
+        if not any(fnmatch.fnmatchcase(route, pattern) for pattern in self.routes):
+            return False
+        return any(fnmatch.fnmatchcase(repo or "", pattern) for pattern in self.repos)
+
+
+def load_destinations(path: str) -> list[Destination]:
+    """Читает дополнительных получателей из JSON (файла может не быть)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, json.JSONDecodeError) as e:
+        log.error(f"❌ Не удалось прочитать {path}: {e}")
+        return []
+
+    try:
+        destinations = TypeAdapter(List[Destination]).validate_python(raw)
+    except ValidationError as e:
+        log.error(f"❌ Ошибка в {path}: {e}")
+        return []
+
+    for destination in destinations:
+        if destination.template not in TEMPLATES:
+            log.warning(f"⚠️ Неизвестный шаблон '{destination.template}' для {destination.chat_id}, используем full")
+    log.info(f"📬 Дополнительных получателей: {len(destinations)} ({path})")
+    return destinations
+
+
+extra_destinations = load_destinations(ROUTES_PATH)
+
+
+@functools.cache
+def _primary_destination(topic_id: int | None) -> Destination:
+    # Модель неизменяемая: один экземпляр на топик для всех сообщений в очереди
+    return Destination(chat_id=NOTIFY_CHANNEL_ID, topic_id=topic_id)
+
+
+def resolve_destinations(route: str, repo: str | None, topic_id: int | None) -> list[Destination]:
+    """
+    Список получателей события: основной канал + подходящие из ROUTES_PATH.
+    Повторы (тот же чат и топик) отбрасываются.
+    """
+    destinations = []
+    if NOTIFY_CHANNEL_ID:
+        destinations.append(_primary_destination(topic_id))
+
+    seen = {(d.chat_id, d.topic_id) for d in destinations}
+    for destination in extra_destinations:
+        if destination.matches(route, repo) and (destination.chat_id, destination.topic_id) not in seen:
+            seen.add((destination.chat_id, destination.topic_id))
+            destinations.append(destination)
+    return destinations
+
+
+def render_compact(text: str, repo: str | None) -> str:
+    """Короткая версия сообщения: заголовок, репозиторий и ссылка (последняя строка)"""
+    lines = text.strip().split("\n")
+    parts = [lines[0]]
+    if repo:
+        parts.append(f"📦 {repo}")
+    if len(lines) > 1 and "<a " in lines[-1]:
+        parts.append(lines[-1])
+    return "\n".join(parts)
+
+
+def render_for(template: str, text: str, repo: str | None, cache: dict[str, str]) -> str:
+    """Рендер под шаблон получателя; один раз на шаблон для всех получателей"""
+    if template not in cache:
+        cache[template] = render_compact(text, repo) if template == "compact" else text
+    return cache[template]
@@ -0,0 +1,174 @@
+# app/services/send_queue.py
+"""
+Компактная запись об уведомлении в очереди отправки и бюджет памяти очереди.
+
+При большом отставании (лимит Telegram, недоступный чат) в очередях копятся
+тысячи сообщений. QueuedMessage держит только то, что нужно отправке:
+получателя, ключи, готовый текст, приоритет и время постановки в очередь.
+Модели payload'ов и промежуточные данные до очереди не доходят, а ключи
+интернируются (sys.intern): тысячи сообщений одного PR или репозитория
+ссылаются на одну строку.
+
+Бюджет считает байты по факту — sys.getsizeof записей и текстов (текст,
+общий для нескольких получателей, считается один раз) плюс накладные расходы
+ожидающего сообщения (message_overhead): фоновая задача, кадры корутин отправителя,
+future и запись полосы весят в разы больше самой записи с текстом. Их размер зависит
+от сборки интерпретатора, поэтому при старте он замеряется (см. queue_calibration),
+а до замера используется оценка DEFAULT_MESSAGE_OVERHEAD_BYTES. Если уведомление
+не влезает в SEND_QUEUE_MAX_BYTES, отправка ждет освобождения места.
+Ожидающие разных потоков (репозиториев) получают место по очереди с учетом весов —
+та же взвешенная честная очередь, что и в полосах (см. lane_scheduler), поэтому
+backlog шумного репозитория не держит остальных перед заполненным бюджетом.
+Внутри потока место выдается строго в порядке поступления, и порядок сообщений
+в полосах не нарушается. Уведомление больше всего бюджета пропускается, когда очередь пуста.
+"""
+import asyncio
+import heapq
+import itertools
+import sys
+import time
+from typing import Hashable
+
+from app.core.config import SEND_QUEUE_MAX_BYTES
+
+PRIORITY_NORMAL = 0
+PRIORITY_URGENT = 1
+
+# Оценка памяти ожидающего отправки сообщения помимо записи и текста (CPython 3.11) — до замера при старте
+DEFAULT_MESSAGE_OVERHEAD_BYTES = 5500
+
+
+def intern_key(value: str | None) -> str | None:
+    """Одна строка на ключ для всех сообщений в очереди"""
+    return sys.intern(value) if value is not None else None
+
+
+class QueuedMessage:
+    """Сообщение одному получателю, ожидающее отправки"""
+    __slots__ = ("chat_id", "topic_id", "event_type", "ordering_key", "repo", "text", "priority", "detail_token",
+                 "queued_at")
+
+    def __init__(self, chat_id: int, topic_id: int | None, event_type: str, text: str,
+                 ordering_key: str | None = None, repo: str | None = None, priority: int = PRIORITY_NORMAL,
+                 detail_token: str | None = None):
+        self.chat_id = chat_id
+        self.topic_id = topic_id
+        self.event_type = intern_key(event_type)
+        self.ordering_key = intern_key(ordering_key)
+        self.repo = intern_key(repo)
+        self.text = text
+        self.priority = priority
+        # Токен подробностей (кнопка «Показать полностью»), общий для всех получателей
+        self.detail_token = detail_token
+        self.queued_at = time.monotonic()
+
+    @property
+    def urgent(self) -> bool:
+        return self.priority >= PRIORITY_URGENT
+
+
+class SendBudget:
+    """Учет байтов в очереди отправки и ожидание места (0 — без лимита, только учет)"""
+
+    def __init__(self, max_bytes: int, message_overhead: int = DEFAULT_MESSAGE_OVERHEAD_BYTES):
+        self.max_bytes = max_bytes
+        # Память ожидающего сообщения помимо записи и текста (замеряется при старте)
+        self.message_overhead = message_overhead
+        self.bytes = 0
+        self.messages = 0
+        self.peak_bytes = 0
+        self.waits = 0
+        # Куча (метка окончания, номер, поток, байты, сообщения, future)
+        self._waiters: list[tuple[float, int, Hashable, int, int, asyncio.Future]] = []
+        # Метка последнего ожидающего потока и виртуальное время — как в _Lane
+        self._finish: dict[Hashable, float] = {}
+        self._virtual = 0.0
+        self._seq = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def size_of(self, messages: list[QueuedMessage]) -> int:
+        """
+        Память, которую занимают сообщения в очереди: записи, тексты и накладные расходы ожидающих.
+        Интернированные ключи и id чатов общие для всей очереди и не считаются.
+        """
+        total = self.message_overhead * len(messages)
+        texts: set[int] = set()
+        for message in messages:
+            total += sys.getsizeof(message)
+            if id(message.text) not in texts:
+                texts.add(id(message.text))
+                total += sys.getsizeof(message.text)
+        return total
+
+    def _fits(self, size: int) -> bool:
+        return not self.enabled or not self.bytes or self.bytes + size <= self.max_bytes
+
+    def _take(self, size: int, count: int) -> None:
+        self.bytes += size
+        self.messages += count
+        self.peak_bytes = max(self.peak_bytes, self.bytes)
+
+    async def acquire(self, size: int, count: int = 1, flow: Hashable = None, weight: float = 1.0) -> None:
+        """
+        Занимает size байт под count сообщений; ждет, пока не освободится место.
+
+        :param flow: Поток (репозиторий): ожидающие разных потоков чередуются по весам
+        :param weight: Вес потока (> 0)
+        """
+        if not self._waiters and self._fits(size):
+            self._take(size, count)
+            return
+
+        self.waits += 1
+        future = asyncio.get_running_loop().create_future()
+        tag = max(self._virtual, self._finish.get(flow, 0.0)) + 1 / weight
+        self._finish[flow] = tag
+        heapq.heappush(self._waiters, (tag, next(self._seq), flow, size, count, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Место уже выделено, но ждавший отменен — возвращаем
+                self.release(size, count)
+            else:
+                self._wake()
+            raise
+
+    def release(self, size: int, count: int = 1) -> None:
+        self.bytes -= size
+        self.messages -= count
+        self._wake()
+
+    def _wake(self) -> None:
+        # По меткам: следующий ждет, пока не влезет ожидающий с наименьшей
+        while self._waiters:
+            tag, _, flow, size, count, future = self._waiters[0]
+            if not future.done() and not self._fits(size):
+                break
+            heapq.heappop(self._waiters)
+            if self._finish.get(flow) == tag:
+                del self._finish[flow]
+            # Пустая очередь начинает отсчет заново, метки не растут бесконечно
+            self._virtual = tag if self._waiters else 0.0
+            if future.done():
+                continue
+            self._take(size, count)
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "max_bytes": self.max_bytes,
+            "message_overhead": self.message_overhead,
+            "bytes": self.bytes,
+            "messages": self.messages,
+            "peak_bytes": self.peak_bytes,
+            "waiting": len(self._waiters),
+            "waits": self.waits,
+        }
+
+
+# Общий экземпляр: учет ведется всегда, ожидание — только при SEND_QUEUE_MAX_BYTES > 0
+send_budget = SendBudget(SEND_QUEUE_MAX_BYTES)
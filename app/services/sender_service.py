@@ -1,10 +1,20 @@
 # app/services/sender_service.py
-from aiogram.exceptions import TelegramAPIError
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
 from loguru import logger as log
 
+from app.bot.keyboards import detail_keyboard
 from app.bot.loader import bot
+from app.core.tracing import add_event, span
+from app.services.lane_scheduler import LaneScheduler, RetryLater
+from app.services.message_batcher import MessageBatcher
+from app.services.rate_limiter import ChatRateLimiter
+from app.services.repo_fairness import repo_fairness
+from app.services.routing import Destination, render_for, resolve_destinations
+from app.services.send_queue import PRIORITY_NORMAL, PRIORITY_URGENT, QueuedMessage, send_budget
 from app.core.config import (
-    NOTIFY_CHANNEL_ID,
     PR_TOPIC_ID,
     PUSH_TOPIC_ID,
     # --- ДОБАВЛЕННЫЕ КОНСТАНТЫ ---
@@ -13,105 +23,316 @@ from app.core.config import (
     # ----------------------------
     RELEASES_TOPIC_ID,
     SECURITY_TOPIC_ID,
+    SEND_MAX_IN_FLIGHT,
+    SEND_LANE_IDLE_SECONDS,
+    SEND_LANE_PER_ENTITY,
+    SEND_MAX_RETRIES,
+    BATCH_WINDOW_MS,
+    SEND_CHAT_RATE_PER_MINUTE,
+    SEND_CHAT_BURST,
 )
 
-async def send_comment_notification(text: str) -> bool:
+# Лимит частоты отправки в каждый чат
+chat_rate_limiter = ChatRateLimiter(SEND_CHAT_RATE_PER_MINUTE, SEND_CHAT_BURST)
+
+
+async def _throttle(lane_key: tuple) -> None:
+    await chat_rate_limiter.wait(lane_key[0])
+
+
+# Очередность внутри топика + параллельная отправка в разные топики и чаты
+lane_scheduler = LaneScheduler(
+    max_in_flight=SEND_MAX_IN_FLIGHT,
+    idle_timeout=SEND_LANE_IDLE_SECONDS,
+    max_retries=SEND_MAX_RETRIES,
+    throttle=_throttle if chat_rate_limiter.enabled else None,
+)
+
+async def send_comment_notification(
+    text: str, ordering_key: str | None = None, urgent: bool = False, repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
     Отправляет уведомление о комментарии.
     Используем PR_TOPIC_ID, так как комментарии чаще всего относятся к PR.
     Если хотите разделить, можно использовать ISSUES_TOPIC_ID для Issues.
     """
-    return await _send_to_channel(text, PR_TOPIC_ID, "Comment")
+    return await _send_to_channel(text, "pr", PR_TOPIC_ID, "Comment", ordering_key, urgent, repo, detail_token)
 
-async def send_pr_notification(text: str) -> bool:
+async def send_pr_notification(
+    text: str, ordering_key: str | None = None, urgent: bool = False, repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
     Отправляет уведомление о Pull Request в топик PR.
 
     :param text: Текст сообщения (HTML)
-    :return: True, если успешно, иначе False
+    :param ordering_key: Ключ PR/Issue, внутри которого важен порядок
+    :param urgent: Отправить без ожидания окна батчинга
+    :param repo: Репозиторий (owner/name) для выбора дополнительных получателей
+    :param detail_token: Токен подробностей для кнопки «Показать полностью»
+    :return: Статус доставки по каждому получателю
     """
-    return await _send_to_channel(text, PR_TOPIC_ID, "Pull Request")
+    return await _send_to_channel(
+        text, "pr", PR_TOPIC_ID, "Pull Request", ordering_key, urgent, repo, detail_token
+    )
 
 
 # === НОВОЕ: Pull Request Review ===
-async def send_pr_review_notification(text: str) -> bool:
+async def send_pr_review_notification(
+    text: str, ordering_key: str | None = None, urgent: bool = False, repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
     Отправляет уведомление о Pull Request Review в топик PR.
     (Ревью относятся к PR)
 
     :param text: Текст сообщения (HTML)
-    :return: True, если успешно, иначе False
+    :param ordering_key: Ключ PR/Issue, внутри которого важен порядок
+    :param urgent: Отправить без ожидания окна батчинга
+    :param repo: Репозиторий (owner/name) для выбора дополнительных получателей
+    :param detail_token: Токен подробностей для кнопки «Показать полностью»
+    :return: Статус доставки по каждому получателю
     """
-    return await _send_to_channel(text, PR_TOPIC_ID, "Pull Request Review")
+    return await _send_to_channel(
+        text, "pr", PR_TOPIC_ID, "Pull Request Review", ordering_key, urgent, repo, detail_token
+    )
 
 
 # === НОВОЕ: Issues ===
-async def send_issues_notification(text: str) -> bool:
+async def send_issues_notification(
+    text: str, ordering_key: str | None = None, urgent: bool = False, repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
     Отправляет уведомление об Issue в топик Issues.
 
     :param text: Текст сообщения (HTML)
-    :return: True, если успешно, иначе False
+    :param ordering_key: Ключ PR/Issue, внутри которого важен порядок
+    :param urgent: Отправить без ожидания окна батчинга
+    :param repo: Репозиторий (owner/name) для выбора дополнительных получателей
+    :param detail_token: Токен подробностей для кнопки «Показать полностью»
+    :return: Статус доставки по каждому получателю
     """
-    return await _send_to_channel(text, ISSUES_TOPIC_ID, "Issue")
+    return await _send_to_channel(
+        text, "issues", ISSUES_TOPIC_ID, "Issue", ordering_key, urgent, repo, detail_token
+    )
 
 
 # === НОВОЕ: CI/CD Check Run ===
-async def send_cicd_notification(text: str) -> bool:
+async def send_cicd_notification(
+    text: str, ordering_key: str | None = None, urgent: bool = False, repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
     Отправляет уведомление о CI/CD Check Run в топик CI/CD.
 
     :param text: Текст сообщения (HTML)
-    :return: True, если успешно, иначе False
+    :param ordering_key: Ключ PR/Issue, внутри которого важен порядок
+    :param urgent: Отправить без ожидания окна батчинга
+    :param repo: Репозиторий (owner/name) для выбора дополнительных получателей
+    :param detail_token: Токен подробностей для кнопки «Показать полностью»
+    :return: Статус доставки по каждому получателю
     """
-    return await _send_to_channel(text, CICD_TOPIC_ID, "CI/CD Check Run")
+    return await _send_to_channel(
+        text, "cicd", CICD_TOPIC_ID, "CI/CD Check Run", ordering_key, urgent, repo, detail_token
+    )
 
 
-async def send_push_notification(text: str) -> bool:
+async def send_push_notification(
+    text: str, ordering_key: str | None = None, urgent: bool = False, repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
     Отправляет уведомление о Push в топик Push.
 
     :param text: Текст сообщения (HTML)
-    :return: True, если успешно, иначе False
+    :param ordering_key: Ключ PR/Issue, внутри которого важен порядок
+    :param urgent: Отправить без ожидания окна батчинга
+    :param repo: Репозиторий (owner/name) для выбора дополнительных получателей
+    :param detail_token: Токен подробностей для кнопки «Показать полностью»
+    :return: Статус доставки по каждому получателю
     """
-    return await _send_to_channel(text, PUSH_TOPIC_ID, "Push")
+    return await _send_to_channel(text, "push", PUSH_TOPIC_ID, "Push", ordering_key, urgent, repo, detail_token)
 
-async def send_releases_notification(text: str) -> bool:
+async def send_releases_notification(
+    text: str, ordering_key: str | None = None, urgent: bool = False, repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
     Отправляет уведомление о Releases в топик Releases.
 
     :param text: Текст сообщения (HTML)
-    :return: True, если успешно, иначе False
+    :param ordering_key: Ключ PR/Issue, внутри которого важен порядок
+    :param urgent: Отправить без ожидания окна батчинга
+    :param repo: Репозиторий (owner/name) для выбора дополнительных получателей
+    :param detail_token: Токен подробностей для кнопки «Показать полностью»
+    :return: Статус доставки по каждому получателю
     """
-    return await _send_to_channel(text, RELEASES_TOPIC_ID, "Release")
+    return await _send_to_channel(
+        text, "releases", RELEASES_TOPIC_ID, "Release", ordering_key, urgent, repo, detail_token
+    )
 
 
-async def _send_to_channel(text: str, topic_id: int | None, event_type: str) -> bool:
+async def _send_to_channel(
+    text: str,
+    route: str,
+    topic_id: int | None,
+    event_type: str,
+    ordering_key: str | None = None,
+    urgent: bool = False,
+    repo: str | None = None,
+    detail_token: str | None = None,
+) -> list[dict]:
     """
-    Внутренняя функция для отправки сообщения в канал/топик.
+    Внутренняя функция для отправки сообщения всем получателям маршрута.
+
+    Получатели — основной канал (NOTIFY_CHANNEL_ID + топик маршрута) и
+    подходящие чаты из ROUTES_PATH. Текст рендерится один раз на шаблон,
+    отправка во все чаты идет параллельно, у каждого чата своя очередь и
+    свой лимит частоты, поэтому недоступный чат не задерживает остальные.
+    Пока сообщения в очереди, их размер учитывается в бюджете SEND_QUEUE_MAX_BYTES,
+    а число — в backlog'е репозитория: сверх SEND_REPO_MAX_QUEUED уведомление отбрасывается.
 
     :param text: Текст сообщения (HTML)
-    :param topic_id: ID топика (может быть None)
+    :param route: Маршрут события (push, pr, issues, cicd, releases)
+    :param topic_id: ID топика основного канала (может быть None)
     :param event_type: Тип события (для логов)
+    :param ordering_key: Ключ PR/Issue, внутри которого важен порядок
+    :param urgent: Отправить без ожидания окна батчинга
+    :param repo: Репозиторий (owner/name)
+    :param detail_token: Токен подробностей для кнопки «Показать полностью»
+    :return: Статус доставки по каждому получателю
+    """
+    destinations = resolve_destinations(route, repo, topic_id)
+    if not destinations:
+        log.warning(f"[{event_type}] Нет получателей (NOTIFY_CHANNEL_ID не задан). Сообщение не отправлено.")
+        return []
+
+    if not repo_fairness.admit(repo, len(destinations)):
+        return [
+            {"chat_id": destination.chat_id, "topic_id": destination.topic_id, "template": destination.template,
+             "ok": False, "reason": "repo_backlog_full"}
+            for destination in destinations
+        ]
+
+    renders: dict[str, str] = {}
+    priority = PRIORITY_URGENT if urgent else PRIORITY_NORMAL
+    messages = [
+        QueuedMessage(destination.chat_id, destination.topic_id, event_type,
+                      render_for(destination.template, text, repo, renders), ordering_key, repo, priority,
+                      detail_token)
+        for destination in destinations
+    ]
+    size = send_budget.size_of(messages)
+    try:
+        # Перед заполненным бюджетом репозитории тоже ждут по весам, а не строго по очереди
+        await send_budget.acquire(size, len(messages), flow=repo, weight=repo_fairness.weight(repo))
+        try:
+            if len(messages) == 1:
+                # Обычный случай — один получатель: без лишней задачи на время ожидания в очереди
+                return [await _send_to_destination(destinations[0], messages[0])]
+            return list(await asyncio.gather(*(
+                _send_to_destination(destination, message) for destination, message in zip(destinations, messages)
+            )))
+        finally:
+            send_budget.release(size, len(messages))
+    finally:
+        repo_fairness.release(repo, len(messages))
+
+
+async def _send_to_destination(destination: Destination, message: QueuedMessage) -> dict:
+    """
+    Отправляет сообщение одному получателю.
+
+    Сообщения одного репозитория в топике (или одного PR/Issue при SEND_LANE_PER_ENTITY)
+    уходят строго по порядку, разные репозитории в топике чередуются по весам
+    SEND_REPO_WEIGHTS, разные топики отправляются параллельно.
+    При включенном батчинге (BATCH_WINDOW_MS) сообщения репозитория в топике склеиваются
+    (у склеенных сообщений нет кнопки «Показать полностью»).
+
+    :return: {"chat_id", "topic_id", "template", "ok"}
+    """
+    chat_id, topic_id, event_type = message.chat_id, message.topic_id, message.event_type
+
+    with span(
+        "webhook.deliver",
+        telegram__chat_id=chat_id,
+        telegram__topic_id=topic_id,
+        notification__type=event_type,
+        notification__template=destination.template,
+        notification__urgent=message.urgent,
+        message__length=len(message.text),
+    ) as current:
+        if message_batcher:
+            # Батч склеивает разные PR/Issue репозитория, поэтому порядок держим на уровне топика;
+            # у каждого репозитория свой батч — поток в честной очереди полосы
+            success = await message_batcher.add((chat_id, topic_id, message.repo), message.text, message.urgent)
+        else:
+            lane_key = (chat_id, topic_id, message.ordering_key if SEND_LANE_PER_ENTITY else None)
+            success = await _deliver(lane_key, message.text, message)
+        if current is not None:
+            current.set_attribute("delivery.success", success)
+
+    topic_info = f":{topic_id}" if topic_id else " (общий чат)"
+    if success:
+        log.info(f"✅ [{event_type}] Уведомление отправлено в {chat_id}{topic_info}")
+    else:
+        log.error(f"❌ [{event_type}] Уведомление не доставлено в {chat_id}{topic_info}")
+    return {"chat_id": chat_id, "topic_id": topic_id, "template": destination.template, "ok": success}
+
+
+async def _deliver(lane_key: tuple, text: str, message: QueuedMessage | None = None,
+                   repo: str | None = None) -> bool:
+    """
+    Отправляет текст через полосу lane_key = (chat_id, topic_id, ordering_key).
+
+    :param message: Запись очереди (для склеенного батча — None). Из нее берутся репозиторий
+        (поток честной очереди), время постановки в очередь и токен кнопки «Показать полностью»
+    :param repo: Репозиторий склеенного батча (если message не передан)
     :return: True, если успешно, иначе False
     """
-    if not NOTIFY_CHANNEL_ID:
-        log.warning(f"[{event_type}] NOTIFY_CHANNEL_ID не задан. Сообщение не отправлено.")
-        return False
+    chat_id, topic_id, _ = lane_key
+    repo = message.repo if message is not None else repo
+    detail_token = message.detail_token if message is not None else None
+
+    async def send() -> None:
+        # Выполняется в фоновой полосе, но в контексте вызывающего — спан попадает в тот же трейс
+        queue_wait_ms = None
+        if message is not None:
+            queue_wait = time.monotonic() - message.queued_at
+            repo_fairness.observe_wait(repo, queue_wait)
+            queue_wait_ms = queue_wait * 1000
+        with span("telegram.send_message", telegram__chat_id=chat_id, telegram__topic_id=topic_id,
+                  queue__wait_ms=queue_wait_ms):
+            try:
+                await bot.send_message(
+                    chat_id=chat_id,
+                    message_thread_id=topic_id,  # Если None, отправит в общий чат
+                    text=text,
+                    disable_web_page_preview=True,
+                    # Клавиатура строится при отправке: в очереди лежит только токен
+                    reply_markup=detail_keyboard(detail_token) if detail_token else None,
+                )
+            except TelegramRetryAfter as e:
+                # Telegram просит подождать — полоса повторит отправку, сохранив порядок
+                add_event("telegram.retry_after", retry_after=e.retry_after)
+                raise RetryLater(e.retry_after) from e
 
     try:
-        await bot.send_message(
-            chat_id=NOTIFY_CHANNEL_ID,
-            message_thread_id=topic_id,  # Если None, отправит в общий чат
-            text=text,
-            disable_web_page_preview=True
-        )
-
-        topic_info = f":{topic_id}" if topic_id else " (общий чат)"
-        log.info(f"✅ [{event_type}] Уведомление отправлено в {NOTIFY_CHANNEL_ID}{topic_info}")
+        await lane_scheduler.submit(lane_key, send, flow=repo, weight=repo_fairness.weight(repo))
         return True
 
-    except TelegramAPIError as e:
-        log.error(f"❌ [{event_type}] Ошибка при отправке в Telegram: {e}")
+    except (TelegramAPIError, RetryLater) as e:
+        log.error(f"❌ Ошибка при отправке в Telegram ({chat_id}:{topic_id}): {e}")
         return False
 
+
+async def _deliver_batch(batch_key: tuple, text: str) -> bool:
+    """Отправляет склеенный батч репозитория в топике (batch_key = (chat_id, topic_id, repo))"""
+    chat_id, topic_id, repo = batch_key
+    return await _deliver((chat_id, topic_id, None), text, repo=repo)
+
+
+# Склейка сообщений репозитория в топике в пределах короткого окна (выключено при BATCH_WINDOW_MS=0)
+message_batcher = MessageBatcher(BATCH_WINDOW_MS / 1000, _deliver_batch) if BATCH_WINDOW_MS > 0 else None
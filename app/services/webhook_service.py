@@ -1,9 +1,14 @@
 from fastapi import Request, HTTPException
 from loguru import logger as log
+from typing import Any, Awaitable, Callable, Coroutine
+from collections import Counter
+import asyncio
 import hashlib
 import hmac
 
 from app.core.config import GITHUB_WEBHOOK_SECRET
+from app.core.profiler import profile_webhook, profiler
+from app.core.tracing import set_attributes, span
 
 # Импортируем схемы данных
 from app.schemas.github_payload import (
@@ -16,6 +21,14 @@ from app.schemas.github_payload import (
     GitHubReleasePayload,
 )
 
+from app.services.enrichment import ENRICHERS, enricher
+from app.services.event_store import EventStore, event_store
+from app.services.filter_rules import notification_filter
+from app.services.message_details import MessageDetail, detail_cache, dump_detail, load_detail
+from app.services.payload_offload import RenderedEvent, payload_offloader, render_event
+from app.services.repeat_suppressor import RepeatWindow, repeat_suppressor
+from app.services.send_queue import intern_key
+
 # Импортируем функции отправки
 from app.services.sender_service import (
     send_pr_notification,
@@ -36,6 +49,7 @@ from app.services.report_service import (
     format_issues_message,
     format_check_run_message,
     format_release_message,
+    format_repeat_summary,
 )
 
 # ============================================================================
@@ -82,10 +96,32 @@ EVENT_HANDLERS = {
 }
 
 
+async def send_repeat_summary(window: RepeatWindow) -> None:
+    """Отправляет сводку по закрывшемуся окну повторов"""
+    _, _, sender_func = EVENT_HANDLERS[window.event_type]
+    log.info(f"🔁 Сводка повторов: {window.subject} {window.outcome} ×{window.count} ({window.repo})")
+    await sender_func(
+        format_repeat_summary(window, repeat_suppressor.window),
+        ordering_key=window.ordering_key,
+        repo=window.repo,
+    )
+
+
 # ============================================================================
 # WEBHOOK LOGIC
 # ============================================================================
 
+def is_signature_valid(body: bytes, signature_header: str | None) -> bool:
+    """Сверяет X-Hub-Signature-256 с HMAC тела (секрет должен быть задан)"""
+    # compare_digest падает на не-ASCII строках — такая подпись заведомо неверна
+    if not isinstance(signature_header, str) or not signature_header or not signature_header.isascii():
+        return False
+    expected = "sha256=" + hmac.new(
+        GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(expected, signature_header)
+
+
 async def verify_signature(request: Request):
     """Проверка подписи GitHub webhook для безопасности"""
     if not GITHUB_WEBHOOK_SECRET:
@@ -97,24 +133,170 @@ async def verify_signature(request: Request):
         raise HTTPException(status_code=403, detail="Signature header is missing")
 
     body = await request.body()
-    expected = "sha256=" + hmac.new(
-        GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256
-    ).hexdigest()
-
-    if not hmac.compare_digest(expected, signature_header):
+    if not is_signature_valid(body, signature_header):
         raise HTTPException(status_code=403, detail="Invalid signature")
 
 
+class PreparedNotification:
+    """
+    Событие, прошедшее валидацию и форматирование, — готово к отправке.
+    Держит только текст и ключи: при догрузке и пакетном приеме таких ждут тысячи
+    """
+    __slots__ = ("event_type", "message", "sender", "ordering_key", "urgent", "repo", "detail_token", "detail")
+
+    def __init__(self, event_type: str, message: str, sender: Callable[..., Awaitable[list[dict]]],
+                 ordering_key: str | None, urgent: bool, repo: str | None, detail_token: str | None = None,
+                 detail: MessageDetail | None = None):
+        self.event_type = intern_key(event_type)
+        self.message = message
+        self.sender = sender
+        self.ordering_key = intern_key(ordering_key)
+        self.urgent = urgent
+        self.repo = intern_key(repo)
+        # Токен подробностей в DetailCache (кнопка «Показать полностью») и сами подробности —
+        # для outbox: токен живет только в памяти процесса
+        self.detail_token = detail_token
+        self.detail = detail
+
+
+@profile_webhook
 async def process_github_payload(request: Request):
     """Универсальная функция обработки webhook"""
 
     # 1. Проверяем подпись
-    await verify_signature(request)
+    with span("webhook.verify_signature"):
+        await verify_signature(request)
 
-    # 2. Получаем тип события и JSON
+    # 2. Получаем тип события и исходное тело (JSON разбирается дальше — на месте или в пуле)
     event_type = request.headers.get("X-GitHub-Event")
-    json_data = await request.json()
+    body = await request.body()
+
+    return await process_event(event_type, body, request.headers.get("X-GitHub-Delivery"))
+
+
+class Receipt:
+    """Место события в порядке приема"""
+    __slots__ = ("repo", "known", "done")
+
+    def __init__(self):
+        loop = asyncio.get_running_loop()
+        self.repo: str | None = None
+        # Репозиторий известен (payload разобран)
+        self.known: asyncio.Future = loop.create_future()
+        # Событие передано в отправку или отброшено
+        self.done: asyncio.Future = loop.create_future()
+
+
+class ReceiptOrder:
+    """
+    Порядок приема webhook'ов.
+
+    Разбор и форматирование идут параллельно: большой payload — в пуле процессов,
+    маленький — на месте, поэтому более позднее событие того же PR может подготовиться
+    раньше и обогнать предыдущее в полосе отправки. Место в очереди берется при приеме,
+    а в отправку событие передается только после более ранних событий своего репозитория
+    и тех, чей репозиторий еще не известен. Разные репозитории друг друга не ждут.
+    """
+
+    def __init__(self):
+        # Упорядоченное множество: событие — в порядке приема
+        self._pending: dict[Receipt, None] = {}
+        self.waits = 0
+
+    def take(self) -> Receipt:
+        receipt = Receipt()
+        self._pending[receipt] = None
+        return receipt
+
+    @staticmethod
+    def resolve(receipt: Receipt, repo: str | None) -> None:
+        """Репозиторий события стал известен"""
+        if not receipt.known.done():
+            receipt.repo = repo
+            receipt.known.set_result(None)
+
+    def _blocker(self, receipt: Receipt) -> asyncio.Future | None:
+        for earlier in self._pending:
+            if earlier is receipt:
+                return None
+            if not earlier.known.done():
+                return earlier.known
+            if earlier.repo == receipt.repo:
+                return earlier.done
+        return None
+
+    async def wait_turn(self, receipt: Receipt) -> None:
+        """Ждет, пока более ранние события того же репозитория не уйдут в отправку"""
+        blocker = self._blocker(receipt)
+        if blocker is not None:
+            self.waits += 1
+        while blocker is not None:
+            # wait, а не await: отмена ожидающего не должна отменять чужой future
+            await asyncio.wait((blocker,))
+            blocker = self._blocker(receipt)
+
+    def finish(self, receipt: Receipt) -> None:
+        """Событие передано в отправку или отброшено (повторный вызов ничего не делает)"""
+        if receipt not in self._pending:
+            return
+        del self._pending[receipt]
+        self.resolve(receipt, receipt.repo)
+        receipt.done.set_result(None)
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "waits": self.waits}
+
+
+# Общий экземпляр: порядок приема webhook'ов
+receipt_order = ReceiptOrder()
+
 
+async def process_event(event_type: str | None, data: Any, delivery_id: str | None = None) -> dict:
+    """
+    Обработка события с уже проверенной подписью: подготовка и постановка в фоновую отправку.
+    Ответ не ждет Telegram — см. BackgroundDelivery. В отправку события уходят в порядке
+    приема — см. ReceiptOrder.
+    """
+    receipt = receipt_order.take()
+    try:
+        prepared = await prepare_event(event_type, data, delivery_id, receipt)
+        if isinstance(prepared, dict):
+            receipt_order.finish(receipt)
+            await remember_delivery(delivery_id, event_type, prepared)
+            return prepared
+        await receipt_order.wait_turn(receipt)
+        return await background_delivery.submit(prepared, delivery_id)
+    finally:
+        receipt_order.finish(receipt)
+
+
+async def remember_delivery(delivery_id: str | None, event_type: str | None, result: dict) -> None:
+    """Отмечает доставку обработанной: догрузка после простоя ее уже не повторит"""
+    if event_store and delivery_id:
+        await event_store.mark_delivery(delivery_id, event_type, result.get("status"))
+
+
+async def _render(event_type: str, payload_class: type, formatter_func: Callable[..., str | None],
+                  data: Any, with_payload: bool) -> RenderedEvent:
+    """Большое тело — в пул процессов, остальное — на месте"""
+    if isinstance(data, bytes) and payload_offloader and payload_offloader.should_offload(len(data)):
+        with span("webhook.offload", payload__bytes=len(data)):
+            rendered = await payload_offloader.render(event_type, payload_class, formatter_func, data, with_payload)
+        # Правила проверял процесс пула — переносим счетчики срабатываний и ошибок сюда
+        notification_filter.record_match(rendered.muted_by, rendered.filter_errors)
+        return rendered
+    return render_event(event_type, payload_class, formatter_func, data, with_payload)
+
+
+async def prepare_event(event_type: str | None, data: Any, delivery_id: str | None = None,
+                        receipt: Receipt | None = None) -> PreparedNotification | dict:
+    """
+    Фильтры, валидация, сохранение, обогащение и форматирование события.
+
+    :param data: JSON payload'а или исходное тело запроса (bytes)
+    :param receipt: Место в порядке приема — сообщаем ему репозиторий сразу после разбора
+    :return: Готовое к отправке уведомление или итоговый статус (ignored/error)
+    """
     log.info(f"📨 Получен webhook: {event_type}")
 
     # 3. Ищем обработчик в карте
@@ -126,24 +308,204 @@ async def process_github_payload(request: Request):
 
     # 4. Распаковываем инструменты и запускаем обработку
     payload_class, formatter_func, sender_func = handler_data
+    # Обогащаются только события, которые отрисованы и прошли фильтры: их форматируем здесь повторно
+    with_payload = enricher is not None and event_type in ENRICHERS
 
     try:
-        # А. Валидация (превращаем JSON в Pydantic объект)
-        # extra='ignore' в моделях спасет от ошибок валидации
-        payload = payload_class(**json_data)
+        # А. Фильтры, валидация и форматирование (большие payload'ы — в пуле процессов)
+        rendered = await _render(event_type, payload_class, formatter_func, data, with_payload)
+        if receipt is not None:
+            receipt_order.resolve(receipt, rendered.repo)
+        set_attributes(github__action=rendered.action, github__repository=rendered.repo)
+
+        if rendered.muted_by:
+            set_attributes(webhook__muted_by=rendered.muted_by)
+            log.info(f"🔇 Событие {event_type} заглушено правилом '{rendered.muted_by}'")
+            return {"status": "ignored", "reason": "muted", "rule": rendered.muted_by}
 
-        # Б. Форматирование (получаем текст сообщения)
-        message = formatter_func(payload)
+        # Сохраняем нормализованное событие для команд бота (/prs, /ci, /releases)
+        if event_store:
+            with span("webhook.store"):
+                await event_store.insert(rendered.record, delivery_id)
 
-        # В. Отправка (если форматтер вернул текст)
-        if message:
-            success = await sender_func(message)
-            status = "ok" if success else "send_error"
-            return {"status": status, "event": event_type}
+        # Повтор (перезапуск упавшей проверки, флапающая задача) — только считаем, сводка придет позже
+        repeat = rendered.repeat if repeat_suppressor else None
+        if repeat:
+            key, subject, outcome, url = repeat
+            if repeat_suppressor.observe(key, event_type, rendered.repo, subject, outcome, url,
+                                         rendered.ordering_key):
+                set_attributes(webhook__suppressed=True)
+                log.info(f"🔁 Повтор подавлен: {subject} {outcome} ({rendered.repo})")
+                return {"status": "ignored", "reason": "repeat"}
 
         # Если форматтер вернул None (например, action='edited' и мы его игнорируем)
-        return {"status": "ignored", "reason": "no_message_generated"}
+        message = rendered.message
+        if not message:
+            return {"status": "ignored", "reason": "no_message_generated"}
+
+        if rendered.payload is not None:
+            # Дополнительные данные из GitHub API (в пределах бюджета времени) — только для отправляемых
+            with span("webhook.enrich"):
+                enrichment = await enricher.enrich(event_type, rendered.payload)
+
+            # Б. Форматирование с обогащением (есть только у событий, форматтеры которых его принимают)
+            if enrichment:
+                with span("webhook.format", formatter=formatter_func.__name__):
+                    message = formatter_func(rendered.payload, enrichment=enrichment) or message
+
+        # Кэша нет, если кнопки выключены или сообщения склеиваются (у склеенных кнопки нет)
+        detail = rendered.detail if detail_cache else None
+        return PreparedNotification(
+            event_type,
+            message,
+            sender_func,
+            ordering_key=rendered.ordering_key,
+            urgent=rendered.urgent,
+            repo=rendered.repo,
+            detail_token=detail_cache.put(detail) if detail else None,
+            detail=detail,
+        )
 
     except Exception as e:
         log.exception(f"❌ Ошибка обработки события {event_type}: {e}")
-        return {"status": "error", "reason": "exception", "details": str(e)}
\ No newline at end of file
+        return {"status": "error", "reason": "exception", "details": str(e)}
+
+
+async def deliver_event(prepared: PreparedNotification) -> dict:
+    """В. Отправка всем получателям и итоговый статус"""
+    try:
+        destinations = await prepared.sender(
+            prepared.message,
+            ordering_key=prepared.ordering_key,
+            urgent=prepared.urgent,
+            repo=prepared.repo,
+            detail_token=prepared.detail_token,
+        )
+    except Exception as e:
+        log.exception(f"❌ Ошибка отправки события {prepared.event_type}: {e}")
+        return {"status": "error", "reason": "exception", "details": str(e)}
+
+    delivered = sum(1 for destination in destinations if destination["ok"])
+    if destinations and delivered == len(destinations):
+        status = "ok"
+    elif delivered:
+        status = "partial"
+    else:
+        status = "send_error"
+    return {"status": status, "event": prepared.event_type, "destinations": destinations}
+
+
+# ============================================================================
+# BACKGROUND DELIVERY
+# ============================================================================
+
+class BackgroundDelivery:
+    """
+    Отправка уведомлений после ответа GitHub'у.
+
+    Ожидание в полосах, лимите частоты чата и бюджете очереди не должно входить
+    во время ответа на webhook: GitHub ждет не дольше 10 сек и иначе помечает доставку
+    неуспешной. Подготовленное уведомление записывается в outbox хранилища событий,
+    webhook подтверждается ({"status": "queued"}), а отправка идет в фоне; после нее
+    запись удаляется, а доставка отмечается обработанной (для догрузки после простоя).
+    Что не успело уйти до остановки или падения, отправляется при следующем старте
+    (replay) — уведомление, отправленное прямо перед падением, может прийти дважды.
+    Без хранилища событий отправка тоже идет в фоне, но перезапуск ее не переживает.
+    """
+
+    def __init__(self, store: EventStore | None):
+        self.store = store
+        self._tasks: set[asyncio.Task] = set()
+        self.counters: Counter = Counter()
+
+    def _start(self, coro: Coroutine[Any, Any, dict], prepared: PreparedNotification,
+               delivery_id: str | None) -> asyncio.Task:
+        if profiler.enabled:
+            # Отправка идет после ответа GitHub'у — профилируется отдельно от приема
+            coro = profiler.run(coro, {"event": prepared.event_type, "delivery_id": delivery_id, "stage": "delivery"})
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def submit(self, prepared: PreparedNotification, delivery_id: str | None) -> dict:
+        """
+        Ставит уведомление в фоновую отправку и ждет только записи в outbox.
+        Если записать не удалось, ждет отправки (GitHub увидит настоящий статус).
+        """
+        stored = None
+        if self.store:
+            stored = asyncio.ensure_future(self.store.add_outbox(
+                delivery_id, prepared.event_type, prepared.message, prepared.ordering_key, prepared.urgent,
+                prepared.repo, dump_detail(prepared.detail) if prepared.detail else None,
+            ))
+        # Задача создается сразу, а запись идет параллельно: порядок отправки — порядок приема
+        task = self._start(self._deliver(prepared, delivery_id, stored), prepared, delivery_id)
+        self.counters["queued"] += 1
+
+        if stored is not None:
+            try:
+                await asyncio.shield(stored)
+            except Exception as e:
+                log.error(f"❌ Не удалось записать уведомление в outbox ({e}) — отвечаем после отправки")
+                return await asyncio.shield(task)
+        return {"status": "queued", "event": prepared.event_type}
+
+    async def _deliver(self, prepared: PreparedNotification, delivery_id: str | None,
+                       stored: Awaitable[int] | None) -> dict:
+        # Отмена (остановка приложения) оставляет запись в outbox — уведомление уйдет при старте
+        result = await deliver_event(prepared)
+        self.counters[result.get("status")] += 1
+        if self.store and delivery_id:
+            # То же, что remember_delivery, но в хранилище этого экземпляра
+            await self.store.mark_delivery(delivery_id, prepared.event_type, result.get("status"))
+        if stored is not None:
+            try:
+                outbox_id = await stored
+            except Exception:
+                return result
+            await self.store.remove_outbox(outbox_id)
+        return result
+
+    async def replay(self) -> int:
+        """Отправляет уведомления, оставшиеся в outbox с прошлого запуска (до приема новых webhook'ов)"""
+        if not self.store:
+            return 0
+        rows = await self.store.pending_outbox()
+        for row in rows:
+            handler = EVENT_HANDLERS.get(row["event"])
+            if handler is None:
+                await self.store.remove_outbox(row["id"])
+                continue
+            # Токен прошлого запуска недействителен: подробности кладутся в кэш заново
+            detail = load_detail(row["detail"]) if row["detail"] and detail_cache else None
+            prepared = PreparedNotification(
+                row["event"], row["message"], handler[2], row["ordering_key"], bool(row["urgent"]), row["repo"],
+                detail_token=detail_cache.put(detail) if detail else None, detail=detail,
+            )
+            stored = asyncio.get_running_loop().create_future()
+            stored.set_result(row["id"])
+            self._start(self._deliver(prepared, row["delivery_id"], stored), prepared, row["delivery_id"])
+        if rows:
+            self.counters["replayed"] += len(rows)
+            log.info(f"📤 Неотправленных уведомлений с прошлого запуска: {len(rows)}, отправляем")
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {"pending": len(self._tasks), "durable": self.store is not None, **self.counters}
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Дожидается фоновых отправок (не дольше timeout), остальные отменяет"""
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            log.warning(f"Не отправлено до остановки: {len(pending)}"
+                        f"{' (уйдут при следующем старте)' if self.store else ''}")
+
+
+# Общий экземпляр: с хранилищем событий фоновая отправка переживает перезапуск
+background_delivery = BackgroundDelivery(event_store)
@@ -0,0 +1,168 @@
+# benchmarks/bench_offload.py
+"""
+Бенчмарк пула разбора больших payload'ов (OFFLOAD_WORKERS).
+
+Приложение принимает ровный поток маленьких webhook'ов (--rps), а параллельно
+приходят большие push'и (--large-rps, --large-commits). Одна и та же нагрузка
+прогоняется дважды: всё в event loop'е (OFFLOAD_WORKERS=0) и с пулом процессов.
+Сравниваются перцентили задержки приема именно маленьких запросов и задержка
+event loop'а по /metrics.
+
+Запуск:
+    python -m benchmarks.bench_offload --duration 20 --large-commits 5000
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import subprocess
+import time
+
+import aiohttp
+
+from benchmarks.loadtest.fake_telegram import add_fake_server_args, config_from_args, start_fake_server
+from benchmarks.loadtest.payloads import build_delivery
+from benchmarks.loadtest.run import LOADTEST_SECRET, percentile, start_app, wait_ready
+
+# После loadtest.run: он задает BOT_TOKEN, без которого конфиг приложения не импортируется
+from benchmarks.bench_push_parsing import make_push_body  # noqa: E402
+
+SMALL_EVENTS = ("push", "pull_request", "issue_comment", "issues")
+
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+async def post(session, url, body: bytes, headers: dict, latencies: list[float], errors: list[int]) -> None:
+    started = time.perf_counter()
+    try:
+        async with session.post(url, data=body, headers=headers) as resp:
+            await resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                return
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        errors.append(0)
+        return
+    latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def schedule(rps: float, duration: float, make_request) -> None:
+    """Open-loop: запросы по расписанию, не дожидаясь ответов"""
+    tasks = []
+    started = time.perf_counter()
+    for seq in range(int(rps * duration)):
+        delay = started + seq / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(make_request(seq)))
+    await asyncio.gather(*tasks)
+
+
+async def read_loop_lag(session, app_url: str) -> dict:
+    """p99 и максимум задержки event loop'а из /metrics, мс"""
+    lag = {}
+    async with session.get(f"{app_url}/metrics") as resp:
+        for line in (await resp.text()).splitlines():
+            if line.startswith('event_loop_lag_seconds{quantile="0.99"}'):
+                lag["p99"] = float(line.split()[-1]) * 1000
+            elif line.startswith("event_loop_lag_max_seconds"):
+                lag["max"] = float(line.split()[-1]) * 1000
+    return lag
+
+
+async def run_mode(args, workers: int, large_body: bytes) -> dict:
+    app = start_app(args, {
+        "OFFLOAD_WORKERS": str(workers),
+        "OFFLOAD_THRESHOLD_BYTES": str(args.threshold),
+        # Окно перцентилей задержки loop'а — на весь прогон
+        "LOOP_LAG_WINDOW": str(int(args.duration * 20)),
+        "LOOP_MONITOR_INTERVAL_MS": "50",
+        # Задержка loop'а читается с /metrics (по умолчанию выключен), без токена
+        "METRICS_ENABLED": "true",
+        "ADMIN_TOKEN": "",
+    })
+    url = f"http://{args.host}:{args.app_port}"
+    small, large, errors = [], [], []
+    large_headers = {
+        "Content-Type": "application/json",
+        "X-GitHub-Event": "push",
+        "X-Hub-Signature-256": sign(large_body, args.secret),
+    }
+
+    async def small_request(seq: int) -> None:
+        body, headers = build_delivery(SMALL_EVENTS[seq % len(SMALL_EVENTS)], seq, args.secret)
+        await post(session, f"{url}/webhook/github", body, headers, small, errors)
+
+    async def large_request(seq: int) -> None:
+        await post(session, f"{url}/webhook/github", large_body, large_headers, large, errors)
+
+    try:
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+            await wait_ready(session, f"{url}/")
+            await asyncio.gather(
+                schedule(args.rps, args.duration, small_request),
+                schedule(args.large_rps, args.duration, large_request),
+            )
+            loop_lag = await read_loop_lag(session, url)
+    finally:
+        app.terminate()
+        try:
+            app.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app.kill()
+
+    return {
+        "mode": f"пул ×{workers}" if workers else "в loop'е",
+        "small": [percentile(small, pct) for pct in (50, 90, 99)] + [max(small, default=0.0)],
+        "large": percentile(large, 50),
+        "loop": loop_lag,
+        "errors": len(errors),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    large_body = make_push_body(args.large_commits)
+    print(f"▶ маленькие: {args.rps} RPS, большие push'и: {args.large_rps} RPS "
+          f"по {len(large_body) // 1024} КБ, {args.duration} сек на режим")
+
+    server, runner = await start_fake_server(config_from_args(args), args.host, args.fake_port)
+    try:
+        results = [await run_mode(args, workers, large_body) for workers in (0, args.workers)]
+    finally:
+        await runner.cleanup()
+
+    print(f"\n{'режим':>10} | {'p50, мс':>8} | {'p90, мс':>8} | {'p99, мс':>8} | {'max, мс':>8} | "
+          f"{'большой p50':>11} | {'lag p99':>8} | {'lag max':>8} | {'ошибок':>6}")
+    print("-" * 100)
+    for result in results:
+        p50, p90, p99, worst = result["small"]
+        loop = result["loop"]
+        print(f"{result['mode']:>10} | {p50:>8.1f} | {p90:>8.1f} | {p99:>8.1f} | {worst:>8.1f} | "
+              f"{result['large']:>11.1f} | {loop.get('p99', 0.0):>8.1f} | {loop.get('max', 0.0):>8.1f} | "
+              f"{result['errors']:>6}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Задержка маленьких webhook'ов рядом с большими payload'ами")
+    parser.add_argument("--rps", type=float, default=50.0, help="Маленькие webhook'и в секунду")
+    parser.add_argument("--large-rps", type=float, default=2.0, help="Большие push'и в секунду")
+    parser.add_argument("--large-commits", type=int, default=5000, help="Коммитов в большом push'е")
+    parser.add_argument("--duration", type=float, default=20.0, help="Длительность нагрузки на режим, сек")
+    parser.add_argument("--workers", type=int, default=2, help="OFFLOAD_WORKERS для второго прогона")
+    parser.add_argument("--threshold", type=int, default=256 * 1024, help="OFFLOAD_THRESHOLD_BYTES")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--app-logs", action="store_true", help="Не глушить вывод приложения")
+    parser.add_argument("--fake-port", type=int, default=8081)
+    parser.add_argument("--secret", default=LOADTEST_SECRET)
+    add_fake_server_args(parser)
+    # Быстрый Bot API: в задержке приема должна остаться только работа приложения
+    parser.set_defaults(latency_ms=5.0, jitter_ms=0.0, enrichment=False)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
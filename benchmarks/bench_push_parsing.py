@@ -0,0 +1,86 @@
+# benchmarks/bench_push_parsing.py
+"""
+Бенчмарк разбора push-событий с большим числом коммитов.
+
+Сравнивает текущую схему GitHubPushPayload (модели только для первых
+PUSH_COMMITS_PREVIEW коммитов) с "полной" валидацией всего списка.
+Замеряется валидация + форматирование; json.loads показан отдельно,
+так как он одинаков для обоих вариантов.
+
+Запуск:
+    python -m benchmarks.bench_push_parsing
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from app.schemas.github_payload import GitHubPushPayload
+from app.services.report_service import format_push_message
+
+SIZES = (20, 200, 2000)
+REPEATS = 30
+
+
+def make_push_body(commits_count: int) -> bytes:
+    commits = [
+        {
+            "id": f"{i:040x}",
+            "message": f"Commit {i}: " + "long description line " * 40,
+            "url": f"https://github.com/bench/repo/commit/{i:040x}",
+            "author": {"name": "bench", "email": "bench@example.com"},
+            "added": [f"src/file_{i}.py"],
+            "removed": [],
+            "modified": [f"src/module_{j}.py" for j in range(5)],
+        }
+        for i in range(commits_count)
+    ]
+    payload = {
+        "ref": "refs/heads/main",
+        "before": "a" * 40,
+        "after": "b" * 40,
+        "repository": {"full_name": "bench/repo", "html_url": "https://github.com/bench/repo"},
+        "pusher": {"name": "bench", "email": "bench@example.com"},
+        "sender": {"login": "bench", "html_url": "https://github.com/bench"},
+        "commits": commits,
+        "head_commit": commits[-1],
+    }
+    return json.dumps(payload).encode()
+
+
+def full_validate(data: dict) -> GitHubPushPayload:
+    # Если commits_count уже передан, before-валидатор не режет список —
+    # получаем старое поведение с валидацией каждого коммита
+    return GitHubPushPayload(**data, commits_count=len(data["commits"]))
+
+
+def measure(func, data) -> tuple[float, int]:
+    """Медиана времени (мс) и пик аллокаций (КБ)"""
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        func(data)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak // 1024
+
+
+def main() -> None:
+    print(f"{'commits':>8} | {'json.loads, мс':>14} | {'lazy, мс':>9} | {'lazy, КБ':>9} | {'full, мс':>9} | {'full, КБ':>9}")
+    print("-" * 72)
+    for size in SIZES:
+        body = make_push_body(size)
+        data = json.loads(body)
+
+        json_ms, _ = measure(json.loads, body)
+        lazy_ms, lazy_kb = measure(lambda d: format_push_message(GitHubPushPayload(**d)), data)
+        full_ms, full_kb = measure(lambda d: format_push_message(full_validate(d)), data)
+
+        print(f"{size:>8} | {json_ms:>14.3f} | {lazy_ms:>9.3f} | {lazy_kb:>9} | {full_ms:>9.3f} | {full_kb:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# benchmarks/bench_queue_memory.py
+"""
+Бенчмарк памяти очереди отправки: сколько байт занимает одно сообщение в очереди.
+
+Telegram "зависает" (send_message ждет, пока его не отпустят), в фоновую отправку
+(как из webhook'а) ставится --sizes уведомлений, и по tracemalloc считается прирост
+памяти на одно ожидающее сообщение:
+- всего — вместе с фоновой задачей, кадрами корутин отправителя и записью полосы;
+- записи + тексты — размер QueuedMessage и текста (sys.getsizeof);
+- учтено — то, что посчитал бюджет SEND_QUEUE_MAX_BYTES: записи, тексты и накладные
+  расходы на сообщение, замеренные перед прогоном так же, как при старте приложения
+  (app/services/queue_calibration.py). «Всего» и «учтено» должны почти совпадать;
+- модель + текст — для сравнения: если бы до отправки держали Pydantic-модель payload'а.
+
+Затем тот же backlog прогоняется с бюджетом в четверть от учтенного: проверяется,
+что бюджет не превышен, а сообщения уходят все и по порядку. Ожидающие места в бюджете
+тоже занимают память (в бюджет они не входят) — их число ограничивает SEND_REPO_MAX_QUEUED.
+
+Запуск:
+    python -m benchmarks.bench_queue_memory --sizes 10000 100000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import time
+import tracemalloc
+
+# Конфиг читается при импорте приложения: настраиваем до него
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH-token")
+os.environ["NOTIFY_CHANNEL_ID"] = "-1001000000000"
+os.environ["EVENT_STORE_PATH"] = ""
+os.environ["ROUTES_PATH"] = "/nonexistent/routes.json"
+os.environ["BATCH_WINDOW_MS"] = "0"
+os.environ["SEND_CHAT_RATE_PER_MINUTE"] = "0"
+os.environ["SEND_MAX_IN_FLIGHT"] = "1"
+# Без топиков: все уведомления в одной полосе, порядок проверяется целиком
+for name in ("PR_TOPIC_ID", "PUSH_TOPIC_ID", "ISSUES_TOPIC_ID", "CICD_TOPIC_ID", "RELEASES_TOPIC_ID"):
+    os.environ[name] = ""
+
+from loguru import logger as log  # noqa: E402
+
+from app.services import sender_service  # noqa: E402
+from app.services.queue_calibration import calibrate  # noqa: E402
+from app.services.send_queue import send_budget  # noqa: E402
+from app.services.webhook_service import EVENT_HANDLERS, BackgroundDelivery, PreparedNotification  # noqa: E402
+from benchmarks.loadtest.payloads import PAYLOAD_BUILDERS, make_marker  # noqa: E402
+
+EVENTS = ("push", "pull_request", "issue_comment", "issues", "check_run")
+
+
+class StuckTelegram:
+    """send_message, который ждет, пока его не отпустят; запоминает порядок текстов"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent: list[str] = []
+
+    async def send_message(self, chat_id, text, message_thread_id=None, **kwargs):
+        await self.gate.wait()
+        self.sent.append(text)
+
+
+def build_model(seq: int):
+    event_type = EVENTS[seq % len(EVENTS)]
+    payload_class, formatter_func, sender_func = EVENT_HANDLERS[event_type]
+    payload = payload_class(**PAYLOAD_BUILDERS[event_type](make_marker(seq), seq))
+    return payload, formatter_func, sender_func
+
+
+def traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def wait_queued(count: int) -> None:
+    """Ждем, пока все уведомления дойдут до очереди (одно — в отправке)"""
+    while True:
+        await asyncio.sleep(0.01)
+        if sender_service.lane_scheduler.stats()["queued"] + 1 + send_budget.stats()["waiting"] >= count:
+            return
+
+
+async def fill_queue(delivery: BackgroundDelivery, count: int) -> tuple[list[str], int]:
+    """Форматирует count уведомлений и ставит в фоновую отправку; :return: (тексты по порядку, прирост памяти)"""
+    before = traced()
+    texts = []
+    for seq in range(count):
+        payload, formatter_func, sender_func = build_model(seq)
+        text = formatter_func(payload)
+        texts.append(text)
+        # Ключи — как в реальном событии, модель дальше не нужна
+        prepared = PreparedNotification(EVENTS[seq % len(EVENTS)], text, sender_func, None, False,
+                                        payload.repository.full_name)
+        await delivery.submit(prepared, None)
+        del payload, prepared
+        if seq % 1000 == 999:
+            await asyncio.sleep(0)
+    await wait_queued(count)
+    return texts, traced() - before
+
+
+async def drain(telegram: StuckTelegram, delivery: BackgroundDelivery) -> float:
+    started = time.perf_counter()
+    telegram.gate.set()
+    await delivery.close(timeout=None)
+    return time.perf_counter() - started
+
+
+def models_bytes(count: int) -> int:
+    """Сколько заняли бы модели payload'ов вместе с текстами"""
+    before = traced()
+    held = []
+    for seq in range(count):
+        payload, formatter_func, _ = build_model(seq)
+        held.append((payload, formatter_func(payload)))
+    used = traced() - before
+    del held
+    return used
+
+
+async def run_size(count: int) -> dict:
+    telegram = StuckTelegram()
+    sender_service.bot.send_message = telegram.send_message
+
+    delivery = BackgroundDelivery(None)
+    texts, total = await fill_queue(delivery, count)
+    accounted = send_budget.bytes
+    await drain(telegram, delivery)
+    del texts
+
+    # Тот же backlog с бюджетом в четверть от учтенного
+    telegram = StuckTelegram()
+    sender_service.bot.send_message = telegram.send_message
+    send_budget.max_bytes = accounted // 4
+    send_budget.peak_bytes = 0
+    delivery = BackgroundDelivery(None)
+    texts, budget_total = await fill_queue(delivery, count)
+    elapsed = await drain(telegram, delivery)
+    budget = {
+        "max_bytes": send_budget.max_bytes,
+        "peak_bytes": send_budget.peak_bytes,
+        "total": budget_total,
+        "in_order": telegram.sent == texts,
+        "drain_seconds": elapsed,
+    }
+    send_budget.max_bytes = 0
+    del texts
+
+    return {
+        "count": count,
+        "total": total / count,
+        "accounted": accounted / count,
+        "records": accounted / count - send_budget.message_overhead,
+        "models": models_bytes(count) / count,
+        "budget": budget,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Лог каждой отправки исказил бы замер и время разгрузки
+    log.remove()
+    # Без лимита для первого прогона; лимит выставляется вручную во втором
+    send_budget.max_bytes = 0
+    await calibrate(send_budget)
+    tracemalloc.start()
+    results = [await run_size(count) for count in args.sizes]
+    tracemalloc.stop()
+
+    print(f"\n{'в очереди':>10} | {'всего, Б/сообщ.':>15} | {'записи + тексты, Б':>18} | "
+          f"{'учтено, Б/сообщ.':>16} | {'всего − записи, Б':>17} | {'модель + текст, Б':>17}")
+    print("-" * 110)
+    for result in results:
+        print(f"{result['count']:>10} | {result['total']:>15.0f} | {result['records']:>18.0f} | "
+              f"{result['accounted']:>16.0f} | {result['total'] - result['records']:>17.0f} | "
+              f"{result['models']:>17.0f}")
+    print(f"Замер при старте: {send_budget.message_overhead} Б на сообщение")
+
+    print(f"\n{'в очереди':>10} | {'бюджет, КБ':>10} | {'пик, КБ':>8} | {'всего, Б/сообщ.':>15} | "
+          f"{'порядок':>7} | {'разгрузка, сек':>14}")
+    print("-" * 80)
+    for result in results:
+        budget = result["budget"]
+        ok = budget["peak_bytes"] <= budget["max_bytes"]
+        print(f"{result['count']:>10} | {budget['max_bytes'] // 1024:>10} | "
+              f"{budget['peak_bytes'] // 1024:>8}{'' if ok else '!'} | {budget['total'] / result['count']:>15.0f} | "
+              f"{'да' if budget['in_order'] else 'НЕТ':>7} | {budget['drain_seconds']:>14.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Память на одно сообщение в очереди отправки")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Размеры backlog'а")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
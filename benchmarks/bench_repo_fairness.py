@@ -0,0 +1,162 @@
+# benchmarks/bench_repo_fairness.py
+"""
+Бенчмарк честной очереди отправки между репозиториями (app/services/repo_fairness.py).
+
+Все уведомления идут в один топик (одну полосу), Telegram отвечает за --send-ms.
+Шумный репозиторий сразу ставит в очередь --noisy уведомлений, затем --quiet
+тихих репозиториев присылают по --per-quiet уведомлений с интервалом --quiet-interval-ms.
+Сравниваются:
+- FIFO — полоса без потоков, как было до честной очереди;
+- честная — сообщения репозиториев чередуются по весам;
+- веса — два шумных репозитория с весами 1 и 3 делят отправки примерно 1:3;
+- лимит — SEND_REPO_MAX_QUEUED = --max-queued: шумный теряет хвост, тихие — ничего.
+Порядок сообщений каждого репозитория проверяется во всех прогонах.
+
+Запуск:
+    python -m benchmarks.bench_repo_fairness --noisy 2000 --quiet 5 --per-quiet 20
+"""
+import argparse
+import asyncio
+import os
+import time
+import types
+
+# Конфиг читается при импорте приложения: настраиваем до него
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH-token")
+os.environ["NOTIFY_CHANNEL_ID"] = "-1001000000000"
+os.environ["EVENT_STORE_PATH"] = ""
+os.environ["ROUTES_PATH"] = "/nonexistent/routes.json"
+os.environ["BATCH_WINDOW_MS"] = "0"
+os.environ["SEND_CHAT_RATE_PER_MINUTE"] = "0"
+os.environ["SEND_MAX_IN_FLIGHT"] = "1"
+os.environ["SEND_QUEUE_MAX_BYTES"] = "0"
+for name in ("PR_TOPIC_ID", "PUSH_TOPIC_ID", "ISSUES_TOPIC_ID", "CICD_TOPIC_ID", "RELEASES_TOPIC_ID"):
+    os.environ[name] = ""
+
+from loguru import logger as log  # noqa: E402
+
+from app.services import sender_service  # noqa: E402
+from app.services.lane_scheduler import LaneScheduler  # noqa: E402
+from app.services.repo_fairness import RepoFairness  # noqa: E402
+
+NOISY = "bench/monorepo"
+
+
+class SlowTelegram:
+    """send_message с фиксированной задержкой; запоминает, когда ушел каждый текст"""
+
+    def __init__(self, send_seconds: float):
+        self.send_seconds = send_seconds
+        self.sent: list[tuple[str, float]] = []
+
+    async def send_message(self, chat_id, text, message_thread_id=None, **kwargs):
+        await asyncio.sleep(self.send_seconds)
+        self.sent.append((text, time.perf_counter()))
+
+
+async def _fifo_submit(self, key, job, flow=None, weight=1.0):
+    # Все задачи полосы — один поток: поведение до честной очереди
+    return await LaneScheduler.submit(self, key, job)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args: argparse.Namespace, fifo: bool = False, weights: list[tuple[str, float]] | None = None,
+              max_queued: int = 0, noisy_repos: tuple[str, ...] = (NOISY,), quiet: int | None = None) -> dict:
+    telegram = SlowTelegram(args.send_ms / 1000)
+    sender_service.bot.send_message = telegram.send_message
+    sender_service.repo_fairness = RepoFairness(weights or [], max_queued)
+    scheduler = sender_service.lane_scheduler
+    if fifo:
+        scheduler.submit = types.MethodType(_fifo_submit, scheduler)
+    else:
+        scheduler.__dict__.pop("submit", None)
+
+    submitted: dict[str, float] = {}
+    tasks: list[asyncio.Task] = []
+
+    def notify(repo: str, seq: int) -> None:
+        text = f"{repo} #{seq}"
+        submitted[text] = time.perf_counter()
+        tasks.append(asyncio.create_task(sender_service.send_cicd_notification(text, repo=repo)))
+
+    for seq in range(args.noisy):
+        for repo in noisy_repos:
+            notify(repo, seq)
+    await asyncio.sleep(0)
+
+    quiet_repos = [f"bench/team-{i}" for i in range(args.quiet if quiet is None else quiet)]
+    for seq in range(args.per_quiet):
+        for repo in quiet_repos:
+            notify(repo, seq)
+        await asyncio.sleep(args.quiet_interval_ms / 1000)
+
+    results = await asyncio.gather(*tasks)
+    dropped = sum(1 for destinations in results for destination in destinations
+                  if destination.get("reason") == "repo_backlog_full")
+
+    waits: dict[str, list[float]] = {}
+    order: dict[str, list[int]] = {}
+    for text, sent_at in telegram.sent:
+        repo, seq = text.rsplit(" #", 1)
+        waits.setdefault(repo, []).append(sent_at - submitted[text])
+        order.setdefault(repo, []).append(int(seq))
+
+    quiet_waits = [wait for repo in quiet_repos for wait in waits.get(repo, [])]
+    return {
+        "noisy": {repo: waits.get(repo, []) for repo in noisy_repos},
+        "quiet": quiet_waits,
+        "dropped": dropped,
+        "in_order": all(seqs == sorted(seqs) for seqs in order.values()),
+        "sent_repos": [text.rsplit(" #", 1)[0] for text, _ in telegram.sent],
+    }
+
+
+def print_row(name: str, result: dict) -> None:
+    noisy = [wait for waits in result["noisy"].values() for wait in waits]
+    quiet = result["quiet"]
+    print(f"{name:>10} | {len(noisy):>7} | {_percentile(noisy, 0.5) * 1000:>10.0f} | "
+          f"{len(quiet):>7} | {_percentile(quiet, 0.5) * 1000:>10.0f} | {_percentile(quiet, 0.99) * 1000:>10.0f} | "
+          f"{result['dropped']:>9} | {'да' if result['in_order'] else 'НЕТ':>7}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Лог каждой отправки исказил бы замер
+    log.remove()
+
+    fifo = await run(args, fifo=True)
+    fair = await run(args)
+    capped = await run(args, max_queued=args.max_queued)
+
+    print(f"\n{'очередь':>10} | {'шумный':>7} | {'p50, мс':>10} | {'тихие':>7} | {'p50, мс':>10} | "
+          f"{'p99, мс':>10} | {'отброшено':>9} | {'порядок':>7}")
+    print("-" * 92)
+    print_row("FIFO", fifo)
+    print_row("честная", fair)
+    print_row(f"лимит {args.max_queued}", capped)
+
+    light, heavy = "bench/weight-1", "bench/weight-3"
+    weighted = await run(args, weights=[(heavy, 3.0)], noisy_repos=(light, heavy), quiet=0)
+    window = weighted["sent_repos"][:400]
+    print(f"\nВеса 1 и 3, первые {len(window)} отправок: {light} — {window.count(light)}, "
+          f"{heavy} — {window.count(heavy)}, порядок: {'да' if weighted['in_order'] else 'НЕТ'}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Честная очередь отправки между репозиториями")
+    parser.add_argument("--noisy", type=int, default=2000, help="Сколько уведомлений сразу ставит шумный репозиторий")
+    parser.add_argument("--quiet", type=int, default=5, help="Сколько тихих репозиториев")
+    parser.add_argument("--per-quiet", type=int, default=20, help="Уведомлений от каждого тихого")
+    parser.add_argument("--quiet-interval-ms", type=float, default=50.0, help="Интервал между уведомлениями тихих")
+    parser.add_argument("--send-ms", type=float, default=1.0, help="Сколько Telegram отвечает на одно сообщение")
+    parser.add_argument("--max-queued", type=int, default=200, help="SEND_REPO_MAX_QUEUED для прогона с лимитом")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,179 @@
+# benchmarks/loadtest/catchup.py
+"""
+Проверка догрузки пропущенных доставок (app/services/catchup.py) на фейковом GitHub API.
+
+Журнал доставок фейкового hook'а наполняется смесью:
+- неуспешные доставки за время "простоя" — должны прийти в Telegram, push'и одной
+  ветки — строго в исходном порядке;
+- успешные доставки и неуспешные, которые GitHub потом успешно доставил повторно;
+- неуспешные, но старше CATCHUP_LOOKBACK_HOURS, и неподдерживаемые события (star).
+
+Приложение запускается дважды с одной базой: первый запуск догружает пропущенное,
+второй не должен отправить ничего (доставки уже отмечены обработанными).
+Лимит API фейка маленький, чтобы догрузка дождалась его сброса.
+
+Запуск:
+    python -m benchmarks.loadtest.catchup --missed 40
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+
+from benchmarks.loadtest.fake_github import FakeGitHubServer, start_fake_github
+from benchmarks.loadtest.fake_telegram import FakeServerConfig, start_fake_server
+from benchmarks.loadtest.payloads import PAYLOAD_BUILDERS, make_marker
+from benchmarks.loadtest.run import LOADTEST_SECRET, start_app, wait_ready
+
+ADMIN_TOKEN = "catchup-admin"
+HOOK = "loadtest/repo:1"
+# Вперемешку с push'ами — события других типов
+OTHER_EVENTS = ("pull_request", "issue_comment", "release")
+
+
+def seed(server: FakeGitHubServer, missed: int) -> tuple[list[str], list[str]]:
+    """
+    Наполняет журнал доставок.
+
+    :return: (маркеры, которые должны прийти, маркеры push'ей в порядке событий)
+    """
+    now = time.time()
+    expected, pushes = [], []
+    seq = 0
+
+    def add(event: str, status_code: int, at: float) -> tuple[str, str]:
+        nonlocal seq
+        seq += 1
+        marker = make_marker(seq)
+        payload = PAYLOAD_BUILDERS[event](marker, seq) if event in PAYLOAD_BUILDERS else {"action": "created"}
+        return marker, server.add_delivery(event, payload, status_code, at)
+
+    # Старые неуспешные: за пределами окна догрузки
+    for i in range(3):
+        add("push", 502, now - 3 * 3600 - i)
+    # Простой: GitHub не достучался
+    started = now - 1800
+    for i in range(missed):
+        event = "push" if i % 2 == 0 else OTHER_EVENTS[i // 2 % len(OTHER_EVENTS)]
+        marker, _ = add(event, 0 if i % 3 else 502, started + i * 10)
+        expected.append(marker)
+        if event == "push":
+            pushes.append(marker)
+    add("star", 502, started + 5)
+    # Неуспешные, но потом успешно доставленные повторно
+    for i in range(3):
+        _, guid = add("pull_request", 504, started + missed * 10 + i)
+        server.add_delivery("pull_request", server.deliveries[-1]["payload"], 200, now - 60 + i, guid=guid)
+    # Успешные после подъема
+    for i in range(5):
+        add("issue_comment", 200, now - 30 + i)
+    return expected, pushes
+
+
+async def wait_catchup(session: aiohttp.ClientSession, url: str, timeout: float) -> dict:
+    """Ждем, пока догрузка в приложении закончится"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        async with session.get(f"{url}/admin/catchup", headers={"X-Admin-Token": ADMIN_TOKEN}) as resp:
+            stats = await resp.json()
+        if stats.get("finished_at"):
+            return stats
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Догрузка не закончилась за {timeout} сек")
+
+
+async def run_app(args, env: dict) -> dict:
+    app = start_app(args, env)
+    url = f"http://{args.host}:{args.app_port}"
+    try:
+        async with aiohttp.ClientSession() as session:
+            await wait_ready(session, f"{url}/")
+            return await wait_catchup(session, url, args.timeout)
+    finally:
+        app.terminate()
+        try:
+            app.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app.kill()
+
+
+async def main(args: argparse.Namespace) -> bool:
+    telegram, telegram_runner = await start_fake_server(
+        FakeServerConfig(latency_ms=5.0, jitter_ms=0.0), args.host, args.fake_port
+    )
+    github, github_runner = await start_fake_github(
+        args.host, args.github_port, server=FakeGitHubServer(rate_limit=args.rate_limit, rate_window=3)
+    )
+    expected, pushes = seed(github, args.missed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            "CATCHUP_HOOKS": HOOK,
+            "CATCHUP_LOOKBACK_HOURS": "1",
+            "CATCHUP_CONCURRENCY": str(args.concurrency),
+            "CATCHUP_RATE_RESERVE": "2",
+            "GITHUB_API_URL": f"http://{args.host}:{args.github_port}",
+            "GITHUB_TOKEN": "fake-token",
+            "EVENT_STORE_PATH": str(Path(tmp) / "events.db"),
+            "ADMIN_TOKEN": ADMIN_TOKEN,
+            # Сводки повторов не должны влиять на подсчет сообщений
+            "REPEAT_WINDOW_SECONDS": "0",
+        }
+        try:
+            started = time.monotonic()
+            first = await run_app(args, env)
+            elapsed = time.monotonic() - started
+            delivered = list(telegram.marker_order)
+
+            telegram.markers.clear()
+            telegram.marker_order.clear()
+            second = await run_app(args, env)
+            repeated = list(telegram.marker_order)
+        finally:
+            await telegram_runner.cleanup()
+            await github_runner.cleanup()
+
+    push_markers = set(pushes)
+    delivered_pushes = [marker for marker in delivered if marker in push_markers]
+    checks = {
+        "все пропущенные доставлены": set(delivered) == set(expected),
+        "без дубликатов": len(delivered) == len(set(delivered)),
+        "push'и в исходном порядке": delivered_pushes == pushes,
+        "повторный запуск ничего не отправил": not repeated,
+    }
+
+    print("\n=== Catch-up ===")
+    print(f"Первый запуск ({elapsed:.1f} сек): {first}")
+    print(f"Второй запуск: {second}")
+    print(f"Telegram: ожидалось {len(expected)}, доставлено {len(set(delivered))}, "
+          f"лишних {len(set(delivered) - set(expected))}, повторно {len(repeated)}")
+    print(f"GitHub API: {github.stats()['requests']}")
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+    return all(checks.values())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Проверка догрузки пропущенных доставок")
+    parser.add_argument("--missed", type=int, default=40, help="Сколько доставок пропущено за простой")
+    parser.add_argument("--concurrency", type=int, default=4, help="CATCHUP_CONCURRENCY")
+    parser.add_argument("--rate-limit", type=int, default=20, help="Лимит фейкового API на окно в 3 сек")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Сколько ждать окончания догрузки, сек")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--app-logs", action="store_true", help="Не глушить вывод приложения")
+    parser.add_argument("--fake-port", type=int, default=8081)
+    parser.add_argument("--github-port", type=int, default=8082)
+    parser.add_argument("--secret", default=LOADTEST_SECRET)
+    # Проверяются полнота и порядок, а не лимит чата: без него отправка успевает до остановки
+    parser.set_defaults(enrichment=False, chat_rate_per_minute=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main(parse_args())) else 1)
@@ -0,0 +1,210 @@
+# benchmarks/loadtest/fake_github.py
+"""
+Фейковый GitHub REST API для проверки обогащения уведомлений и догрузки доставок.
+
+Отдает синтетические ответы для эндпоинтов, которые использует
+app/services/enrichment.py, с ETag и ответом 304 на If-None-Match.
+Задержка настраивается, чтобы проверить бюджет времени обогащения.
+
+Журнал доставок hook'а (app/services/catchup.py) наполняется через
+add_delivery(): список с курсорной пагинацией (Link: rel="next") и
+payload каждой доставки, с заголовками лимита запросов.
+
+Запуск отдельно (приложению: GITHUB_API_URL=http://127.0.0.1:8082, ENRICHMENT_ENABLED=true):
+    python -m benchmarks.loadtest.fake_github --port 8082 --latency-ms 100
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+
+class FakeGitHubServer:
+    """Минимальный GitHub API: PR, job'ы Actions, релизы"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, rate_limit: int = 5000,
+                 rate_window: int = 3600):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests: Counter = Counter()
+        self.not_modified = 0
+        # Попытки доставки (от старых к новым) и остаток лимита запросов
+        self.deliveries: list[dict] = []
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.rate_limit_remaining = rate_limit
+        self.rate_limit_reset = int(time.time()) + rate_window
+
+    def add_delivery(self, event: str, payload: dict, status_code: int, delivered_at: float,
+                     guid: str | None = None) -> str:
+        """
+        Добавляет попытку доставки. Тот же guid — повторная попытка того же события.
+
+        :return: guid
+        """
+        guid = guid or str(uuid.uuid4())
+        self.deliveries.append({
+            "id": len(self.deliveries) + 1,
+            "guid": guid,
+            "delivered_at": datetime.fromtimestamp(delivered_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "redelivery": any(delivery["guid"] == guid for delivery in self.deliveries),
+            "status": "OK" if 200 <= status_code < 300 else "Invalid HTTP Response",
+            "status_code": status_code,
+            "event": event,
+            "action": payload.get("action"),
+            "payload": payload,
+        })
+        return guid
+
+    def _rate_headers(self) -> dict:
+        now = time.time()
+        if now >= self.rate_limit_reset:
+            self.rate_limit_remaining = self.rate_limit
+            self.rate_limit_reset = int(now) + self.rate_window
+        self.rate_limit_remaining = max(0, self.rate_limit_remaining - 1)
+        return {
+            "X-RateLimit-Remaining": str(self.rate_limit_remaining),
+            "X-RateLimit-Reset": str(self.rate_limit_reset),
+        }
+
+    # --- Ресурсы ---
+
+    @staticmethod
+    def _pull(request: web.Request) -> dict:
+        number = int(request.match_info["number"])
+        return {
+            "number": number,
+            "additions": number * 7 % 500,
+            "deletions": number * 3 % 200,
+            "changed_files": number % 20 + 1,
+            "commits": number % 5 + 1,
+        }
+
+    @staticmethod
+    def _job(request: web.Request) -> dict:
+        job_id = int(request.match_info["job_id"])
+        return {
+            "id": job_id,
+            "steps": [
+                {"number": 1, "name": "Set up job", "conclusion": "success"},
+                {"number": 2, "name": "Install dependencies", "conclusion": "success"},
+                {"number": 3, "name": "Run tests", "conclusion": "failure"},
+                {"number": 4, "name": "Upload coverage", "conclusion": "skipped"},
+            ],
+        }
+
+    @staticmethod
+    def _release(request: web.Request) -> dict:
+        tag = request.match_info["tag"]
+        return {
+            "tag_name": tag,
+            "assets": [
+                {"name": f"app-{tag}-linux-amd64.tar.gz", "size": 12_582_912},
+                {"name": f"app-{tag}-darwin-arm64.tar.gz", "size": 11_534_336},
+                {"name": "checksums.txt", "size": 210},
+            ],
+        }
+
+    # --- Обработка ---
+
+    def _handler(self, name: str, build):
+        async def handle(request: web.Request) -> web.Response:
+            self.requests[name] += 1
+            delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+            if delay:
+                await asyncio.sleep(delay / 1000)
+
+            body = json.dumps(build(request)).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            headers = {"ETag": etag, "X-RateLimit-Remaining": "4999"}
+            if request.headers.get("If-None-Match") == etag:
+                self.not_modified += 1
+                return web.Response(status=304, headers=headers)
+            return web.Response(body=body, content_type="application/json", headers=headers)
+
+        return handle
+
+    async def handle_deliveries(self, request: web.Request) -> web.Response:
+        """Журнал доставок: от новых к старым, курсор — id последней отданной попытки"""
+        self.requests["deliveries"] += 1
+        per_page = int(request.query.get("per_page", "30"))
+        cursor = int(request.query.get("cursor", "0"))
+        newest_first = [delivery for delivery in reversed(self.deliveries) if not cursor or delivery["id"] < cursor]
+        page = newest_first[:per_page]
+
+        headers = self._rate_headers()
+        if len(newest_first) > per_page:
+            next_url = request.url.update_query({"per_page": per_page, "cursor": page[-1]["id"]})
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        body = [{key: value for key, value in delivery.items() if key != "payload"} for delivery in page]
+        return web.json_response(body, headers=headers)
+
+    async def handle_delivery(self, request: web.Request) -> web.Response:
+        self.requests["delivery"] += 1
+        delivery_id = int(request.match_info["delivery_id"])
+        if not 1 <= delivery_id <= len(self.deliveries):
+            return web.json_response({"message": "Not Found"}, status=404, headers=self._rate_headers())
+        delivery = self.deliveries[delivery_id - 1]
+        detail = {key: value for key, value in delivery.items() if key != "payload"}
+        detail["request"] = {
+            "headers": {"X-GitHub-Event": delivery["event"], "X-GitHub-Delivery": delivery["guid"]},
+            "payload": delivery["payload"],
+        }
+        return web.json_response(detail, headers=self._rate_headers())
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {"requests": dict(self.requests), "not_modified": self.not_modified}
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_get("/repos/{owner}/{repo}/pulls/{number}", self._handler("pulls", self._pull))
+        app.router.add_get("/repos/{owner}/{repo}/actions/jobs/{job_id}", self._handler("jobs", self._job))
+        app.router.add_get("/repos/{owner}/{repo}/releases/tags/{tag}", self._handler("releases", self._release))
+        for hook in ("/repos/{owner}/{repo}/hooks/{hook_id}", "/orgs/{org}/hooks/{hook_id}"):
+            app.router.add_get(f"{hook}/deliveries", self.handle_deliveries)
+            app.router.add_get(f"{hook}/deliveries/{{delivery_id}}", self.handle_delivery)
+        return app
+
+
+async def start_fake_github(host: str, port: int, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                            server: FakeGitHubServer | None = None) -> tuple[FakeGitHubServer, web.AppRunner]:
+    """Запускает фейковый GitHub API в текущем event loop"""
+    server = server or FakeGitHubServer(latency_ms, jitter_ms)
+    runner = web.AppRunner(server.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return server, runner
+
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    server, runner = await start_fake_github(args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"Fake GitHub API: http://{args.host}:{args.port} (статистика: /_stats)")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(json.dumps(server.stats(), ensure_ascii=False))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Фейковый GitHub REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,223 @@
+# benchmarks/loadtest/fake_telegram.py
+"""
+Фейковый Telegram Bot API сервер для нагрузочных тестов.
+
+Умеет:
+- имитировать задержку ответа;
+- отвечать 429 (Too Many Requests) с retry_after;
+- отвечать 500 с заданной вероятностью;
+- считать доставленные сообщения по маркерам lt-000123.
+
+Запуск отдельно:
+    python -m benchmarks.loadtest.fake_telegram --port 8081 --latency-ms 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from benchmarks.loadtest.payloads import MARKER_PREFIX
+
+MARKER_RE = re.compile(re.escape(MARKER_PREFIX) + r"\d{6}")
+
+
+@dataclass
+class FakeServerConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_429: float = 0.0
+    retry_after: int = 1
+    error_rate: float = 0.0
+
+
+class FakeTelegramServer:
+    """Минимальная реализация Bot API, достаточная для aiogram"""
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self.markers: Counter = Counter()
+        # Маркеры в порядке отправки (для проверки порядка сообщений)
+        self.marker_order: list[str] = []
+        self.requests: Counter = Counter()
+        self.sent_messages = 0
+        self.responses_429 = 0
+        self.responses_500 = 0
+        self.first_message_at: float | None = None
+        self.last_message_at: float | None = None
+        self._message_id = 0
+
+    # --- Helpers ---
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        return dict(await request.post())
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    def _message(self, params: dict) -> dict:
+        self._message_id += 1
+        chat_id = int(params.get("chat_id", 0))
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": "Load test"},
+            "text": params.get("text", ""),
+        }
+        if params.get("message_thread_id"):
+            message["message_thread_id"] = int(params["message_thread_id"])
+        return message
+
+    # --- Handlers ---
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.requests[method] += 1
+        params = await self._read_params(request)
+
+        if method == "getMe":
+            return self._ok({"id": 123456, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"})
+
+        if method == "getUpdates":
+            # Long polling: держим запрос, но не дольше пары секунд
+            await asyncio.sleep(min(float(params.get("timeout", 0) or 0), 2.0))
+            return self._ok([])
+
+        if method in ("sendMessage", "editMessageText"):
+            return await self._handle_message(method, params)
+
+        # deleteWebhook, answerCallbackQuery и прочее — просто "ok"
+        return self._ok(True)
+
+    async def _handle_message(self, method: str, params: dict) -> web.Response:
+        config = self.config
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < config.rate_429:
+            self.responses_429 += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {config.retry_after}",
+                    "parameters": {"retry_after": config.retry_after},
+                },
+                status=429,
+            )
+        if roll < config.rate_429 + config.error_rate:
+            self.responses_500 += 1
+            return web.json_response(
+                {"ok": False, "error_code": 500, "description": "Internal Server Error"},
+                status=500,
+            )
+
+        if method == "sendMessage":
+            now = time.perf_counter()
+            self.first_message_at = self.first_message_at or now
+            self.last_message_at = now
+            self.sent_messages += 1
+            # Маркер может встречаться в сообщении дважды (заголовок + тело) — считаем один раз
+            found = list(dict.fromkeys(MARKER_RE.findall(params.get("text", ""))))
+            self.markers.update(found)
+            self.marker_order.extend(found)
+
+        return self._ok(self._message(params))
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.markers.clear()
+        self.marker_order.clear()
+        self.requests.clear()
+        self.sent_messages = self.responses_429 = self.responses_500 = 0
+        self.first_message_at = self.last_message_at = None
+        return web.json_response({"status": "ok"})
+
+    def stats(self) -> dict:
+        duplicates = sum(count - 1 for count in self.markers.values() if count > 1)
+        active = (
+            self.last_message_at - self.first_message_at
+            if self.first_message_at and self.last_message_at
+            else 0.0
+        )
+        return {
+            "sent_messages": self.sent_messages,
+            "unique_markers": len(self.markers),
+            "duplicated_markers": duplicates,
+            "responses_429": self.responses_429,
+            "responses_500": self.responses_500,
+            "active_seconds": round(active, 3),
+            "requests": dict(self.requests),
+        }
+
+    def markers_snapshot(self) -> Counter:
+        return Counter(self.markers)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_post("/_reset", self.handle_reset)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start_fake_server(config: FakeServerConfig, host: str, port: int) -> tuple[FakeTelegramServer, web.AppRunner]:
+    """Запускает фейковый сервер в текущем event loop"""
+    server = FakeTelegramServer(config)
+    runner = web.AppRunner(server.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return server, runner
+
+
+def add_fake_server_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Задержка ответа Bot API")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Случайная добавка к задержке")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Доля ответов 429 (0..1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 500 (0..1)")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeServerConfig:
+    return FakeServerConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+    )
+
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    server, runner = await start_fake_server(config_from_args(args), args.host, args.port)
+    print(f"Fake Bot API: http://{args.host}:{args.port} (статистика: /_stats)")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(json.dumps(server.stats(), ensure_ascii=False))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Фейковый Telegram Bot API сервер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_fake_server_args(parser)
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,195 @@
+# benchmarks/loadtest/payloads.py
+"""
+Генератор синтетических GitHub payload'ов для нагрузочного теста.
+
+Каждый payload содержит уникальный маркер (lt-000123), который попадает
+в отформатированный текст сообщения. По маркерам фейковый Bot API сервер
+считает доставленные, потерянные и продублированные сообщения.
+"""
+import hashlib
+import hmac
+import json
+from typing import Any, Callable, Dict
+
+MARKER_PREFIX = "lt-"
+
+REPO = {
+    "full_name": "loadtest/repo",
+    "html_url": "https://github.com/loadtest/repo",
+}
+USER = {
+    "login": "loadtester",
+    "html_url": "https://github.com/loadtester",
+}
+
+
+def make_marker(seq: int) -> str:
+    """Уникальный маркер сообщения"""
+    return f"{MARKER_PREFIX}{seq:06d}"
+
+
+def _pull_request(marker: str, seq: int) -> Dict[str, Any]:
+    return {
+        "html_url": f"https://github.com/loadtest/repo/pull/{seq}",
+        "number": seq,
+        "title": f"Load test PR {marker}",
+        "state": "open",
+        "body": "Synthetic pull request body",
+        "user": USER,
+        "merged": False,
+    }
+
+
+def _issue(marker: str, seq: int, is_pr: bool = False) -> Dict[str, Any]:
+    issue = {
+        "html_url": f"https://github.com/loadtest/repo/issues/{seq}",
+        "number": seq,
+        "title": f"Load test issue {marker}",
+        "state": "open",
+        "body": "Synthetic issue body",
+        "user": USER,
+        "labels": [],
+        "assignees": [],
+    }
+    if is_pr:
+        issue["pull_request"] = {"url": f"https://api.github.com/repos/loadtest/repo/pulls/{seq}"}
+    return issue
+
+
+def build_push(marker: str, seq: int) -> Dict[str, Any]:
+    sha = hashlib.sha1(marker.encode()).hexdigest()
+    commit = {
+        "id": sha,
+        "message": f"Load test commit {marker}\n\nSynthetic body",
+        "url": f"https://github.com/loadtest/repo/commit/{sha}",
+    }
+    return {
+        "ref": "refs/heads/main",
+        "before": "0" * 40,
+        "after": sha,
+        "repository": REPO,
+        "pusher": {"name": USER["login"], "email": "loadtester@example.com"},
+        "sender": USER,
+        "commits": [commit],
+        "head_commit": commit,
+    }
+
+
+def build_pull_request(marker: str, seq: int) -> Dict[str, Any]:
+    return {
+        "action": "opened",
+        "number": seq,
+        "pull_request": _pull_request(marker, seq),
+        "repository": REPO,
+        "sender": USER,
+    }
+
+
+def build_issue_comment(marker: str, seq: int) -> Dict[str, Any]:
+    return {
+        "action": "created",
+        "comment": {
+            "html_url": f"https://github.com/loadtest/repo/issues/{seq}#issuecomment-{seq}",
+            "body": f"Load test comment {marker}",
+            "user": USER,
+        },
+        "issue": _issue(marker, seq, is_pr=True),
+        "repository": REPO,
+        "sender": USER,
+    }
+
+
+def build_pull_request_review(marker: str, seq: int) -> Dict[str, Any]:
+    return {
+        "action": "submitted",
+        "review": {
+            "html_url": f"https://github.com/loadtest/repo/pull/{seq}#pullrequestreview-{seq}",
+            "state": "approved",
+            "body": f"Load test review {marker}",
+            "user": USER,
+        },
+        "pull_request": _pull_request(marker, seq),
+        "repository": REPO,
+        "sender": USER,
+    }
+
+
+def build_issues(marker: str, seq: int) -> Dict[str, Any]:
+    return {
+        "action": "opened",
+        "issue": _issue(marker, seq),
+        "repository": REPO,
+        "sender": USER,
+    }
+
+
+def build_check_run(marker: str, seq: int) -> Dict[str, Any]:
+    return {
+        "action": "completed",
+        "check_run": {
+            "id": seq,
+            "name": f"tests {marker}",
+            "status": "completed",
+            # Каждая десятая проверка падает (срочное сообщение + упавший шаг при обогащении)
+            "conclusion": "failure" if seq % 10 == 0 else "success",
+            "html_url": f"https://github.com/loadtest/repo/runs/{seq}",
+            "head_sha": hashlib.sha1(marker.encode()).hexdigest(),
+            "check_suite": {"head_branch": "main"},
+        },
+        "repository": REPO,
+        "sender": USER,
+    }
+
+
+def build_release(marker: str, seq: int) -> Dict[str, Any]:
+    return {
+        "action": "published",
+        "release": {
+            "html_url": f"https://github.com/loadtest/repo/releases/tag/v{seq}",
+            "tag_name": f"v0.0.{seq}-{marker}",
+            "name": None,
+            "body": "Synthetic changelog",
+            "draft": False,
+            "prerelease": False,
+            "author": USER,
+        },
+        "repository": REPO,
+        "sender": USER,
+    }
+
+
+# Event Name -> функция построения payload'а
+PAYLOAD_BUILDERS: Dict[str, Callable[[str, int], Dict[str, Any]]] = {
+    "push": build_push,
+    "pull_request": build_pull_request,
+    "issue_comment": build_issue_comment,
+    "pull_request_review": build_pull_request_review,
+    "issues": build_issues,
+    "check_run": build_check_run,
+    "release": build_release,
+}
+
+
+def check_coverage(event_types) -> None:
+    """Убеждаемся, что для каждого события из EVENT_HANDLERS есть генератор"""
+    missing = sorted(set(event_types) - set(PAYLOAD_BUILDERS))
+    if missing:
+        raise RuntimeError(f"Нет генератора payload'а для событий: {', '.join(missing)}")
+
+
+def build_delivery(event_type: str, seq: int, secret: str | None) -> tuple[bytes, Dict[str, str]]:
+    """Собирает тело запроса и заголовки подписанной доставки"""
+    marker = make_marker(seq)
+    body = json.dumps(PAYLOAD_BUILDERS[event_type](marker, seq)).encode()
+
+    headers = {
+        "Content-Type": "application/json",
+        "X-GitHub-Event": event_type,
+        "X-GitHub-Delivery": f"loadtest-{seq}",
+    }
+    if secret:
+        headers["X-Hub-Signature-256"] = "sha256=" + hmac.new(
+            secret.encode(), body, hashlib.sha256
+        ).hexdigest()
+
+    return body, headers
@@ -0,0 +1,385 @@
+# benchmarks/loadtest/run.py
+"""
+Нагрузочный тест webhook-эндпоинта с фейковым Telegram Bot API.
+
+Что делает:
+1. Поднимает фейковый Bot API (задержка, 429, ошибки — настраиваются).
+2. Запускает приложение (uvicorn main:app) с TELEGRAM_API_URL на фейк
+   или использует уже запущенное (--app-url, --app-pid).
+   С --enrichment поднимает и фейковый GitHub API для обогащения.
+3. Шлет подписанные синтетические payload'ы для всех событий из
+   EVENT_HANDLERS с заданным RPS (open-loop, не дожидаясь ответов).
+4. Печатает отчет: перцентили задержки приема, пропускную способность
+   доставки, потерянные/дублированные сообщения и рост памяти.
+
+Лимит частоты чата (SEND_CHAT_RATE_PER_MINUTE) по умолчанию тот же, что у приложения
+(20 в минуту): доставка упирается в него, а задержка приема — нет. Пропускную
+способность самой отправки меряют с --chat-rate-per-minute 0; конфигурация лимита
+печатается в отчете.
+
+Пример:
+    python -m benchmarks.loadtest.run --rps 50 --duration 30 --rate-429 0.02 --chat-rate-per-minute 0
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import aiohttp
+
+from benchmarks.loadtest.fake_github import start_fake_github
+from benchmarks.loadtest.fake_telegram import add_fake_server_args, config_from_args, start_fake_server
+from benchmarks.loadtest.payloads import build_delivery, check_coverage, make_marker
+
+ROOT = Path(__file__).resolve().parents[2]
+FAKE_TOKEN = "123456:LOADTEST-token"
+FAKE_CHANNEL_ID = "-1001000000000"
+LOADTEST_SECRET = "loadtest-secret"
+
+# Для импорта EVENT_HANDLERS конфигу нужен токен
+os.environ.setdefault("BOT_TOKEN", FAKE_TOKEN)
+sys.path.insert(0, str(ROOT))
+
+from app.core.config import SEND_CHAT_BURST, SEND_CHAT_RATE_PER_MINUTE  # noqa: E402
+from app.services.webhook_service import EVENT_HANDLERS  # noqa: E402
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def read_rss_kb(pid: int | None) -> int | None:
+    """RSS процесса в килобайтах (только Linux)"""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_app(args: argparse.Namespace, extra_env: dict[str, str] | None = None) -> subprocess.Popen:
+    """Запускает приложение, направив бота на фейковый Bot API"""
+    env = dict(os.environ)
+    if args.chat_rate_per_minute is not None:
+        env["SEND_CHAT_RATE_PER_MINUTE"] = str(args.chat_rate_per_minute)
+    env.update({
+        "BOT_TOKEN": FAKE_TOKEN,
+        "TELEGRAM_API_URL": f"http://{args.host}:{args.fake_port}",
+        "GITHUB_WEBHOOK_SECRET": args.secret,
+        "NOTIFY_CHANNEL_ID": FAKE_CHANNEL_ID,
+        "PR_TOPIC_ID": "2",
+        "PUSH_TOPIC_ID": "3",
+        "ISSUES_TOPIC_ID": "4",
+        "CICD_TOPIC_ID": "5",
+        "RELEASES_TOPIC_ID": "6",
+        "SECURITY_TOPIC_ID": "7",
+        # Только основной канал: счетчики доставки рассчитаны на одного получателя
+        "ROUTES_PATH": "",
+    })
+    if args.enrichment:
+        env.update({
+            "ENRICHMENT_ENABLED": "true",
+            "GITHUB_API_URL": f"http://{args.host}:{args.github_port}",
+        })
+    env.update(extra_env or {})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app",
+         "--host", args.host, "--port", str(args.app_port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL if not args.app_logs else None,
+        stderr=subprocess.DEVNULL if not args.app_logs else None,
+    )
+
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url) as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Приложение не поднялось за {timeout} сек: {url}")
+
+
+# ============================================================================
+# LOAD GENERATOR
+# ============================================================================
+
+class LoadResult:
+    def __init__(self):
+        self.latencies_ms: list[float] = []
+        self.http_statuses: Counter = Counter()
+        self.app_statuses: Counter = Counter()
+        self.accepted_markers: set[str] = set()
+        self.client_errors = 0
+        self.skipped = 0
+        self.rss_samples: list[int] = []
+
+
+async def send_one(session, url, event_type, seq, secret, result: LoadResult) -> None:
+    body, headers = build_delivery(event_type, seq, secret)
+    started = time.perf_counter()
+    try:
+        async with session.post(url, data=body, headers=headers) as resp:
+            payload = await resp.json(content_type=None)
+            result.latencies_ms.append((time.perf_counter() - started) * 1000)
+            result.http_statuses[resp.status] += 1
+            status = payload.get("status") if isinstance(payload, dict) else None
+            result.app_statuses[status] += 1
+            if resp.status == 200 and status not in ("ignored", "error"):
+                result.accepted_markers.add(make_marker(seq))
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        result.client_errors += 1
+
+
+async def sample_rss(pid: int | None, result: LoadResult, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = read_rss_kb(pid)
+        if rss is not None:
+            result.rss_samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def generate_load(session, args, events: list[str], result: LoadResult) -> float:
+    """Open-loop генератор: отправляет запросы по расписанию, не дожидаясь ответов"""
+    url = f"{args.app_url}/webhook/github"
+    total = int(args.rps * args.duration)
+    interval = 1.0 / args.rps
+    inflight: set[asyncio.Task] = set()
+
+    started = time.perf_counter()
+    for seq in range(total):
+        delay = started + seq * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if len(inflight) >= args.max_inflight:
+            # Клиент не успевает — фиксируем, но не искажаем расписание
+            result.skipped += 1
+            continue
+
+        event_type = events[seq % len(events)]
+        task = asyncio.create_task(send_one(session, url, event_type, seq, args.secret, result))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+    if inflight:
+        await asyncio.wait(inflight)
+    return time.perf_counter() - started
+
+
+def chat_rate(args: argparse.Namespace) -> float:
+    """Лимит сообщений в чат в минуту, с которым работает приложение"""
+    return SEND_CHAT_RATE_PER_MINUTE if args.chat_rate_per_minute is None else args.chat_rate_per_minute
+
+
+async def wait_drain(server, expected: int, timeout: float, idle: float = 1.0) -> None:
+    """Ждем, пока фейковый сервер перестанет получать новые сообщения (idle сек без новых)"""
+    deadline = time.monotonic() + timeout
+    last, changed_at = -1, time.monotonic()
+    while time.monotonic() < deadline:
+        current = len(server.markers)
+        if current >= expected:
+            return
+        if current != last:
+            last, changed_at = current, time.monotonic()
+        elif time.monotonic() - changed_at >= idle:
+            return
+        await asyncio.sleep(1.0)
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def build_report(args, events, result: LoadResult, elapsed: float, fake_stats: dict, markers: Counter) -> dict:
+    delivered = sum(1 for marker in result.accepted_markers if markers.get(marker))
+    dropped = len(result.accepted_markers) - delivered
+    duplicated = sum(count - 1 for count in markers.values() if count > 1)
+    active = fake_stats["active_seconds"] or elapsed
+    rss = result.rss_samples
+
+    return {
+        "target_rps": args.rps,
+        "achieved_rps": round(len(result.latencies_ms) / elapsed, 2) if elapsed else 0.0,
+        "duration_s": round(elapsed, 2),
+        "events": events,
+        "chat_rate_limit": {
+            "per_minute": chat_rate(args),
+            "burst": SEND_CHAT_BURST,
+        },
+        "requests": {
+            "completed": len(result.latencies_ms),
+            "client_errors": result.client_errors,
+            "skipped_client_saturated": result.skipped,
+            "http_statuses": {str(k): v for k, v in result.http_statuses.items()},
+            "app_statuses": {str(k): v for k, v in result.app_statuses.items()},
+        },
+        "ingest_latency_ms": {
+            "p50": round(percentile(result.latencies_ms, 50), 2),
+            "p90": round(percentile(result.latencies_ms, 90), 2),
+            "p99": round(percentile(result.latencies_ms, 99), 2),
+            "max": round(max(result.latencies_ms, default=0.0), 2),
+        },
+        "delivery": {
+            "expected_messages": len(result.accepted_markers),
+            "delivered_messages": delivered,
+            "dropped_messages": dropped,
+            "duplicated_messages": duplicated,
+            "telegram_send_calls": fake_stats["sent_messages"],
+            "delivered_per_second": round(delivered / active, 2) if active else 0.0,
+            "responses_429": fake_stats["responses_429"],
+            "responses_500": fake_stats["responses_500"],
+        },
+        "memory_rss_kb": {
+            "start": rss[0] if rss else None,
+            "end": rss[-1] if rss else None,
+            "peak": max(rss) if rss else None,
+            "growth": rss[-1] - rss[0] if rss else None,
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    lat = report["ingest_latency_ms"]
+    dlv = report["delivery"]
+    mem = report["memory_rss_kb"]
+    req = report["requests"]
+    print("\n=== Load test report ===")
+    print(f"RPS: target {report['target_rps']}, achieved {report['achieved_rps']} за {report['duration_s']} сек")
+    limit = report["chat_rate_limit"]
+    print(f"Лимит чата: {limit['per_minute']:g} в минуту, burst {limit['burst']}" if limit["per_minute"] > 0
+          else "Лимит чата: выключен (--chat-rate-per-minute 0)")
+    print(f"Запросы: {req['completed']} выполнено, {req['client_errors']} ошибок клиента, "
+          f"{req['skipped_client_saturated']} пропущено (клиент перегружен)")
+    print(f"HTTP статусы: {req['http_statuses']}, статусы приложения: {req['app_statuses']}")
+    print(f"Задержка приема, мс: p50={lat['p50']} p90={lat['p90']} p99={lat['p99']} max={lat['max']}")
+    print(f"Доставка: ожидалось {dlv['expected_messages']}, доставлено {dlv['delivered_messages']}, "
+          f"не доставлено к концу замера {dlv['dropped_messages']}, дубликатов {dlv['duplicated_messages']}")
+    print(f"Telegram: {dlv['telegram_send_calls']} sendMessage, {dlv['delivered_per_second']} сообщений/сек, "
+          f"429: {dlv['responses_429']}, 500: {dlv['responses_500']}")
+    if "github_api" in report:
+        github = report["github_api"]
+        print(f"GitHub API: {sum(github['requests'].values())} запросов {github['requests']}, "
+              f"304: {github['not_modified']}")
+    if mem["start"] is not None:
+        print(f"Память (RSS, КБ): start={mem['start']} end={mem['end']} peak={mem['peak']} growth={mem['growth']}")
+    else:
+        print("Память: недоступно (укажите --app-pid или запускайте на Linux)")
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+async def main(args: argparse.Namespace) -> dict:
+    events = args.events.split(",") if args.events else list(EVENT_HANDLERS)
+    check_coverage(events)
+
+    server, runner = await start_fake_server(config_from_args(args), args.host, args.fake_port)
+    github, github_runner = (
+        await start_fake_github(args.host, args.github_port, args.github_latency_ms)
+        if args.enrichment else (None, None)
+    )
+    app_process = None
+    result = LoadResult()
+    stop_sampling = asyncio.Event()
+    # Свое хранилище событий: outbox прошлого прогона не досылается в этот
+    store_dir = tempfile.TemporaryDirectory()
+
+    try:
+        if not args.app_url:
+            app_process = start_app(args, {"EVENT_STORE_PATH": str(Path(store_dir.name) / "events.db")})
+            args.app_url = f"http://{args.host}:{args.app_port}"
+        pid = args.app_pid or (app_process.pid if app_process else None)
+
+        timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+        connector = aiohttp.TCPConnector(limit=args.max_inflight)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            await wait_ready(session, f"{args.app_url}/")
+            sampler = asyncio.create_task(sample_rss(pid, result, stop_sampling))
+
+            print(f"▶ {args.rps} RPS × {args.duration} сек, события: {', '.join(events)}")
+            elapsed = await generate_load(session, args, events, result)
+            # С лимитом чата сообщения уходят раз в 60 / rate сек — это не остановка доставки
+            rate = chat_rate(args)
+            idle = 60 / rate + 1 if rate > 0 else 1.0
+            await wait_drain(server, len(result.accepted_markers), args.drain_seconds, idle)
+
+            stop_sampling.set()
+            await sampler
+
+        report = build_report(args, events, result, elapsed, server.stats(), server.markers_snapshot())
+        if github:
+            report["github_api"] = github.stats()
+        print_report(report)
+        if args.json:
+            Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        return report
+
+    finally:
+        if app_process:
+            app_process.terminate()
+            try:
+                app_process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                app_process.kill()
+        store_dir.cleanup()
+        await runner.cleanup()
+        if github_runner:
+            await github_runner.cleanup()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест /webhook/github")
+    parser.add_argument("--rps", type=float, default=20.0, help="Целевое число webhook'ов в секунду")
+    parser.add_argument("--duration", type=float, default=30.0, help="Длительность нагрузки, сек")
+    parser.add_argument("--events", default="", help="Список событий через запятую (по умолчанию все)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--app-url", default="", help="URL уже запущенного приложения")
+    parser.add_argument("--app-pid", type=int, default=None, help="PID приложения для замера памяти")
+    parser.add_argument("--app-logs", action="store_true", help="Не глушить вывод приложения")
+    parser.add_argument("--fake-port", type=int, default=8081)
+    parser.add_argument("--secret", default=LOADTEST_SECRET, help="GITHUB_WEBHOOK_SECRET для подписи")
+    parser.add_argument("--max-inflight", type=int, default=500, help="Максимум одновременных запросов")
+    parser.add_argument("--request-timeout", type=float, default=10.0, help="Таймаут запроса (как у GitHub)")
+    parser.add_argument("--chat-rate-per-minute", type=float, default=None,
+                        help="SEND_CHAT_RATE_PER_MINUTE приложения (по умолчанию как в приложении, 0 — без лимита)")
+    parser.add_argument("--drain-seconds", type=float, default=30.0, help="Сколько ждать доставку после нагрузки")
+    parser.add_argument("--json", default="", help="Сохранить отчет в JSON-файл")
+    parser.add_argument("--enrichment", action="store_true", help="Включить обогащение с фейковым GitHub API")
+    parser.add_argument("--github-port", type=int, default=8082)
+    parser.add_argument("--github-latency-ms", type=float, default=50.0, help="Задержка фейкового GitHub API")
+    add_fake_server_args(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -7,7 +7,19 @@ from loguru import logger as log
 
 from app.bot.handlers import bot_router
 from app.core.logger import setup_logger
+from app.core.loop_monitor import loop_monitor, start_loop_monitor
+from app.core.config import SEND_QUEUE_CALIBRATE
+from app.core.tracing import setup_tracing, shutdown_tracing
 from app.bot.loader import bot, dp
+from app.services.sender_service import lane_scheduler, message_batcher
+from app.services.event_store import event_store, run_compaction
+from app.services.catchup import catchup
+from app.services.enrichment import enricher
+from app.services.payload_offload import payload_offloader
+from app.services.queue_calibration import run_calibration
+from app.services.repeat_suppressor import repeat_suppressor, run_summaries
+from app.services.send_queue import send_budget
+from app.services.webhook_service import background_delivery, send_repeat_summary
 
 # --- ИМПОРТИРУЕМ НАШ НОВЫЙ API РОУТЕР ---
 from app.api import api_router  # <--- ДОБАВИТЬ ЭТО
@@ -15,13 +27,33 @@ from app.api import api_router  # <--- ДОБАВИТЬ ЭТО
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logger()
+    setup_tracing()
+    start_loop_monitor()
     log.info("🚀 Запуск приложения...")
 
+    # Процессы для больших payload'ов поднимаем до приема webhook'ов
+    if payload_offloader:
+        await payload_offloader.start()
+
     dp.include_router(bot_router)
 
+    # Память ожидающего сообщения на этой сборке Python — для бюджета очереди отправки
+    calibration_task = asyncio.create_task(run_calibration(send_budget)) if SEND_QUEUE_CALIBRATE else None
+
     polling_task = asyncio.create_task(dp.start_polling(bot))
     log.info("🤖 Бот запущен (polling mode)")
 
+    # Периодическая чистка истории событий
+    compaction_task = asyncio.create_task(run_compaction(event_store)) if event_store else None
+    # Сводки по подавленным повторам
+    summaries_task = (
+        asyncio.create_task(run_summaries(repeat_suppressor, send_repeat_summary)) if repeat_suppressor else None
+    )
+    # Уведомления, принятые, но не отправленные до прошлой остановки, — раньше новых webhook'ов
+    await background_delivery.replay()
+    # Доставки, которые GitHub не смог отправить, пока приложение было выключено
+    catchup_task = asyncio.create_task(catchup.run()) if catchup else None
+
     yield
 
     log.info("🛑 Остановка приложения...")
@@ -31,9 +63,58 @@ async def lifespan(app: FastAPI):
     except asyncio.CancelledError:
         pass
 
+    if compaction_task:
+        compaction_task.cancel()
+
+    if calibration_task:
+        calibration_task.cancel()
+        try:
+            await calibration_task
+        except asyncio.CancelledError:
+            pass
+
+    if catchup_task:
+        catchup_task.cancel()
+        try:
+            await catchup_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log.exception(f"Ошибка догрузки пропущенных доставок: {e}")
+        await catchup.close()
+
+    # Незакрытые окна повторов: досылаем сводки, пока очереди отправки еще работают
+    if summaries_task:
+        summaries_task.cancel()
+        for window in repeat_suppressor.collect(force=True):
+            try:
+                await send_repeat_summary(window)
+            except Exception as e:
+                log.error(f"Не удалось отправить сводку повторов: {e}")
+
+    # Фоновые отправки принятых webhook'ов: неотправленное останется в outbox до следующего старта
+    await background_delivery.close()
+
+    # Досылаем накопленные батчи и сообщения, уже стоящие в очередях топиков
+    if message_batcher:
+        await message_batcher.close()
+    await lane_scheduler.close()
+
     await bot.session.close()
     log.info("🤖 Сессия бота закрыта")
 
+    if enricher:
+        await enricher.close()
+
+    if payload_offloader:
+        payload_offloader.close()
+
+    if event_store:
+        event_store.close()
+
+    loop_monitor.stop()
+    shutdown_tracing()
+
 app = FastAPI(title="Telegram GitHub Notifier", lifespan=lifespan)
 
 # --- ПОДКЛЮЧАЕМ РОУТЕР В ПРИЛОЖЕНИЕ ---
@@ -0,0 +1,16 @@
+# tests/conftest.py
+"""
+Конфиг приложения читается при импорте, поэтому окружение для тестов
+задается здесь — до первого импорта app.
+"""
+import os
+
+os.environ.setdefault("BOT_TOKEN", "123456:TEST-token")
+os.environ["GITHUB_WEBHOOK_SECRET"] = "test-secret"
+os.environ["NOTIFY_CHANNEL_ID"] = "-1001000000000"
+os.environ["EVENT_STORE_PATH"] = ""
+os.environ["ROUTES_PATH"] = "/nonexistent/routes.json"
+os.environ["FILTER_RULES_PATH"] = "/nonexistent/filters.rules"
+os.environ["CATCHUP_HOOKS"] = ""
+os.environ["ENRICHMENT_ENABLED"] = "false"
+os.environ["OFFLOAD_WORKERS"] = "0"
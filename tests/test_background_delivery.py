@@ -0,0 +1,146 @@
+# tests/test_background_delivery.py
+import asyncio
+
+from app.services import webhook_service
+from app.services.event_store import EventStore
+from app.services.message_details import DetailCache, MessageDetail
+from app.services.webhook_service import BackgroundDelivery, PreparedNotification
+
+
+class GatedSender:
+    """Отправка, которая ждет, пока ее не отпустят"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent: list[str] = []
+
+    async def __call__(self, text: str, **kwargs) -> list[dict]:
+        await self.gate.wait()
+        self.sent.append(text)
+        return [{"chat_id": 1, "topic_id": None, "template": "full", "ok": True}]
+
+
+def test_webhook_is_acknowledged_before_telegram(tmp_path):
+    async def scenario():
+        store = EventStore(str(tmp_path / "events.db"), 30)
+        delivery = BackgroundDelivery(store)
+        sender = GatedSender()
+        prepared = PreparedNotification("push", "hello", sender, "acme/app:refs/heads/main", False, "acme/app")
+
+        result = await asyncio.wait_for(delivery.submit(prepared, "delivery-1"), timeout=5)
+        assert result == {"status": "queued", "event": "push"}
+        assert [row["message"] for row in await store.pending_outbox()] == ["hello"]
+
+        sender.gate.set()
+        await delivery.close()
+        assert sender.sent == ["hello"]
+        assert await store.pending_outbox() == []
+        assert await store.processed_deliveries(["delivery-1"]) == {"delivery-1"}
+        store.close()
+
+    asyncio.run(scenario())
+
+
+def test_unsent_notifications_are_replayed_in_order(tmp_path, monkeypatch):
+    async def scenario():
+        path = str(tmp_path / "events.db")
+        store = EventStore(path, 30)
+        stuck = GatedSender()
+        delivery = BackgroundDelivery(store)
+        for seq in range(3):
+            prepared = PreparedNotification("push", f"message {seq}", stuck, None, False, "acme/app")
+            await delivery.submit(prepared, f"delivery-{seq}")
+        # Остановка, пока Telegram не ответил: записи остаются в outbox
+        await delivery.close(timeout=0.1)
+        store.close()
+
+        sender = GatedSender()
+        sender.gate.set()
+        payload_class, formatter, _ = webhook_service.EVENT_HANDLERS["push"]
+        monkeypatch.setitem(webhook_service.EVENT_HANDLERS, "push", (payload_class, formatter, sender))
+
+        store = EventStore(path, 30)
+        delivery = BackgroundDelivery(store)
+        assert await delivery.replay() == 3
+        await delivery.close()
+        assert sender.sent == ["message 0", "message 1", "message 2"]
+        assert await store.pending_outbox() == []
+        store.close()
+
+    asyncio.run(scenario())
+
+
+def test_replayed_notification_keeps_its_detail_button(tmp_path, monkeypatch):
+    async def scenario():
+        path = str(tmp_path / "events.db")
+        store = EventStore(path, 30)
+        cache = DetailCache(10, 3600)
+        detail = MessageDetail("<b>PR</b>", "https://github.com/acme/app/pull/1", "Открыть", body="long body")
+        prepared = PreparedNotification("pull_request", "short", GatedSender(), None, False, "acme/app",
+                                        detail_token=cache.put(detail), detail=detail)
+        delivery = BackgroundDelivery(store)
+        await delivery.submit(prepared, "delivery-1")
+        await delivery.close(timeout=0.1)
+        store.close()
+
+        # Перезапуск: кэш подробностей в памяти пуст, старый токен недействителен
+        cache = DetailCache(10, 3600)
+        monkeypatch.setattr(webhook_service, "detail_cache", cache)
+        tokens = []
+
+        async def sender(text: str, detail_token: str | None = None, **kwargs) -> list[dict]:
+            tokens.append(detail_token)
+            return [{"chat_id": 1, "topic_id": None, "template": "full", "ok": True}]
+
+        payload_class, formatter, _ = webhook_service.EVENT_HANDLERS["pull_request"]
+        monkeypatch.setitem(webhook_service.EVENT_HANDLERS, "pull_request", (payload_class, formatter, sender))
+        store = EventStore(path, 30)
+        delivery = BackgroundDelivery(store)
+        assert await delivery.replay() == 1
+        await delivery.close()
+        store.close()
+
+        [token] = tokens
+        restored = cache.get(token)
+        assert (restored.title, restored.url, restored.body) == (detail.title, detail.url, detail.body)
+
+    asyncio.run(scenario())
+
+
+def test_outbox_carries_every_notification_field(tmp_path, monkeypatch):
+    async def scenario():
+        path = str(tmp_path / "events.db")
+        store = EventStore(path, 30)
+        detail = MessageDetail("<b>Push</b>", "https://github.com/acme/app/compare/a...b", "Открыть",
+                               commits=[("abc1234", "fix")], commits_count=7)
+        original = PreparedNotification("push", "hello", GatedSender(), "acme/app:refs/heads/main", True,
+                                        "acme/app", detail_token="token", detail=detail)
+        delivery = BackgroundDelivery(store)
+        await delivery.submit(original, "delivery-1")
+        await delivery.close(timeout=0.1)
+        store.close()
+
+        replayed = []
+
+        async def capture(prepared: PreparedNotification) -> dict:
+            replayed.append(prepared)
+            return {"status": "ok", "event": prepared.event_type, "destinations": []}
+
+        monkeypatch.setattr(webhook_service, "deliver_event", capture)
+        monkeypatch.setattr(webhook_service, "detail_cache", DetailCache(10, 3600))
+        store = EventStore(path, 30)
+        delivery = BackgroundDelivery(store)
+        await delivery.replay()
+        await delivery.close()
+        store.close()
+
+        [prepared] = replayed
+        # Отправитель берется по типу события, токен выдается заново — остальное должно пережить перезапуск
+        assert prepared.sender is webhook_service.EVENT_HANDLERS["push"][2]
+        assert webhook_service.detail_cache.get(prepared.detail_token) is prepared.detail
+        for name in set(PreparedNotification.__slots__) - {"sender", "detail_token", "detail"}:
+            assert getattr(prepared, name) == getattr(original, name), name
+        for name in MessageDetail.__slots__:
+            assert getattr(prepared.detail, name) == getattr(detail, name), name
+
+    asyncio.run(scenario())
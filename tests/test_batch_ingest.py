@@ -0,0 +1,100 @@
+# tests/test_batch_ingest.py
+import asyncio
+import hashlib
+import hmac
+import json
+
+from app.services import batch_ingest, webhook_service
+from app.services.webhook_service import BackgroundDelivery
+
+SECRET = b"test-secret"
+
+
+def _record(seq: int, signature=None, event: str = "star", payload: dict | None = None) -> bytes:
+    body = json.dumps(payload or {"action": "created", "seq": seq})
+    if signature is None:
+        signature = "sha256=" + hmac.new(SECRET, body.encode(), hashlib.sha256).hexdigest()
+    record = {"event": event, "delivery_id": f"delivery-{seq}", "signature": signature, "body": body}
+    return json.dumps(record).encode() + b"\n"
+
+
+def _pull_request(seq: int) -> dict:
+    user = {"login": "octocat", "html_url": "https://github.com/octocat"}
+    return {
+        "action": "opened",
+        "pull_request": {"number": seq, "title": f"PR {seq}", "html_url": f"https://github.com/acme/app/pull/{seq}",
+                         "state": "open", "user": user},
+        "repository": {"full_name": "acme/app", "html_url": "https://github.com/acme/app"},
+        "sender": user,
+    }
+
+
+async def _stream(lines: list[bytes]):
+    for line in lines:
+        yield line
+
+
+def _ingest(lines: list[bytes]) -> dict:
+    # Зависание пакета — это и есть регрессия: ограничиваем время
+    return asyncio.run(asyncio.wait_for(batch_ingest.ingest_ndjson(_stream(lines)), timeout=10))
+
+
+def test_malformed_signature_does_not_stall_batch(monkeypatch):
+    monkeypatch.setattr(batch_ingest, "BATCH_INGEST_MAX_PENDING", 2)
+    lines = [_record(0, signature=123), _record(1, signature="sha256=ф"), *(_record(seq) for seq in range(2, 8))]
+
+    result = _ingest(lines)
+
+    assert result["records"] == 8
+    statuses = [(entry["status"], entry.get("reason")) for entry in result["results"]]
+    assert statuses[:2] == [("error", "invalid_signature")] * 2
+    assert statuses[2:] == [("ignored", "unsupported_event")] * 6
+
+
+def test_record_exception_is_reported_per_record(monkeypatch):
+    monkeypatch.setattr(batch_ingest, "BATCH_INGEST_MAX_PENDING", 2)
+
+    def broken(line: bytes):
+        if b"delivery-1" in line:
+            raise RuntimeError("boom")
+        return original(line)
+
+    original = batch_ingest.parse_record
+    monkeypatch.setattr(batch_ingest, "parse_record", broken)
+
+    result = _ingest([_record(seq) for seq in range(6)])
+
+    statuses = [(entry["status"], entry.get("reason")) for entry in result["results"]]
+    assert statuses[1] == ("error", "exception")
+    assert statuses[:1] + statuses[2:] == [("ignored", "unsupported_event")] * 5
+
+
+def test_records_are_queued_without_waiting_for_telegram(monkeypatch):
+    monkeypatch.setattr(batch_ingest, "BATCH_INGEST_MAX_PENDING", 2)
+    sent: list[str] = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def stuck_sender(text: str, **kwargs) -> list[dict]:
+            await gate.wait()
+            sent.append(text)
+            return [{"chat_id": 1, "topic_id": None, "template": "full", "ok": True}]
+
+        payload_class, formatter, _ = webhook_service.EVENT_HANDLERS["pull_request"]
+        monkeypatch.setitem(webhook_service.EVENT_HANDLERS, "pull_request", (payload_class, formatter, stuck_sender))
+        delivery = BackgroundDelivery(None)
+        monkeypatch.setattr(batch_ingest, "background_delivery", delivery)
+
+        lines = [_record(seq, event="pull_request", payload=_pull_request(seq)) for seq in range(6)]
+        # Telegram не отвечает, а пакет все равно принят целиком
+        result = await asyncio.wait_for(batch_ingest.ingest_ndjson(_stream(lines)), timeout=5)
+        assert [entry["status"] for entry in result["results"]] == ["queued"] * 6
+        assert sent == []
+
+        gate.set()
+        await delivery.close()
+
+    asyncio.run(scenario())
+    assert len(sent) == 6
+    assert all(f"PR {seq}" in text for seq, text in enumerate(sent))
@@ -0,0 +1,65 @@
+# tests/test_catchup.py
+import asyncio
+
+from app.services import webhook_service
+from app.services.catchup import CatchUp, MissedDelivery
+from app.services.event_store import EventStore
+from app.services.webhook_service import BackgroundDelivery
+
+USER = {"login": "octocat", "html_url": "https://github.com/octocat"}
+HOOK = "/repos/acme/app/hooks/1"
+
+
+def pull_request(number: int) -> dict:
+    return {
+        "action": "opened",
+        "pull_request": {"number": number, "title": f"PR {number}", "state": "open", "user": USER,
+                         "html_url": f"https://github.com/acme/app/pull/{number}"},
+        "repository": {"full_name": "acme/app", "html_url": "https://github.com/acme/app"},
+        "sender": USER,
+    }
+
+
+class FakeAPI:
+    """Журнал доставок: у попытки 2 ответ не разбирается"""
+    rate_limit_remaining = None
+    rate_limit_reset = None
+
+    async def get_page(self, url: str):
+        attempt_id = int(url.rsplit("/", 1)[1])
+        if attempt_id == 2:
+            raise ValueError("Expecting value: line 1 column 1")
+        return {"request": {"payload": pull_request(attempt_id)}}, None
+
+
+def test_failed_delivery_does_not_stall_catchup(tmp_path, monkeypatch):
+    async def scenario():
+        gate = asyncio.Event()
+        sent: list[str] = []
+
+        async def stuck_sender(text: str, **kwargs) -> list[dict]:
+            await gate.wait()
+            sent.append(text)
+            return [{"chat_id": 1, "topic_id": None, "template": "full", "ok": True}]
+
+        payload_class, formatter, _ = webhook_service.EVENT_HANDLERS["pull_request"]
+        monkeypatch.setitem(webhook_service.EVENT_HANDLERS, "pull_request", (payload_class, formatter, stuck_sender))
+
+        store = EventStore(str(tmp_path / "events.db"), 30)
+        delivery = BackgroundDelivery(store)
+        catchup = CatchUp(FakeAPI(), store, [HOOK], 1, 1, 100, 0, delivery)
+        missed = [MissedDelivery(HOOK, attempt_id, f"guid-{attempt_id}", "pull_request", attempt_id)
+                  for attempt_id in (1, 2, 3)]
+
+        # Telegram не отвечает, а догрузка все равно заканчивается
+        await asyncio.wait_for(catchup._replay(missed), timeout=5)
+        assert catchup.counters["errors"] == 1
+        assert catchup.statuses == {"queued": 2}
+
+        gate.set()
+        await delivery.close()
+        assert len(sent) == 2 and "PR 1" in sent[0] and "PR 3" in sent[1]
+        assert await store.processed_deliveries(["guid-1", "guid-2", "guid-3"]) == {"guid-1", "guid-3"}
+        store.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+# tests/test_chat_rate_limit.py
+import asyncio
+import time
+
+from app.services import sender_service
+from app.services.event_store import EventStore
+from app.services.lane_scheduler import LaneScheduler
+from app.services.rate_limiter import ChatRateLimiter
+from app.services.webhook_service import BackgroundDelivery, PreparedNotification
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_message(self, chat_id, text, message_thread_id=None, **kwargs):
+        self.sent.append(text)
+
+
+def test_throttled_chat_does_not_delay_webhook_response(tmp_path, monkeypatch):
+    async def scenario():
+        # Одно сообщение в 10 сек: второе и третье ждут лимита чата
+        limiter = ChatRateLimiter(6, 1)
+        bot = FakeBot()
+        monkeypatch.setattr(sender_service, "chat_rate_limiter", limiter)
+        monkeypatch.setattr(sender_service, "bot", bot)
+        monkeypatch.setattr(sender_service, "lane_scheduler", LaneScheduler(8, 30, throttle=sender_service._throttle))
+
+        store = EventStore(str(tmp_path / "events.db"), 30)
+        delivery = BackgroundDelivery(store)
+        started = time.monotonic()
+        for seq in range(3):
+            prepared = PreparedNotification("push", f"push {seq}", sender_service.send_push_notification,
+                                            None, False, "acme/app")
+            assert await delivery.submit(prepared, f"delivery-{seq}") == {"status": "queued", "event": "push"}
+        assert time.monotonic() - started < 2
+
+        await asyncio.sleep(0.2)
+        assert bot.sent == ["push 0"]
+        assert limiter.waits == 1
+        await delivery.close(timeout=0.1)
+        await sender_service.lane_scheduler.close(timeout=0.1)
+        # Неотправленное осталось в outbox до следующего старта
+        assert [row["message"] for row in await store.pending_outbox()] == ["push 1", "push 2"]
+        store.close()
+
+    asyncio.run(scenario())
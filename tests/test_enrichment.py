@@ -0,0 +1,46 @@
+# tests/test_enrichment.py
+import asyncio
+
+from app.services import webhook_service
+from app.services.webhook_service import PreparedNotification, prepare_event
+
+USER = {"login": "octocat", "html_url": "https://github.com/octocat"}
+
+
+class CountingEnricher:
+    def __init__(self):
+        self.calls: list[str] = []
+
+    async def enrich(self, event_type: str, payload) -> dict:
+        self.calls.append(payload.action)
+        return {"additions": 10, "deletions": 2, "changed_files": 3, "commits": 1}
+
+
+def pull_request(action: str) -> dict:
+    return {
+        "action": action,
+        "pull_request": {
+            "number": 7,
+            "title": "Speed up",
+            "html_url": "https://github.com/acme/app/pull/7",
+            "state": "open",
+            "user": USER,
+        },
+        "repository": {"full_name": "acme/app", "html_url": "https://github.com/acme/app"},
+        "sender": USER,
+    }
+
+
+def test_only_rendered_events_are_enriched(monkeypatch):
+    enricher = CountingEnricher()
+    monkeypatch.setattr(webhook_service, "enricher", enricher)
+
+    for action in ("labeled", "synchronize", "edited"):
+        result = asyncio.run(prepare_event("pull_request", pull_request(action)))
+        assert result == {"status": "ignored", "reason": "no_message_generated"}
+    assert enricher.calls == []
+
+    prepared = asyncio.run(prepare_event("pull_request", pull_request("opened")))
+    assert isinstance(prepared, PreparedNotification)
+    assert enricher.calls == ["opened"]
+    assert "+10 −2" in prepared.message
@@ -0,0 +1,52 @@
+# tests/test_event_store.py
+import asyncio
+import sqlite3
+import time
+
+from app.services.event_store import EventStore
+
+REPO = "acme/app"
+
+
+def _pull_request(number: int, action: str, state: str) -> dict:
+    return {"kind": "pull_request", "action": action, "repo": REPO, "entity": f"pr:{number}", "number": number,
+            "state": state, "title": f"PR {number}"}
+
+
+def test_compaction_keeps_only_open_entities(tmp_path):
+    async def scenario():
+        store = EventStore(str(tmp_path / "events.db"), 30)
+        await store.insert(_pull_request(1, "opened", "open"))
+        await store.insert(_pull_request(1, "synchronize", "open"))
+        await store.insert(_pull_request(2, "opened", "open"))
+        await store.insert(_pull_request(2, "closed", "merged"))
+        await store.insert({"kind": "check_run", "action": "completed", "repo": REPO, "entity": "check:ci@main",
+                            "state": "success", "sha": "abc", "branch": "main", "title": "ci"})
+        # Все записи старше срока хранения
+        await store._run("UPDATE events SET created_at = ?", (time.time() - 31 * 86400,))
+
+        assert await store.compact() == 4
+        rows = await store._run("SELECT entity, action FROM events")
+        assert [(row["entity"], row["action"]) for row in rows] == [("pr:1", "synchronize")]
+        assert [row["number"] for row in await store.open_pull_requests(REPO)] == [1]
+        store.close()
+
+    asyncio.run(scenario())
+
+
+def test_outbox_of_older_database_gets_new_columns(tmp_path):
+    path = str(tmp_path / "events.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, delivery_id TEXT, event TEXT NOT NULL, "
+                 "message TEXT NOT NULL, ordering_key TEXT, urgent INTEGER NOT NULL, repo TEXT, "
+                 "created_at REAL NOT NULL)")
+    conn.close()
+
+    async def scenario():
+        store = EventStore(path, 30)
+        await store.add_outbox("delivery-1", "push", "hello", None, False, REPO, detail='{"title": "t"}')
+        [row] = await store.pending_outbox()
+        assert (row["message"], row["detail"]) == ("hello", '{"title": "t"}')
+        store.close()
+
+    asyncio.run(scenario())
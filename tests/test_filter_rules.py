@@ -0,0 +1,39 @@
+# tests/test_filter_rules.py
+import asyncio
+import json
+
+from app.services import webhook_service
+from app.services.filter_rules import NotificationFilter
+from app.services.payload_offload import PayloadOffloader
+
+# Первое правило падает на кривом payload'е (коммит — строка), второе срабатывает
+RULES = 'broken: paths ~ "docs/*"\nbots: is_bot\n'
+
+
+def test_rule_errors_in_offload_pool_reach_parent_stats(tmp_path, monkeypatch):
+    path = tmp_path / "filters.rules"
+    path.write_text(RULES, encoding="utf-8")
+    # Процесс пула читает правила из окружения при запуске
+    monkeypatch.setenv("FILTER_RULES_PATH", str(path))
+    rules = NotificationFilter(str(path))
+    offloader = PayloadOffloader(1, 0)
+    monkeypatch.setattr(webhook_service, "notification_filter", rules)
+    monkeypatch.setattr(webhook_service, "payload_offloader", offloader)
+
+    body = json.dumps({
+        "ref": "refs/heads/main",
+        "commits": ["not a commit"],
+        "sender": {"login": "dependabot[bot]"},
+        "repository": {"full_name": "acme/app"},
+    }).encode()
+    payload_class, formatter, _ = webhook_service.EVENT_HANDLERS["push"]
+    try:
+        rendered = asyncio.run(webhook_service._render("push", payload_class, formatter, body, False))
+    finally:
+        offloader.close()
+
+    assert offloader.offloaded == 1
+    assert (rendered.muted_by, rendered.filter_errors) == ("bots", ["broken"])
+    stats = {rule["name"]: rule for rule in rules.stats()["rules"]}
+    assert (stats["broken"]["errors"], stats["bots"]["matched"]) == (1, 1)
+    assert rules.stats()["evaluated"] == 1
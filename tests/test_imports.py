@@ -0,0 +1,19 @@
+# tests/test_imports.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_formatters_import_without_config():
+    """Форматтеры и ключи событий используются в бенчмарках и процессах пула — без окружения бота"""
+    env = {key: value for key, value in os.environ.items() if key != "BOT_TOKEN"}
+    code = (
+        "import sys\n"
+        "import app.services.report_service, app.services.event_keys\n"
+        "assert 'app.core.config' not in sys.modules, 'app.core.config imported'\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,32 @@
+# tests/test_metrics.py
+import asyncio
+import importlib
+
+import pytest
+from fastapi import HTTPException
+
+# app.api экспортирует под этим именем сам роутер, а нужен модуль
+metrics_router = importlib.import_module("app.api.metrics_router")
+
+
+def _scrape(authorization: str | None = None, x_admin_token: str | None = None):
+    return asyncio.run(metrics_router.metrics(authorization=authorization, x_admin_token=x_admin_token))
+
+
+def test_metrics_are_disabled_by_default():
+    with pytest.raises(HTTPException) as error:
+        _scrape()
+    assert error.value.status_code == 404
+
+
+def test_metrics_require_admin_token(monkeypatch):
+    monkeypatch.setattr(metrics_router, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics_router, "ADMIN_TOKEN", "secret")
+
+    for authorization, x_admin_token in ((None, None), ("Bearer wrong", None), (None, "wrong"), ("secret", None)):
+        with pytest.raises(HTTPException) as error:
+            _scrape(authorization, x_admin_token)
+        assert error.value.status_code == 403
+
+    assert "notifier_send_queue_max_bytes" in _scrape("Bearer secret").body.decode()
+    assert "notifier_send_queue_max_bytes" in _scrape(x_admin_token="secret").body.decode()
@@ -0,0 +1,45 @@
+# tests/test_profiler.py
+import asyncio
+import json
+from collections import Counter
+
+from app.core.profiler import SamplingProfiler
+from app.services import webhook_service
+from app.services.webhook_service import BackgroundDelivery, PreparedNotification
+
+
+def test_profiles_captured_in_same_second_are_kept(tmp_path):
+    profiler = SamplingProfiler(False, 0, 0, str(tmp_path), 10, 5)
+    metadata = {"event": "push", "delivery_id": "delivery-1", "created_at": 1_760_000_000.25}
+
+    profiler._write(Counter({"handler;render": 3}), metadata)
+    profiler._write(Counter({"handler;send": 5}), metadata)
+
+    assert profiler.saved == 2
+    assert len(list(tmp_path.glob("*.folded"))) == 2
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_background_delivery_is_profiled(tmp_path, monkeypatch):
+    profiler = SamplingProfiler(False, 1, 0, str(tmp_path), 10, 1)
+    monkeypatch.setattr(webhook_service, "profiler", profiler)
+
+    async def slow_sender(text: str, **kwargs) -> list[dict]:
+        await asyncio.sleep(0.05)
+        return [{"chat_id": 1, "topic_id": None, "template": "full", "ok": True}]
+
+    async def scenario():
+        profiler.enable()
+        delivery = BackgroundDelivery(None)
+        prepared = PreparedNotification("push", "hello", slow_sender, None, False, "acme/app")
+        await delivery.submit(prepared, "delivery-1")
+        await delivery.close()
+        profiler.disable()
+        # Профиль пишется в пуле потоков
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+
+    [saved] = [json.loads(path.read_text(encoding="utf-8")) for path in tmp_path.glob("*.json")]
+    assert (saved["event"], saved["delivery_id"], saved["stage"]) == ("push", "delivery-1", "delivery")
+    assert "slow_sender" in next(tmp_path.glob("*.folded")).read_text(encoding="utf-8")
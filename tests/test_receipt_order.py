@@ -0,0 +1,90 @@
+# tests/test_receipt_order.py
+import asyncio
+import json
+
+from app.services import webhook_service
+from app.services.payload_offload import render_event
+from app.services.webhook_service import BackgroundDelivery, ReceiptOrder, process_event
+
+USER = {"login": "octocat", "html_url": "https://github.com/octocat"}
+
+
+class SlowOffloader:
+    """Пул процессов, который долго разбирает большие payload'ы"""
+
+    def should_offload(self, size: int) -> bool:
+        return size > 10_000
+
+    async def render(self, event_type, payload_class, formatter_func, body, with_payload):
+        await asyncio.sleep(0.2)
+        return render_event(event_type, payload_class, formatter_func, body, with_payload)
+
+
+class RecordingSender:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def __call__(self, text: str, **kwargs) -> list[dict]:
+        self.sent.append(text)
+        return [{"chat_id": 1, "topic_id": None, "template": "full", "ok": True}]
+
+
+def pull_request(action: str, body: str = "") -> bytes:
+    return json.dumps({
+        "action": action,
+        "pull_request": {
+            "number": 7,
+            "title": f"{action} acme/app#7",
+            "html_url": "https://github.com/acme/app/pull/7",
+            "state": "closed" if action == "closed" else "open",
+            "body": body,
+            "user": USER,
+        },
+        "repository": {"full_name": "acme/app", "html_url": "https://github.com/acme/app"},
+        "sender": USER,
+    }).encode()
+
+
+def test_small_event_does_not_overtake_large_one_for_same_pr(monkeypatch):
+    sender = RecordingSender()
+    payload_class, formatter, _ = webhook_service.EVENT_HANDLERS["pull_request"]
+    monkeypatch.setitem(webhook_service.EVENT_HANDLERS, "pull_request", (payload_class, formatter, sender))
+    monkeypatch.setattr(webhook_service, "payload_offloader", SlowOffloader())
+
+    async def scenario():
+        delivery = BackgroundDelivery(None)
+        monkeypatch.setattr(webhook_service, "background_delivery", delivery)
+        large = asyncio.create_task(process_event("pull_request", pull_request("opened", body="x" * 50_000)))
+        await asyncio.sleep(0)
+        small = asyncio.create_task(process_event("pull_request", pull_request("closed")))
+
+        await asyncio.sleep(0.05)
+        # Маленькое событие уже подготовлено, но ждет большое
+        assert not large.done() and not small.done()
+        assert await asyncio.gather(large, small) == [{"status": "queued", "event": "pull_request"}] * 2
+        await delivery.close()
+        assert webhook_service.receipt_order.stats()["pending"] == 0
+
+    asyncio.run(scenario())
+    assert len(sender.sent) == 2
+    assert "opened acme/app#7" in sender.sent[0] and "closed acme/app#7" in sender.sent[1]
+
+
+def test_other_repositories_do_not_wait():
+    async def scenario():
+        order = ReceiptOrder()
+        first, other, same = order.take(), order.take(), order.take()
+        order.resolve(first, "acme/app")
+        order.resolve(other, "acme/other")
+        order.resolve(same, "acme/app")
+
+        await asyncio.wait_for(order.wait_turn(other), timeout=1)
+        waiting = asyncio.create_task(order.wait_turn(same))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        order.finish(first)
+        await asyncio.wait_for(waiting, timeout=1)
+        assert order.stats() == {"pending": 2, "waits": 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,72 @@
+# tests/test_repeat_subject.py
+from app.schemas.github_payload import GitHubCheckRunPayload, GitHubIssuesPayload
+from app.services.event_keys import get_repeat_subject
+from app.services.repeat_suppressor import RepeatSuppressor
+
+REPO = {"full_name": "acme/app", "html_url": "https://github.com/acme/app", "name": "app"}
+USER = {"login": "octocat", "html_url": "https://github.com/octocat"}
+
+
+def check_run(conclusion: str, head_sha: str = "a" * 40, branch: str = "feature-1", run_id: int = 1):
+    return GitHubCheckRunPayload(**{
+        "action": "completed",
+        "check_run": {
+            "id": run_id,
+            "name": "CI",
+            "status": "completed",
+            "conclusion": conclusion,
+            "html_url": f"https://github.com/acme/app/runs/{run_id}",
+            "head_sha": head_sha,
+            "check_suite": {"head_branch": branch},
+        },
+        "repository": REPO,
+        "sender": USER,
+    })
+
+
+def issue_event(action: str, number: int = 7):
+    return GitHubIssuesPayload(**{
+        "action": action,
+        "issue": {
+            "number": number,
+            "title": "Flaky",
+            "html_url": f"https://github.com/acme/app/issues/{number}",
+            "state": "closed" if action == "closed" else "open",
+            "user": USER,
+        },
+        "repository": REPO,
+        "sender": USER,
+    })
+
+
+def observe(suppressor: RepeatSuppressor, payload) -> bool:
+    key, subject, outcome, url = get_repeat_subject(payload)
+    return suppressor.observe(key, "event", "acme/app", subject, outcome, url)
+
+
+def test_check_rerun_on_same_commit_is_suppressed():
+    suppressor = RepeatSuppressor(600, 100)
+    assert not observe(suppressor, check_run("failure", run_id=1))
+    assert observe(suppressor, check_run("failure", run_id=2))
+
+
+def test_check_failures_on_other_prs_are_not_suppressed():
+    suppressor = RepeatSuppressor(600, 100)
+    assert not observe(suppressor, check_run("failure", head_sha="a" * 40, branch="feature-1"))
+    assert not observe(suppressor, check_run("failure", head_sha="b" * 40, branch="feature-2"))
+
+
+def test_successful_checks_are_never_suppressed():
+    assert get_repeat_subject(check_run("success")) is None
+
+
+def test_issue_flapping_shares_one_key_and_keeps_last_state():
+    suppressor = RepeatSuppressor(600, 100)
+    assert not observe(suppressor, issue_event("closed"))
+    assert observe(suppressor, issue_event("reopened"))
+    assert observe(suppressor, issue_event("closed"))
+    assert not observe(suppressor, issue_event("closed", number=8))
+
+    [window] = suppressor.collect(force=True)
+    assert window.count == 3
+    assert window.outcome == "closed"
@@ -0,0 +1,70 @@
+# tests/test_repo_fairness.py
+import asyncio
+
+from app.services import sender_service
+from app.services.lane_scheduler import LaneScheduler
+from app.services.repo_fairness import RepoFairness
+from app.services.send_queue import QueuedMessage, SendBudget
+
+NOISY = "acme/monorepo"
+
+
+class GatedBot:
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.sent: list[str] = []
+
+    async def send_message(self, chat_id, text, message_thread_id=None, **kwargs):
+        await self.gate.wait()
+        self.sent.append(text)
+
+
+def test_quiet_repo_is_not_stuck_behind_noisy_one_in_full_budget(monkeypatch):
+    bot = GatedBot()
+    # Бюджет на три сообщения: шумный репозиторий заполняет его сразу
+    budget = SendBudget(0)
+    budget.max_bytes = budget.size_of([QueuedMessage(1, None, "check_run", "noisy 00", repo=NOISY)]) * 3
+    monkeypatch.setattr(sender_service, "bot", bot)
+    monkeypatch.setattr(sender_service, "send_budget", budget)
+    monkeypatch.setattr(sender_service, "repo_fairness", RepoFairness([], 0))
+
+    async def scenario():
+        monkeypatch.setattr(sender_service, "lane_scheduler", LaneScheduler(1, 30))
+        tasks = [asyncio.create_task(sender_service.send_cicd_notification(f"noisy {seq:02d}", repo=NOISY))
+                 for seq in range(20)]
+        await asyncio.sleep(0.01)
+        assert budget.stats()["waiting"] == 17
+        tasks.append(asyncio.create_task(sender_service.send_cicd_notification("quiet", repo="acme/app")))
+        await asyncio.sleep(0.01)
+
+        bot.gate.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    # Строго по очереди тихий ушел бы 21-м; честно — сразу после уже занявших бюджет
+    assert bot.sent.index("quiet") <= 4
+    noisy = [text for text in bot.sent if text != "quiet"]
+    assert noisy == sorted(noisy) and len(noisy) == 20
+
+
+def test_batches_are_sent_as_their_repository_flow(monkeypatch):
+    flows: list[str] = []
+
+    class RecordingScheduler:
+        async def submit(self, key, job, flow=None, weight=1.0):
+            flows.append(flow)
+
+    monkeypatch.setattr(sender_service, "repo_fairness", RepoFairness([], 0))
+    monkeypatch.setattr(sender_service, "lane_scheduler", RecordingScheduler())
+
+    async def scenario():
+        batcher = sender_service.MessageBatcher(0.01, sender_service._deliver_batch)
+        monkeypatch.setattr(sender_service, "message_batcher", batcher)
+        await asyncio.gather(
+            sender_service.send_push_notification("one", repo=NOISY),
+            sender_service.send_push_notification("two", repo=NOISY),
+            sender_service.send_push_notification("three", repo="acme/app"),
+        )
+
+    asyncio.run(scenario())
+    assert sorted(flows) == ["acme/app", NOISY]
@@ -0,0 +1,60 @@
+# tests/test_send_queue.py
+import asyncio
+import gc
+import tracemalloc
+
+from app.services import sender_service
+from app.services.lane_scheduler import LaneScheduler
+from app.services.queue_calibration import calibrate
+from app.services.send_queue import SendBudget
+from app.services.webhook_service import BackgroundDelivery, PreparedNotification
+
+COUNT = 1000
+
+
+class StuckBot:
+    def __init__(self):
+        self.gate = asyncio.Event()
+
+    async def send_message(self, chat_id, text, message_thread_id=None, **kwargs):
+        await self.gate.wait()
+
+
+def test_budget_charges_what_queued_messages_retain(monkeypatch):
+    bot = StuckBot()
+    budget = SendBudget(0)
+    # Как при старте приложения: замер в отдельном процессе на этой сборке Python
+    asyncio.run(calibrate(budget))
+    monkeypatch.setattr(sender_service, "bot", bot)
+    monkeypatch.setattr(sender_service, "send_budget", budget)
+
+    async def scenario() -> tuple[int, int]:
+        monkeypatch.setattr(sender_service, "lane_scheduler", LaneScheduler(1, 30))
+        delivery = BackgroundDelivery(None)
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        for seq in range(COUNT):
+            text = f"<b>🚀 Push</b> в <code>main</code> acme/app #{seq}\n" + "• fix: something\n" * 20
+            prepared = PreparedNotification("push", text, sender_service.send_push_notification,
+                                            None, False, "acme/app")
+            await delivery.submit(prepared, None)
+            del text, prepared
+        while budget.messages < COUNT:
+            await asyncio.sleep(0.01)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+        charged = budget.bytes
+
+        bot.gate.set()
+        await delivery.close(timeout=None)
+        return retained, charged
+
+    tracemalloc.start()
+    try:
+        retained, charged = asyncio.run(scenario())
+    finally:
+        tracemalloc.stop()
+
+    # Бюджет должен отражать реальную память очереди, а не одни записи с текстами. Накладные расходы —
+    # около 90% памяти сообщения, поэтому ошибка замера больше чем на ~10% выводит отношение за пределы
+    assert 0.9 <= charged / retained <= 1.1, (budget.message_overhead, charged / COUNT, retained / COUNT)